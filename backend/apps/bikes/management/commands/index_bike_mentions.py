@@ -0,0 +1,28 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from apps.bikes.mentions import MentionDictionary, index_article
+from apps.bikes.models import BikeModel, BikeArticleMention
+
+
+class Command(BaseCommand):
+    help = "Re-scan every article for bike mentions (after catalog changes or matcher updates)."
+
+    def handle(self, *args, **options):
+        dictionary = MentionDictionary(BikeModel.objects.values_list('id', 'brand_id', 'brand__name', 'name'))
+        sources = {'news': apps.get_model('news', 'Article')}
+        if apps.is_installed('apps.editorial'):
+            sources['editorial'] = apps.get_model('editorial', 'Article')
+
+        articles = links = 0
+        for source, model in sources.items():
+            # Drop links of articles that were deleted or unpublished meanwhile
+            published = model.objects.filter(is_published=True)
+            BikeArticleMention.objects.filter(source=source).exclude(
+                article_id__in=published.values('id')
+            ).delete()
+            for article in published.iterator(chunk_size=500):
+                links += index_article(source, article, dictionary)
+                articles += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {articles} articles into {links} bike links."))
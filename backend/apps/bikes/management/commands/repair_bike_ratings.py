@@ -0,0 +1,28 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.bikes.models import BikeModel
+from apps.bikes.ratings import recompute_ratings
+from apps.interactions.models import Review
+from core.batching import keyset_batches
+from core.response_cache import invalidate_tags
+
+
+class Command(BaseCommand):
+    help = "Recompute BikeModel rating aggregates from reviews and fix any that drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        expert_review_model = apps.get_model('editorial', 'Review') if apps.is_installed('apps.editorial') else None
+        repaired = 0
+        for ids in keyset_batches(BikeModel.objects.all(), options['batch_size']):
+            with transaction.atomic():
+                # Lock the batch so incremental updates cannot interleave with the rewrite
+                list(BikeModel.objects.select_for_update().filter(id__in=ids).values_list('id', flat=True))
+                repaired += recompute_ratings(BikeModel, Review, expert_review_model, bike_ids=ids)
+        if repaired:
+            invalidate_tags('bikes.BikeModel')
+        self.stdout.write(self.style.SUCCESS(f"Repaired rating aggregates on {repaired} bikes."))
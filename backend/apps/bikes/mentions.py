@@ -0,0 +1,196 @@
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.html import strip_tags
+
+DICTIONARY_VERSION_KEY = 'bikes:mention-dictionary:version'
+
+# Weight of one mention; a mention in the title counts TITLE_BOOST times
+FULL_NAME_WEIGHT = 3.0
+MODEL_NAME_WEIGHT = 2.0
+TITLE_BOOST = 2.0
+
+Payload = Tuple[str, int]  # ('full' | 'model' | 'brand', bike or brand id)
+
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r'[a-z0-9]+', (text or '').lower())
+
+
+class MentionMatcher:
+    """
+    Aho-Corasick automaton over word tokens: every brand and model name in the
+    catalog is matched in one left-to-right pass over an article, however many
+    bikes there are.
+    """
+
+    def __init__(self, patterns: Dict[Tuple[str, ...], List[Payload]]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[Tuple[int, Payload]]] = [[]]
+
+        for tokens, payloads in patterns.items():
+            state = 0
+            for token in tokens:
+                nxt = self.goto[state].get(token)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][token] = nxt
+                state = nxt
+            self.output[state].extend((len(tokens), payload) for payload in payloads)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nxt] = self.goto[fallback].get(token, 0)
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+    def find(self, tokens: Iterable[str]):
+        """Yield (start, end, payload) for every pattern occurrence."""
+        state = 0
+        for end, token in enumerate(tokens, 1):
+            while state and token not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(token, 0)
+            for length, payload in self.output[state]:
+                yield end - length, end, payload
+
+
+class MentionDictionary:
+    def __init__(self, bikes):
+        """`bikes`: iterable of (bike_id, brand_id, brand name, model name)."""
+        patterns = defaultdict(list)
+        by_model_name = defaultdict(set)
+        self.brand_of = {}
+        for bike_id, brand_id, brand, name in bikes:
+            brand_tokens, name_tokens = tuple(tokenize(brand)), tuple(tokenize(name))
+            self.brand_of[bike_id] = brand_id
+            if brand_tokens:
+                patterns[brand_tokens].append(('brand', brand_id))
+            if not name_tokens:
+                continue
+            full = name_tokens if name_tokens[:len(brand_tokens)] == brand_tokens else brand_tokens + name_tokens
+            patterns[full].append(('full', bike_id))
+            # A bare "150" or "2" says nothing about which bike is meant
+            if not all(token.isdigit() for token in name_tokens):
+                patterns[name_tokens].append(('model', bike_id))
+                by_model_name[name_tokens].add(brand_id)
+        # Model names shared by several brands only count next to a brand mention
+        self.ambiguous = {tokens for tokens, brands in by_model_name.items() if len(brands) > 1}
+        self.ambiguous_bikes = {
+            bike_id for tokens in self.ambiguous for kind, bike_id in patterns[tokens] if kind == 'model'
+        }
+        self.matcher = MentionMatcher(patterns)
+
+    def score(self, title: str, body: str) -> Dict[int, float]:
+        """Relevance per bike id mentioned in an article."""
+        scores = defaultdict(float)
+        brands_seen = set()
+        model_hits = []
+        for text, boost in ((title, TITLE_BOOST), (body, 1.0)):
+            # Per end position keep the longest match per bike: "Yamaha R15" is not also a bare "R15"
+            best = {}
+            for start, end, (kind, target) in self.matcher.find(tokenize(text)):
+                if kind == 'brand':
+                    brands_seen.add(target)
+                    continue
+                weight = FULL_NAME_WEIGHT if kind == 'full' else MODEL_NAME_WEIGHT
+                key = (end, target)
+                if weight > best.get(key, (0, None))[0]:
+                    best[key] = (weight, kind)
+            for (end, bike_id), (weight, kind) in best.items():
+                if kind == 'model' and bike_id in self.ambiguous_bikes:
+                    model_hits.append((bike_id, weight * boost))
+                else:
+                    scores[bike_id] += weight * boost
+        for bike_id, weight in model_hits:
+            if self.brand_of[bike_id] in brands_seen:
+                scores[bike_id] += weight
+        return {bike_id: round(score, 2) for bike_id, score in scores.items()}
+
+
+# (version, built at, dictionary)
+_dictionary: Tuple[Optional[object], float, Optional[MentionDictionary]] = (None, 0.0, None)
+_dictionary_lock = threading.Lock()
+
+
+def bump_dictionary_version():
+    try:
+        cache.incr(DICTIONARY_VERSION_KEY)
+    except ValueError:
+        cache.set(DICTIONARY_VERSION_KEY, 1, None)
+
+
+def get_dictionary() -> MentionDictionary:
+    """
+    The catalog dictionary, rebuilt when a brand or bike changed since it was
+    built, and at least every BIKE_MENTION_DICTIONARY_MAX_AGE_SECONDS.
+    """
+    global _dictionary
+    from .models import BikeModel
+
+    version = cache.get(DICTIONARY_VERSION_KEY)
+    built_version, built_at, dictionary = _dictionary
+    if (dictionary is None or built_version != version
+            or time.monotonic() - built_at > settings.BIKE_MENTION_DICTIONARY_MAX_AGE_SECONDS):
+        with _dictionary_lock:
+            # Stamped before the load, like the version read above
+            built_at = time.monotonic()
+            bikes = BikeModel.objects.values_list('id', 'brand_id', 'brand__name', 'name')
+            dictionary = MentionDictionary(bikes)
+            _dictionary = (version, built_at, dictionary)
+    return dictionary
+
+
+def article_text(source: str, article) -> Tuple[str, str, dict]:
+    """(title, plain-text body, card fields) of a news or editorial article."""
+    if source == 'news':
+        excerpt = article.excerpt
+    else:
+        excerpt = article.summary
+    card = {
+        'title': article.title,
+        'slug': article.slug,
+        'excerpt': excerpt or '',
+        'featured_image': article.featured_image,
+        'published_at': article.published_at,
+    }
+    return article.title, f"{excerpt or ''}\n{strip_tags(article.content)}", card
+
+
+def index_article(source: str, article, dictionary: Optional[MentionDictionary] = None) -> int:
+    """Replace an article's bike mentions; unpublished articles lose theirs. Returns links written."""
+    from .models import BikeArticleMention
+
+    mentions = []
+    if article.is_published:
+        title, body, card = article_text(source, article)
+        scores = (dictionary or get_dictionary()).score(title, body)
+        mentions = [
+            BikeArticleMention(bike_id=bike_id, source=source, article_id=article.pk, relevance=score, **card)
+            for bike_id, score in scores.items()
+        ]
+    with transaction.atomic():
+        BikeArticleMention.objects.filter(source=source, article_id=article.pk).delete()
+        BikeArticleMention.objects.bulk_create(mentions)
+    return len(mentions)
+
+
+def remove_article(source: str, article_id: int):
+    from .models import BikeArticleMention
+
+    BikeArticleMention.objects.filter(source=source, article_id=article_id).delete()
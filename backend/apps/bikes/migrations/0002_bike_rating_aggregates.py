@@ -0,0 +1,84 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:55
+
+from django.db import migrations, models
+
+
+def backfill_ratings(apps, schema_editor):
+    from apps.bikes.ratings import recompute_ratings
+
+    try:
+        expert_review_model = apps.get_model('editorial', 'Review')
+    except LookupError:
+        expert_review_model = None
+    recompute_ratings(apps.get_model('bikes', 'BikeModel'), apps.get_model('interactions', 'Review'), expert_review_model)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bikes', '0001_initial'),
+        ('interactions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bikemodel',
+            name='expert_rating_avg',
+            field=models.FloatField(default=0, help_text='Out of 10'),
+        ),
+        migrations.AddField(
+            model_name='bikemodel',
+            name='expert_rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='bikemodel',
+            name='expert_rating_sum',
+            field=models.DecimalField(decimal_places=1, default=0, max_digits=8),
+        ),
+        migrations.AddField(
+            model_name='bikemodel',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='bikemodel',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='bikemodel',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='bikemodel',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='bikemodel',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='bikemodel',
+            name='user_rating_avg',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='bikemodel',
+            name='user_rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='bikemodel',
+            name='user_rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='bikemodel',
+            index=models.Index(fields=['-user_rating_avg', '-user_rating_count'], name='bike_user_rating_idx'),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
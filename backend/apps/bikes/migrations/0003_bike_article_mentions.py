@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bikes', '0002_bike_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BikeArticleMention',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('news', 'News'), ('editorial', 'Editorial')], max_length=20)),
+                ('article_id', models.BigIntegerField()),
+                ('relevance', models.FloatField()),
+                ('title', models.CharField(max_length=255)),
+                ('slug', models.SlugField(max_length=300)),
+                ('excerpt', models.TextField(blank=True)),
+                ('featured_image', models.URLField(blank=True, max_length=500, null=True)),
+                ('published_at', models.DateTimeField(blank=True, null=True)),
+                ('bike', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='article_mentions', to='bikes.bikemodel')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bike', '-relevance', '-published_at'], name='mention_bike_relevance_idx'), models.Index(fields=['source', 'article_id'], name='mention_article_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='bikearticlemention',
+            constraint=models.UniqueConstraint(fields=('bike', 'source', 'article_id'), name='unique_bike_article_mention'),
+        ),
+    ]
@@ -62,6 +62,19 @@ class BikeModel(models.Model):
     # Media & Social
     primary_image = models.URLField(max_length=500, blank=True, null=True)
     popularity_score = models.IntegerField(default=0)
+
+    # Ratings, maintained incrementally by apps.bikes.ratings (repair: repair_bike_ratings)
+    user_rating_count = models.PositiveIntegerField(default=0)
+    user_rating_sum = models.PositiveIntegerField(default=0)
+    user_rating_avg = models.FloatField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+    expert_rating_count = models.PositiveIntegerField(default=0)
+    expert_rating_sum = models.DecimalField(max_digits=8, decimal_places=1, default=0)
+    expert_rating_avg = models.FloatField(default=0, help_text="Out of 10")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -73,5 +86,46 @@ class BikeModel(models.Model):
     def __str__(self):
         return f"{self.brand.name} {self.name}"
 
+    @property
+    def rating_histogram(self):
+        return {value: getattr(self, f'rating_{value}_count') for value in range(1, 6)}
+
     class Meta:
         ordering = ['-popularity_score', 'name']
+        indexes = [
+            models.Index(fields=['-user_rating_avg', '-user_rating_count'], name='bike_user_rating_idx'),
+        ]
+
+class BikeArticleMention(models.Model):
+    """
+    A bike named in a published news or editorial article, found by
+    apps.bikes.mentions. Article card fields are copied here so the bike
+    page's related-articles list is a single indexed read.
+    """
+    SOURCE_CHOICES = [
+        ('news', 'News'),
+        ('editorial', 'Editorial'),
+    ]
+
+    bike = models.ForeignKey(BikeModel, on_delete=models.CASCADE, related_name='article_mentions')
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    article_id = models.BigIntegerField()
+    relevance = models.FloatField()
+
+    title = models.CharField(max_length=255)
+    slug = models.SlugField(max_length=300)
+    excerpt = models.TextField(blank=True)
+    featured_image = models.URLField(max_length=500, blank=True, null=True)
+    published_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['bike', 'source', 'article_id'], name='unique_bike_article_mention'),
+        ]
+        indexes = [
+            models.Index(fields=['bike', '-relevance', '-published_at'], name='mention_bike_relevance_idx'),
+            models.Index(fields=['source', 'article_id'], name='mention_article_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.bike_id} in {self.source}:{self.article_id}"
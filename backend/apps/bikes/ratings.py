@@ -0,0 +1,112 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast
+
+RATING_VALUES = range(1, 6)
+HISTOGRAM_FIELDS = {value: f'rating_{value}_count' for value in RATING_VALUES}
+USER_RATING_FIELDS = ['user_rating_count', 'user_rating_sum', 'user_rating_avg', *HISTOGRAM_FIELDS.values()]
+EXPERT_RATING_FIELDS = ['expert_rating_count', 'expert_rating_sum', 'expert_rating_avg']
+
+
+def _average(sum_field, count_field, sum_delta, count_delta):
+    """new sum / new count computed from the pre-update row, 0 when nothing is left."""
+    return Case(
+        When(**{f'{count_field}__lte': -count_delta}, then=Value(0.0)),
+        default=Cast(F(sum_field) + Value(sum_delta), FloatField()) / Cast(F(count_field) + count_delta, FloatField()),
+        output_field=FloatField(),
+    )
+
+
+def _apply(bike_id, updates):
+    from core.response_cache import invalidate_tags
+    from .models import BikeModel
+
+    BikeModel.objects.filter(pk=bike_id).update(**updates)
+    # Queryset update() sends no post_save, so cached catalog pages are invalidated here
+    invalidate_tags('bikes.BikeModel')
+
+
+def change_user_rating(bike_id, old_rating=None, new_rating=None):
+    """Move one user review's contribution on a bike, in a single UPDATE of F-expressions."""
+    if old_rating == new_rating:
+        return
+    count_delta = (new_rating is not None) - (old_rating is not None)
+    sum_delta = (new_rating or 0) - (old_rating or 0)
+    updates = {
+        'user_rating_count': F('user_rating_count') + count_delta,
+        'user_rating_sum': F('user_rating_sum') + sum_delta,
+        'user_rating_avg': _average('user_rating_sum', 'user_rating_count', sum_delta, count_delta),
+    }
+    if old_rating is not None:
+        updates[HISTOGRAM_FIELDS[old_rating]] = F(HISTOGRAM_FIELDS[old_rating]) - 1
+    if new_rating is not None:
+        updates[HISTOGRAM_FIELDS[new_rating]] = F(HISTOGRAM_FIELDS[new_rating]) + 1
+    _apply(bike_id, updates)
+
+
+def change_expert_rating(bike_id, old_rating=None, new_rating=None):
+    """Same for published editorial reviews (rated out of 10)."""
+    if old_rating == new_rating:
+        return
+    count_delta = (new_rating is not None) - (old_rating is not None)
+    sum_delta = Decimal(new_rating or 0) - Decimal(old_rating or 0)
+    _apply(bike_id, {
+        'expert_rating_count': F('expert_rating_count') + count_delta,
+        'expert_rating_sum': F('expert_rating_sum') + sum_delta,
+        'expert_rating_avg': _average('expert_rating_sum', 'expert_rating_count', sum_delta, count_delta),
+    })
+
+
+def recompute_ratings(bike_model, review_model, expert_review_model=None, bike_ids=None):
+    """
+    Recompute stored rating aggregates from the review tables and write the
+    bikes whose values drifted. Works with historical models in migrations.
+    Returns the number of bikes updated.
+    """
+    bikes = bike_model.objects.all()
+    reviews = review_model.objects.all()
+    if bike_ids is not None:
+        bikes = bikes.filter(pk__in=bike_ids)
+        reviews = reviews.filter(bike_id__in=bike_ids)
+
+    expected = defaultdict(dict)
+    user_rows = reviews.values('bike_id').annotate(
+        user_rating_count=Count('id'),
+        user_rating_sum=Sum('rating'),
+        **{field: Count('id', filter=Q(rating=value)) for value, field in HISTOGRAM_FIELDS.items()},
+    )
+    for row in user_rows:
+        bike_id = row.pop('bike_id')
+        row['user_rating_avg'] = row['user_rating_sum'] / row['user_rating_count']
+        expected[bike_id].update(row)
+
+    if expert_review_model is not None:
+        expert_reviews = expert_review_model.objects.filter(is_published=True)
+        if bike_ids is not None:
+            expert_reviews = expert_reviews.filter(bike_id__in=bike_ids)
+        for row in expert_reviews.values('bike_id').annotate(
+            expert_rating_count=Count('id'), expert_rating_sum=Sum('rating'),
+        ):
+            bike_id = row.pop('bike_id')
+            row['expert_rating_avg'] = float(row['expert_rating_sum']) / row['expert_rating_count']
+            expected[bike_id].update(row)
+
+    fields = USER_RATING_FIELDS + (EXPERT_RATING_FIELDS if expert_review_model is not None else [])
+    empty = {field: 0 for field in fields}
+    drifted = []
+    for bike in bikes.only('id', *fields).iterator(chunk_size=2000):
+        values = {**empty, **expected.get(bike.pk, {})}
+        if any(_differs(getattr(bike, field), value) for field, value in values.items()):
+            for field, value in values.items():
+                setattr(bike, field, value)
+            drifted.append(bike)
+    bike_model.objects.bulk_update(drifted, fields, batch_size=1000)
+    return len(drifted)
+
+
+def _differs(stored, expected) -> bool:
+    if isinstance(stored, float) or isinstance(expected, float):
+        return abs(float(stored) - float(expected)) > 1e-9
+    return stored != expected
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Brand, BikeModel
+from core.fields import SERIALIZER_FIELD_MAPPING
+from .models import Brand, BikeModel, BikeArticleMention
 
 class BrandSerializer(serializers.ModelSerializer):
     class Meta:
@@ -8,14 +9,24 @@ class BrandSerializer(serializers.ModelSerializer):
 
 class BikeModelSerializer(serializers.ModelSerializer):
     brand_name = serializers.ReadOnlyField(source='brand.name')
-    
+    rating_histogram = serializers.ReadOnlyField()
+    serializer_field_mapping = SERIALIZER_FIELD_MAPPING
+
     class Meta:
         model = BikeModel
-        fields = '__all__'
+        exclude = ['user_rating_sum', 'expert_rating_sum', *(f'rating_{value}_count' for value in range(1, 6))]
 
 class BikeModelCompactSerializer(serializers.ModelSerializer):
     brand_name = serializers.ReadOnlyField(source='brand.name')
-    
+    serializer_field_mapping = SERIALIZER_FIELD_MAPPING
+
     class Meta:
         model = BikeModel
-        fields = ['id', 'brand_name', 'name', 'category', 'price', 'popularity_score']
+        fields = ['id', 'brand_name', 'name', 'category', 'price', 'popularity_score', 'user_rating_avg', 'user_rating_count']
+
+class BikeArticleMentionSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='article_id')
+
+    class Meta:
+        model = BikeArticleMention
+        fields = ['source', 'id', 'title', 'slug', 'excerpt', 'featured_image', 'published_at', 'relevance']
@@ -0,0 +1,42 @@
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .mentions import bump_dictionary_version, index_article, remove_article
+from .models import BikeModel, Brand
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+@receiver(post_save, sender=BikeModel)
+@receiver(post_delete, sender=BikeModel)
+def catalog_changed(sender, raw=False, **kwargs):
+    # Rebuild the mention dictionary on next use; existing links are refreshed by index_bike_mentions
+    if not raw:
+        bump_dictionary_version()
+
+
+if apps.is_installed('apps.news'):
+    from apps.news.models import Article as NewsArticle
+
+    @receiver(post_save, sender=NewsArticle)
+    def news_article_saved(sender, instance, raw=False, **kwargs):
+        if not raw:
+            index_article('news', instance)
+
+    @receiver(post_delete, sender=NewsArticle)
+    def news_article_deleted(sender, instance, **kwargs):
+        remove_article('news', instance.pk)
+
+
+if apps.is_installed('apps.editorial'):
+    from apps.editorial.models import Article as EditorialArticle
+
+    @receiver(post_save, sender=EditorialArticle)
+    def editorial_article_saved(sender, instance, raw=False, **kwargs):
+        if not raw:
+            index_article('editorial', instance)
+
+    @receiver(post_delete, sender=EditorialArticle)
+    def editorial_article_deleted(sender, instance, **kwargs):
+        remove_article('editorial', instance.pk)
@@ -1,3 +1,297 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import unittest
+import uuid
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils.translation import gettext_lazy
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.fields import DecimalField
+from core.renderers import ORJSONParser, ORJSONRenderer, msgpack
+
+from apps.editorial.models import Review as ExpertReview
+from apps.interactions.models import Review
+from apps.news.models import Article, NewsCategory
+
+from . import mentions
+from .models import BikeArticleMention, BikeModel, Brand
+from .serializers import BikeModelSerializer
+
+UTC = datetime.timezone.utc
+DHAKA = datetime.timezone(datetime.timedelta(hours=6))
+
+
+def create_bikes(count=3):
+    brand = Brand.objects.create(name='Yamaha', slug='yamaha')
+    return [
+        BikeModel.objects.create(
+            brand=brand, name=f'R{index}', slug=f'yamaha-r{index}', category='sports',
+            engine_capacity=155, price=Decimal('524999.50') + index, user_rating_avg=4.25,
+        )
+        for index in range(count)
+    ]
+
+
+class ORJSONRendererTests(TestCase):
+    def assertSameOutput(self, data, accepted_media_type=None, renderer_context=None):
+        expected = JSONRenderer().render(data, accepted_media_type, renderer_context)
+        self.assertEqual(ORJSONRenderer().render(data, accepted_media_type, renderer_context), expected)
+
+    def test_serialized_bikes(self):
+        create_bikes()
+        bikes = BikeModel.objects.select_related('brand')
+        self.assertSameOutput(BikeModelSerializer(bikes, many=True).data)
+
+    def test_python_values(self):
+        self.assertSameOutput({
+            'utc': datetime.datetime(2024, 5, 1, 12, 30, tzinfo=UTC),
+            'micro': datetime.datetime(2024, 5, 1, 12, 30, 1, 250, tzinfo=UTC),
+            'dhaka': datetime.datetime(2024, 5, 1, 18, 30, tzinfo=DHAKA),
+            'naive': datetime.datetime(2024, 5, 1, 12, 30),
+            'date': datetime.date(2024, 5, 1),
+            'time': datetime.time(9, 15),
+            'duration': datetime.timedelta(minutes=90),
+            'price': Decimal('524999.50'),
+            'uuid': uuid.UUID(int=7),
+            'lazy': gettext_lazy('Not found.'),
+            'tuple': (1, 2.5, None, True),
+            'counts': {1: 0, 5: 3},
+            'text': 'ঢাকা "quoted"',
+            'empty': [],
+        })
+
+    def test_big_integers_fall_back_to_drf(self):
+        self.assertSameOutput({'big': 2 ** 64, 'small': -(2 ** 70), 'ok': 2 ** 63 - 1})
+
+    def test_non_finite_floats_are_null(self):
+        # DRF's strict JSON refuses these; orjson writes null
+        data = {'nan': float('nan'), 'inf': float('inf')}
+        with self.assertRaises(ValueError):
+            JSONRenderer().render(data)
+        self.assertEqual(ORJSONRenderer().render(data), b'{"nan":null,"inf":null}')
+
+    def test_indented_output_is_left_to_drf(self):
+        data = {'a': [1, {'b': None}]}
+        self.assertSameOutput(data, renderer_context={'indent': 4})
+        self.assertSameOutput(data, accepted_media_type='application/json; indent=2')
+
+    def test_none_is_empty(self):
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+
+class ORJSONParserTests(SimpleTestCase):
+    def test_parses_like_drf(self):
+        body = json.dumps({'title': 'ঢাকা', 'price': '150000.00', 'ids': [1, 2], 'ok': True, 'none': None}).encode()
+        self.assertEqual(ORJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
+
+    def test_malformed_body(self):
+        for body in (b'{"a": ', b'{"a": NaN}', b'\xff'):
+            with self.assertRaises(ParseError):
+                ORJSONParser().parse(io.BytesIO(body))
+
+
+class DecimalFieldTests(SimpleTestCase):
+    def test_matches_drf_field(self):
+        fast = DecimalField(max_digits=12, decimal_places=2)
+        drf = serializers.DecimalField(max_digits=12, decimal_places=2)
+        for value in (Decimal('524999.50'), Decimal('-3.10'), Decimal('0.00'), Decimal('500000'),
+                      Decimal('1.005'), Decimal('1E+3'), 12.5, '10', None):
+            self.assertEqual(fast.to_representation(value), drf.to_representation(value), value)
+
+    def test_other_options_use_drf_path(self):
+        field = DecimalField(max_digits=12, decimal_places=2, coerce_to_string=False)
+        self.assertEqual(field.to_representation(Decimal('5.50')), Decimal('5.50'))
+        field = DecimalField(max_digits=12, decimal_places=2, normalize_output=True)
+        self.assertEqual(field.to_representation(Decimal('5.50')), '5.5')
+
+
+class RepresentationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        create_bikes()
+
+    def test_api_output_matches_drf_json(self):
+        response = self.client.get('/api/bikes/models/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+        self.assertEqual(response.json()['results'][0]['price'], '524999.50')
+
+    def test_posted_json_is_parsed(self):
+        response = self.client.post('/api/bikes/brands/', {'name': 'Honda'}, format='json')
+        # Read-only viewset: reaching the method check means the body parsed
+        self.assertIn(response.status_code, (401, 403, 405))
+
+    @unittest.skipIf(msgpack is None, "msgpack is not installed")
+    def test_msgpack_by_content_negotiation(self):
+        json_response = self.client.get('/api/bikes/brands/')
+        response = self.client.get('/api/bikes/brands/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        # Not the cached JSON entry for the same URL
+        self.assertEqual(msgpack.unpackb(response.content), json.loads(json_response.content))
+
+    @unittest.skipIf(msgpack is None, "msgpack is not installed")
+    def test_msgpack_values_match_json(self):
+        response = self.client.get('/api/bikes/models/', HTTP_ACCEPT='application/msgpack')
+        data = msgpack.unpackb(response.content, strict_map_key=False)
+        expected = self.client.get('/api/bikes/models/').json()
+        for bike in data['results'] + expected['results']:
+            bike['rating_histogram'] = {str(key): count for key, count in bike['rating_histogram'].items()}
+        self.assertEqual(data, expected)
+
+
+class MentionIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(mentions, '_dictionary', (None, 0.0, None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.brand = Brand.objects.create(name='Yamaha', slug='yamaha')
+        self.r15 = BikeModel.objects.create(
+            brand=self.brand, name='R15 V4', slug='yamaha-r15-v4', category='sports', engine_capacity=155, price=525000,
+        )
+
+    def mentioned(self, dictionary):
+        return set(dictionary.score('Yamaha MT-15 and R15 V4 compared', ''))
+
+    def test_article_save_indexes_mentions(self):
+        category = NewsCategory.objects.create(name='Reviews')
+        article = Article.objects.create(
+            title='Yamaha R15 V4 long-term review', excerpt='Short', content='<p>The R15 V4 is quick.</p>',
+            category=category, is_published=True,
+        )
+        self.assertEqual(list(BikeArticleMention.objects.values_list('bike', 'source', 'article_id')),
+                         [(self.r15.pk, 'news', article.pk)])
+        article.is_published = False
+        article.save()
+        self.assertFalse(BikeArticleMention.objects.exists())
+
+    def test_catalog_change_rebuilds_the_dictionary(self):
+        self.assertEqual(self.mentioned(mentions.get_dictionary()), {self.r15.pk})
+        mt15 = BikeModel.objects.create(
+            brand=self.brand, name='MT-15', slug='yamaha-mt-15', category='naked', engine_capacity=155, price=480000,
+        )
+        self.assertEqual(self.mentioned(mentions.get_dictionary()), {self.r15.pk, mt15.pk})
+
+    def test_dictionary_has_a_max_age(self):
+        dictionary = mentions.get_dictionary()
+        # Another worker's bump that this process's cache never sees
+        mt15, = BikeModel.objects.bulk_create([BikeModel(
+            brand=self.brand, name='MT-15', slug='yamaha-mt-15', category='naked', engine_capacity=155, price=480000,
+        )])
+        self.assertIs(mentions.get_dictionary(), dictionary)
+        with override_settings(BIKE_MENTION_DICTIONARY_MAX_AGE_SECONDS=0), \
+                mock.patch.object(mentions.time, 'monotonic', return_value=mentions._dictionary[1] + 1):
+            self.assertEqual(self.mentioned(mentions.get_dictionary()), {self.r15.pk, mt15.pk})
+
+
+class RatingAggregateTests(TestCase):
+    def setUp(self):
+        self.bike, self.other = create_bikes(2)
+        self.users = [
+            get_user_model().objects.create_user(email=f'rider{index}@example.com', username=f'rider{index}', password='x')
+            for index in range(3)
+        ]
+
+    def review(self, user, rating, bike=None):
+        return Review.objects.create(bike=bike or self.bike, user=user, rating=rating, comment='Good')
+
+    def assertRatings(self, bike, count, avg, histogram):
+        bike.refresh_from_db()
+        self.assertEqual(bike.user_rating_count, count)
+        self.assertEqual(bike.user_rating_sum, sum(value * n for value, n in histogram.items()))
+        self.assertAlmostEqual(bike.user_rating_avg, avg)
+        self.assertEqual(bike.rating_histogram, {value: histogram.get(value, 0) for value in range(1, 6)})
+
+    def test_create_update_delete(self):
+        first = self.review(self.users[0], 5)
+        self.review(self.users[1], 2)
+        self.assertRatings(self.bike, 2, 3.5, {5: 1, 2: 1})
+
+        first = Review.objects.get(pk=first.pk)
+        first.rating = 4
+        first.save()
+        self.assertRatings(self.bike, 2, 3.0, {4: 1, 2: 1})
+
+        Review.objects.filter(bike=self.bike).delete()
+        self.assertRatings(self.bike, 0, 0, {})
+
+    def test_moving_a_review_updates_both_bikes(self):
+        review = self.review(self.users[0], 4)
+        self.review(self.users[1], 2)
+        review = Review.objects.get(pk=review.pk)
+        review.bike = self.other
+        review.save()
+        self.assertRatings(self.bike, 1, 2.0, {2: 1})
+        self.assertRatings(self.other, 1, 4.0, {4: 1})
+
+    def test_repair_command_fixes_drift(self):
+        self.review(self.users[0], 5)
+        self.review(self.users[1], 3)
+        # Bulk writes skip the signals
+        Review.objects.filter(user=self.users[1]).update(rating=1)
+        out = io.StringIO()
+        call_command('repair_bike_ratings', batch_size=1, stdout=out)
+        # The other bike still carried the fixture's average with no reviews
+        self.assertIn("Repaired rating aggregates on 2 bikes.", out.getvalue())
+        self.assertRatings(self.bike, 2, 3.0, {5: 1, 1: 1})
+        self.assertRatings(self.other, 0, 0, {})
+
+        out = io.StringIO()
+        call_command('repair_bike_ratings', stdout=out)
+        self.assertIn("on 0 bikes", out.getvalue())
+
+    def expert_review(self, rating, bike=None, is_published=True):
+        return ExpertReview.objects.create(
+            bike=bike or self.bike, author=self.users[0], title='Road test', content='...',
+            rating=Decimal(rating), is_published=is_published,
+        )
+
+    def assertExpertRatings(self, bike, count, total, avg):
+        bike.refresh_from_db()
+        self.assertEqual(bike.expert_rating_count, count)
+        self.assertEqual(bike.expert_rating_sum, Decimal(total))
+        self.assertAlmostEqual(bike.expert_rating_avg, avg)
+
+    def test_expert_ratings_count_published_reviews(self):
+        first = self.expert_review('8.5')
+        draft = self.expert_review('2.0', is_published=False)
+        self.assertExpertRatings(self.bike, 1, '8.5', 8.5)
+
+        draft = ExpertReview.objects.get(pk=draft.pk)
+        draft.is_published = True
+        draft.save()
+        self.assertExpertRatings(self.bike, 2, '10.5', 5.25)
+
+        first = ExpertReview.objects.get(pk=first.pk)
+        first.bike = self.other
+        first.save()
+        self.assertExpertRatings(self.bike, 1, '2.0', 2.0)
+        self.assertExpertRatings(self.other, 1, '8.5', 8.5)
+
+        draft.delete()
+        self.assertExpertRatings(self.bike, 0, '0', 0)
+
+    def test_repair_command_fixes_expert_drift(self):
+        # Clear the fixture's user averages first
+        call_command('repair_bike_ratings', stdout=io.StringIO())
+        self.expert_review('9.0')
+        self.expert_review('7.0')
+        ExpertReview.objects.update(is_published=False)
+        ExpertReview.objects.filter(rating=Decimal('7.0')).update(is_published=True, rating=Decimal('6.5'))
+        out = io.StringIO()
+        call_command('repair_bike_ratings', stdout=out)
+        self.assertIn("Repaired rating aggregates on 1 bikes.", out.getvalue())
+        self.assertExpertRatings(self.bike, 1, '6.5', 6.5)
@@ -1,18 +1,42 @@
 from rest_framework import viewsets, filters
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Brand, BikeModel
-from .serializers import BrandSerializer, BikeModelSerializer
+from .models import Brand, BikeModel, BikeArticleMention
+from .serializers import BrandSerializer, BikeModelSerializer, BikeArticleMentionSerializer
+from apps.trending.store import bike_card, record_event
 
 class BrandViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Brand.objects.all().order_by('name')
     serializer_class = BrandSerializer
+    response_cache_tags = ('bikes.Brand',)
     filter_backends = [filters.SearchFilter]
     search_fields = ['name', 'origin']
 
 class BikeModelViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = BikeModel.objects.all().order_by('-popularity_score', 'name')
+    queryset = BikeModel.objects.select_related('brand').order_by('-popularity_score', 'name')
     serializer_class = BikeModelSerializer
+    response_cache_tags = ('bikes.BikeModel', 'bikes.Brand')
+    # retrieve records a trending event, so only the list is served from cache
+    response_cache_actions = ('list',)
+    lookup_value_regex = r'\d+'
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['category', 'brand', 'engine_capacity']
     search_fields = ['name', 'brand__name']
-    ordering_fields = ['price', 'popularity_score', 'engine_capacity']
+    ordering_fields = ['price', 'popularity_score', 'engine_capacity', 'user_rating_avg', 'user_rating_count', 'expert_rating_avg']
+
+    def retrieve(self, request, *args, **kwargs):
+        bike = self.get_object()
+        record_event('bikes', bike.pk, bike_card(bike))
+        return Response(self.get_serializer(bike).data)
+
+    @action(detail=True, methods=['get'])
+    def articles(self, request, pk=None):
+        """News and editorial articles mentioning this bike, most relevant first."""
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 10)), 50))
+        except ValueError:
+            limit = 10
+        # Served by the (bike, -relevance, -published_at) index; no join to the article tables
+        mentions = BikeArticleMention.objects.filter(bike_id=pk).order_by('-relevance', '-published_at')[:limit]
+        return Response(BikeArticleMentionSerializer(mentions, many=True).data)
@@ -0,0 +1,44 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.bikes.ratings import change_expert_rating
+
+from .models import Review
+
+
+def _contribution(values):
+    """(bike_id, rating) an expert review adds to the aggregates; only published reviews count."""
+    if not values.get('is_published'):
+        return None, None
+    return values.get('bike_id'), values.get('rating')
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    loaded = {} if created else getattr(instance, '_loaded_values', None)
+    if loaded is None:
+        return
+    old_bike, old_rating = _contribution(loaded)
+    current = {'bike_id': instance.bike_id, 'rating': instance.rating, 'is_published': instance.is_published}
+    new_bike, new_rating = _contribution(current)
+    if old_bike == new_bike:
+        if new_bike is not None:
+            change_expert_rating(new_bike, old_rating, new_rating)
+    else:
+        if old_bike is not None:
+            change_expert_rating(old_bike, old_rating=old_rating)
+        if new_bike is not None:
+            change_expert_rating(new_bike, new_rating=new_rating)
+    instance._loaded_values = current
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    loaded = getattr(instance, '_loaded_values', None) or {
+        'bike_id': instance.bike_id, 'rating': instance.rating, 'is_published': instance.is_published,
+    }
+    bike_id, rating = _contribution(loaded)
+    if bike_id is not None:
+        change_expert_rating(bike_id, old_rating=rating)
@@ -10,7 +10,7 @@ class ArticleViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ['title', 'content']
 
 class ReviewViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Review.objects.all().order_by('-created_at')
+    queryset = Review.objects.filter(is_published=True).order_by('-created_at')
     serializer_class = ReviewSerializer
     filter_backends = [filters.SearchFilter]
     search_fields = ['title', 'pros', 'cons']
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interactions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['bike', '-created_at', '-id'], name='review_bike_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['bike', 'is_verified_purchase'], name='review_bike_verified_idx'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from apps.bikes.models import BikeModel
 
@@ -16,6 +16,23 @@ class Review(models.Model):
     class Meta:
         unique_together = ('bike', 'user')
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pages of a bike's reviews, newest first
+            models.Index(fields=['bike', '-created_at', '-id'], name='review_bike_recent_idx'),
+            models.Index(fields=['bike', 'is_verified_purchase'], name='review_bike_verified_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Stored bike/rating, so the aggregate update can move the old contribution
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        # The rating aggregates on BikeModel are updated by post_save inside this transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.user.username} - {self.bike.name} ({self.rating}/5)"
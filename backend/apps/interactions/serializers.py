@@ -16,3 +16,19 @@ class WishlistSerializer(serializers.ModelSerializer):
     class Meta:
         model = Wishlist
         fields = ['bikes', 'updated_at']
+
+class WishlistSyncSerializer(serializers.Serializer):
+    bike_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), max_length=500, allow_empty=True)
+    merge = serializers.BooleanField(default=False)
+
+class WishlistContainsSerializer(serializers.Serializer):
+    ids = serializers.CharField(help_text="Comma-separated bike ids, at most 100")
+
+    def validate_ids(self, value):
+        try:
+            ids = [int(part) for part in value.split(',') if part.strip()]
+        except ValueError:
+            raise serializers.ValidationError("Expected comma-separated integers.")
+        if len(ids) > 100:
+            raise serializers.ValidationError("At most 100 ids per request.")
+        return ids
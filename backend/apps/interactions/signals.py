@@ -0,0 +1,77 @@
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.bikes.models import BikeModel
+from apps.bikes.ratings import change_user_rating
+from apps.users.models import UserStats
+from apps.users.stats import adjust as adjust_stats, forget_stats, refresh_stats
+
+from .models import Review, Wishlist
+from .wishlist import forget_ids
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        adjust_stats(instance.user_id, reviews_count=1)
+    loaded = {} if created else getattr(instance, '_loaded_values', {})
+    old_bike, old_rating = loaded.get('bike_id'), loaded.get('rating')
+    if not created and old_bike is None:
+        # Saved without having been loaded; nothing to diff against, leave it to repair_bike_ratings
+        return
+    if old_bike == instance.bike_id:
+        change_user_rating(instance.bike_id, old_rating, instance.rating)
+    else:
+        if old_bike is not None:
+            change_user_rating(old_bike, old_rating=old_rating)
+        change_user_rating(instance.bike_id, new_rating=instance.rating)
+    instance._loaded_values = {'bike_id': instance.bike_id, 'rating': instance.rating}
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    # Runs inside the deletion's transaction; a bike being deleted simply matches no row
+    loaded = getattr(instance, '_loaded_values', {})
+    change_user_rating(loaded.get('bike_id', instance.bike_id), old_rating=loaded.get('rating', instance.rating))
+    adjust_stats(instance.user_id, reviews_count=-1)
+
+
+@receiver(m2m_changed, sender=Wishlist.bikes.through)
+def wishlist_bikes_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # ORM/admin edits; the API's raw SQL paths call wishlist_changed themselves
+    if reverse and action == 'pre_clear':
+        # After the clear there is no telling which wishlists held this bike
+        instance._wishlist_user_ids = list(instance.wishlisted_by.values_list('user_id', flat=True))
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        user_ids = [instance.user_id]
+    elif pk_set is None:
+        user_ids = getattr(instance, '_wishlist_user_ids', [])
+    else:
+        user_ids = list(Wishlist.objects.filter(pk__in=pk_set).values_list('user_id', flat=True))
+    for user_id in user_ids:
+        forget_ids(user_id)
+    refresh_stats(user_ids)
+
+
+@receiver(pre_delete, sender=BikeModel)
+def wishlisted_bike_deleted(sender, instance, **kwargs):
+    # The through rows go by cascade, which sends no m2m_changed
+    holders = UserStats.objects.filter(user__wishlist__bikes=instance)
+    user_ids = list(holders.values_list('pk', flat=True))
+    if user_ids:
+        UserStats.objects.filter(pk__in=user_ids).update(wishlist_count=F('wishlist_count') - 1)
+        for user_id in user_ids:
+            forget_ids(user_id)
+            forget_stats(user_id)
+
+
+@receiver(post_delete, sender=Wishlist)
+def wishlist_deleted(sender, instance, **kwargs):
+    forget_ids(instance.user_id)
+    UserStats.objects.filter(pk=instance.user_id).update(wishlist_count=0)
+    forget_stats(instance.user_id)
@@ -0,0 +1,158 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.bikes.models import BikeModel, Brand
+
+from .models import Review, Wishlist
+
+
+def create_bikes(count=3):
+    brand = Brand.objects.create(name='Yamaha', slug='yamaha')
+    return [
+        BikeModel.objects.create(
+            brand=brand, name=f'R{index}', slug=f'yamaha-r{index}', category='sports', engine_capacity=155, price=450000,
+        )
+        for index in range(count)
+    ]
+
+
+class WishlistTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.bikes = create_bikes()
+        self.user = get_user_model().objects.create_user(email='rider@example.com', username='rider', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def stored_ids(self):
+        return sorted(Wishlist.bikes.through.objects.filter(wishlist__user=self.user).values_list('bikemodel_id', flat=True))
+
+    def wishlist_count(self):
+        self.user.stats.refresh_from_db()
+        return self.user.stats.wishlist_count
+
+
+class WishlistToggleTests(WishlistTestCase):
+    def toggle(self, bike_id):
+        return self.client.post(f'/api/interactions/wishlist/toggle/{bike_id}/')
+
+    def test_toggle_adds_then_removes(self):
+        # The first toggle also creates the wishlist row
+        response = self.toggle(self.bikes[0].pk)
+        self.assertEqual(response.json(), {'status': 'added'})
+        self.assertEqual(self.stored_ids(), [self.bikes[0].pk])
+        self.assertEqual(self.wishlist_count(), 1)
+
+        self.assertEqual(self.toggle(self.bikes[1].pk).json(), {'status': 'added'})
+        self.assertEqual(self.toggle(self.bikes[0].pk).json(), {'status': 'removed'})
+        self.assertEqual(self.stored_ids(), [self.bikes[1].pk])
+        self.assertEqual(self.wishlist_count(), 1)
+
+    def test_unknown_bike(self):
+        response = self.toggle(999999)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.stored_ids(), [])
+        self.assertEqual(self.wishlist_count(), 0)
+
+    def test_requires_login(self):
+        self.assertEqual(APIClient().post(f'/api/interactions/wishlist/toggle/{self.bikes[0].pk}/').status_code, 401)
+
+    def test_sync_replaces_or_merges(self):
+        first, second, third = (bike.pk for bike in self.bikes)
+        self.toggle(first)
+
+        response = self.client.put('/api/interactions/wishlist/sync/', {'bike_ids': [second, third, 999999]}, format='json')
+        self.assertEqual(response.json(), {'added': [second, third], 'removed': [first]})
+        self.assertEqual(self.stored_ids(), [second, third])
+
+        response = self.client.put(
+            '/api/interactions/wishlist/sync/', {'bike_ids': [first, second], 'merge': True}, format='json',
+        )
+        self.assertEqual(response.json(), {'added': [first], 'removed': []})
+        self.assertEqual(self.stored_ids(), [first, second, third])
+        self.assertEqual(self.wishlist_count(), 3)
+
+
+class WishlistIdsTests(WishlistTestCase):
+    def setUp(self):
+        super().setUp()
+        wishlist = Wishlist.objects.create(user=self.user)
+        wishlist.bikes.add(self.bikes[2], self.bikes[0])
+
+    def ids(self):
+        return self.client.get('/api/interactions/wishlist/ids/').json()['ids']
+
+    def test_ids_are_cached_and_dropped_on_writes(self):
+        self.assertEqual(self.ids(), [self.bikes[0].pk, self.bikes[2].pk])
+        with self.assertNumQueries(0):
+            self.ids()
+        self.client.post(f'/api/interactions/wishlist/toggle/{self.bikes[1].pk}/')
+        self.assertEqual(self.ids(), [bike.pk for bike in self.bikes])
+        # ORM edits (admin) drop the cached ids too
+        self.user.wishlist.bikes.remove(self.bikes[0])
+        self.assertEqual(self.ids(), [self.bikes[1].pk, self.bikes[2].pk])
+
+    def test_contains(self):
+        first, second, third = (bike.pk for bike in self.bikes)
+        response = self.client.get('/api/interactions/wishlist/contains/', {'ids': f'{third},{second},{first},999999'})
+        self.assertEqual(response.json(), {'ids': [third, first], 'bitmap': '1010'})
+
+    def test_contains_rejects_bad_ids(self):
+        for ids in ('1,x', ','.join(str(n) for n in range(101))):
+            response = self.client.get('/api/interactions/wishlist/contains/', {'ids': ids})
+            self.assertEqual(response.status_code, 400, ids)
+
+
+class BikeReviewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.bike = create_bikes(1)[0]
+        self.users = [
+            get_user_model().objects.create_user(email=f'rider{index}@example.com', username=f'rider{index}')
+            for index in range(25)
+        ]
+
+    def review(self, user, rating, **fields):
+        return Review.objects.create(bike=self.bike, user=user, rating=rating, comment='Good', **fields)
+
+    def test_summary(self):
+        for user, rating, verified in zip(self.users, (5, 5, 4, 2), (True, False, True, False)):
+            self.review(user, rating, is_verified_purchase=verified)
+        response = self.client.get(f'/api/interactions/bikes/{self.bike.pk}/reviews/summary/')
+        self.assertEqual(response.json(), {
+            'bike_id': self.bike.pk, 'average': 4.0, 'count': 4,
+            'histogram': {'1': 0, '2': 1, '3': 0, '4': 1, '5': 2},
+            'verified_count': 2, 'verified_share': 0.5,
+        })
+
+    def test_summary_of_unreviewed_and_missing_bikes(self):
+        response = self.client.get(f'/api/interactions/bikes/{self.bike.pk}/reviews/summary/')
+        self.assertEqual((response.json()['count'], response.json()['verified_share']), (0, 0.0))
+        self.assertEqual(self.client.get('/api/interactions/bikes/999999/reviews/summary/').status_code, 404)
+
+    def test_cursor_pages_newest_first(self):
+        reviews = [self.review(user, 4) for user in self.users]
+        response = self.client.get(f'/api/interactions/bikes/{self.bike.pk}/reviews/')
+        page = response.json()
+        self.assertEqual(len(page['results']), 20)
+        self.assertIsNone(page['previous'])
+
+        # A review posted between the two requests does not shift the next page
+        extra_user = get_user_model().objects.create_user(email='late@example.com', username='late')
+        self.review(extra_user, 3)
+        second = self.client.get(page['next']).json()
+        self.assertIsNone(second['next'])
+        ids = [review['id'] for review in page['results'] + second['results']]
+        self.assertEqual(ids, [review.pk for review in reversed(reviews)])
+
+    def test_post_review(self):
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        response = client.post(
+            f'/api/interactions/bikes/{self.bike.pk}/reviews/', {'rating': 5, 'comment': 'Great'}, format='json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.bike.refresh_from_db()
+        self.assertEqual((self.bike.user_rating_count, self.bike.user_rating_avg), (1, 5.0))
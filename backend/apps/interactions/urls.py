@@ -3,6 +3,10 @@ from . import views
 
 urlpatterns = [
     path('bikes/<int:bike_id>/reviews/', views.BikeReviewListView.as_view(), name='bike-reviews'),
+    path('bikes/<int:bike_id>/reviews/summary/', views.BikeReviewSummaryView.as_view(), name='bike-review-summary'),
     path('wishlist/', views.UserWishlistView.as_view(), name='user-wishlist'),
     path('wishlist/toggle/<int:bike_id>/', views.WishlistToggleView.as_view(), name='wishlist-toggle'),
+    path('wishlist/ids/', views.WishlistIdsView.as_view(), name='wishlist-ids'),
+    path('wishlist/contains/', views.WishlistContainsView.as_view(), name='wishlist-contains'),
+    path('wishlist/sync/', views.WishlistSyncView.as_view(), name='wishlist-sync'),
 ]
@@ -1,46 +1,120 @@
 from rest_framework import generics, permissions, status
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.db.models import Prefetch, prefetch_related_objects
 from django.shortcuts import get_object_or_404
 from .models import Review, Wishlist
-from .serializers import ReviewSerializer, WishlistSerializer
+from .serializers import ReviewSerializer, WishlistContainsSerializer, WishlistSerializer, WishlistSyncSerializer
+from . import wishlist as wishlist_store
 from apps.bikes.models import BikeModel
+from apps.bikes.ratings import USER_RATING_FIELDS
+from core.throttling import SharedScopedRateThrottle
+
+class ReviewCursorPagination(CursorPagination):
+    """Keyset pages: each page is an index range scan, however deep the client goes."""
+    ordering = ('-created_at', '-id')
+    page_size = 20
 
 class BikeReviewListView(generics.ListCreateAPIView):
     serializer_class = ReviewSerializer
+    pagination_class = ReviewCursorPagination
+    throttle_scope = 'review_create'
     
     def get_queryset(self):
-        return Review.objects.filter(bike_id=self.kwargs['bike_id'])
+        return Review.objects.filter(bike_id=self.kwargs['bike_id']).select_related('user')
     
     def get_permissions(self):
         if self.request.method == 'POST':
             return [permissions.IsAuthenticated()]
         return [permissions.AllowAny()]
 
+    def get_throttles(self):
+        if self.request.method == 'POST':
+            return [SharedScopedRateThrottle()]
+        return []
+
     def perform_create(self, serializer):
         bike = get_object_or_404(BikeModel, pk=self.kwargs['bike_id'])
         serializer.save(user=self.request.user, bike=bike)
 
+class BikeReviewSummaryView(APIView):
+    """
+    Average, count and 1-5 histogram from the aggregates stored on the bike,
+    plus the verified-purchase share from an index-only count.
+    """
+    permission_classes = [permissions.AllowAny]
+    response_cache_tags = ('bikes.BikeModel', 'interactions.Review')
+
+    def get(self, request, bike_id):
+        bike = get_object_or_404(
+            BikeModel.objects.only('id', *USER_RATING_FIELDS), pk=bike_id,
+        )
+        count = bike.user_rating_count
+        verified = Review.objects.filter(bike_id=bike_id, is_verified_purchase=True).count() if count else 0
+        return Response({
+            "bike_id": bike.pk,
+            "average": round(bike.user_rating_avg, 2),
+            "count": count,
+            "histogram": bike.rating_histogram,
+            "verified_count": verified,
+            "verified_share": round(verified / count, 4) if count else 0.0,
+        })
+
 class WishlistToggleView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, bike_id):
-        bike = get_object_or_404(BikeModel, pk=bike_id)
-        wishlist, created = Wishlist.objects.get_or_create(user=request.user)
-        
-        if wishlist.bikes.filter(pk=bike_id).exists():
-            wishlist.bikes.remove(bike)
-            status_msg = "removed"
-        else:
-            wishlist.bikes.add(bike)
-            status_msg = "added"
-            
+        # One conditional delete-or-insert on the M2M table (see wishlist.toggle)
+        status_msg = wishlist_store.toggle(request.user, bike_id)
+        if status_msg is None:
+            return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
         return Response({"status": status_msg}, status=status.HTTP_200_OK)
 
+class WishlistSyncView(APIView):
+    """
+    Replace the wishlist with the given bike ids, or merge them into it
+    (e.g. a guest's local wishlist after login) with merge=true.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def put(self, request):
+        serializer = WishlistSyncSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        added, removed = wishlist_store.sync(
+            request.user, serializer.validated_data['bike_ids'], merge=serializer.validated_data['merge'],
+        )
+        return Response({"added": added, "removed": removed}, status=status.HTTP_200_OK)
+
+class WishlistIdsView(APIView):
+    """Just the wishlisted bike ids, for clients that only need to mark cards."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response({"ids": wishlist_store.get_ids(request.user.pk)})
+
+class WishlistContainsView(APIView):
+    """
+    Which of ?ids=1,2,3 are on the wishlist: `ids` lists the matches and
+    `bitmap` has one '1'/'0' per requested id, in request order.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        serializer = WishlistContainsSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        requested = serializer.validated_data['ids']
+        found = set(wishlist_store.contains(request.user.pk, requested))
+        return Response({
+            "ids": [bike_id for bike_id in requested if bike_id in found],
+            "bitmap": ''.join('1' if bike_id in found else '0' for bike_id in requested),
+        })
+
 class UserWishlistView(generics.RetrieveAPIView):
     serializer_class = WishlistSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
         wishlist, created = Wishlist.objects.get_or_create(user=self.request.user)
+        prefetch_related_objects([wishlist], Prefetch('bikes', BikeModel.objects.select_related('brand')))
         return wishlist
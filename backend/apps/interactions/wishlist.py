@@ -0,0 +1,184 @@
+from bisect import bisect_left
+from typing import Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.bikes.models import BikeModel
+from apps.trending.store import record_event
+from apps.users.stats import adjust as adjust_stats
+
+from .models import Wishlist
+
+Through = Wishlist.bikes.through
+
+
+def _tables():
+    return {
+        'through': Through._meta.db_table,
+        'wishlist_col': Through._meta.get_field('wishlist').column,
+        'bike_col': Through._meta.get_field('bikemodel').column,
+        'wishlist': Wishlist._meta.db_table,
+        'bike': BikeModel._meta.db_table,
+    }
+
+
+# PostgreSQL runs the whole toggle as one statement: the insert only happens
+# when the delete found nothing, and both see the same snapshot.
+TOGGLE_POSTGRES = """
+WITH wl AS (SELECT id FROM {wishlist} WHERE user_id = %(user)s),
+del AS (
+    DELETE FROM {through} t USING wl
+    WHERE t.{wishlist_col} = wl.id AND t.{bike_col} = %(bike)s
+    RETURNING 1
+),
+ins AS (
+    INSERT INTO {through} ({wishlist_col}, {bike_col})
+    SELECT wl.id, b.id FROM wl, {bike} b
+    WHERE b.id = %(bike)s AND NOT EXISTS (SELECT 1 FROM del)
+    ON CONFLICT DO NOTHING
+    RETURNING 1
+),
+touch AS (
+    UPDATE {wishlist} SET updated_at = %(now)s
+    WHERE id IN (SELECT id FROM wl) AND (EXISTS (SELECT 1 FROM del) OR EXISTS (SELECT 1 FROM ins))
+)
+SELECT (SELECT count(*) FROM del), (SELECT count(*) FROM ins)
+"""
+
+DELETE_ONE = """
+DELETE FROM {through}
+WHERE {wishlist_col} IN (SELECT id FROM {wishlist} WHERE user_id = %(user)s) AND {bike_col} = %(bike)s
+"""
+
+INSERT_ONE = """
+INSERT INTO {through} ({wishlist_col}, {bike_col})
+SELECT w.id, b.id FROM {wishlist} w, {bike} b
+WHERE w.user_id = %(user)s AND b.id = %(bike)s
+ON CONFLICT DO NOTHING
+"""
+
+TOUCH = "UPDATE {wishlist} SET updated_at = %(now)s WHERE user_id = %(user)s"
+
+
+def _toggle_statement(user_id: int, bike_id: int) -> Optional[str]:
+    params = {'user': user_id, 'bike': bike_id, 'now': timezone.now()}
+    tables = _tables()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(TOGGLE_POSTGRES.format(**tables), params)
+            deleted, inserted = cursor.fetchone()
+        else:
+            with transaction.atomic():
+                cursor.execute(DELETE_ONE.format(**tables), params)
+                deleted, inserted = cursor.rowcount, 0
+                if not deleted:
+                    cursor.execute(INSERT_ONE.format(**tables), params)
+                    inserted = cursor.rowcount
+                if deleted or inserted:
+                    cursor.execute(TOUCH.format(**tables), params)
+    if deleted:
+        return 'removed'
+    if inserted:
+        return 'added'
+    return None
+
+
+@transaction.atomic
+def toggle(user, bike_id: int) -> Optional[str]:
+    """
+    Add or remove one bike straight on the M2M table. Returns 'added',
+    'removed', or None when the bike does not exist.
+    """
+    result = _toggle_statement(user.pk, bike_id)
+    if result is None:
+        # Nothing matched: either the bike is unknown or this user has no wishlist row yet
+        if not BikeModel.objects.filter(pk=bike_id).exists():
+            return None
+        Wishlist.objects.get_or_create(user=user)
+        result = _toggle_statement(user.pk, bike_id)
+    wishlist_changed(user.pk, added=[bike_id] if result == 'added' else (), removed=[bike_id] if result == 'removed' else ())
+    return result
+
+
+def _id_params(ids) -> Tuple[str, list]:
+    return ', '.join(['%s'] * len(ids)), list(ids)
+
+
+def sync(user, bike_ids: Iterable[int], merge: bool = False) -> Tuple[List[int], List[int]]:
+    """
+    Make the stored wishlist equal to `bike_ids` (or their union with it when
+    `merge`), in one DELETE and one INSERT ... SELECT. Unknown bike ids are
+    ignored. Returns (added ids, removed ids).
+    """
+    bike_ids = sorted(set(bike_ids))
+    wishlist, _ = Wishlist.objects.get_or_create(user=user)
+    tables = _tables()
+    removed, added = [], []
+    with transaction.atomic(), connection.cursor() as cursor:
+        if not merge:
+            placeholders, params = _id_params(bike_ids)
+            keep = f"AND {tables['bike_col']} NOT IN ({placeholders})" if bike_ids else ''
+            cursor.execute(
+                f"DELETE FROM {tables['through']} WHERE {tables['wishlist_col']} = %s {keep} "
+                f"RETURNING {tables['bike_col']}",
+                [wishlist.pk, *params],
+            )
+            removed = sorted(row[0] for row in cursor.fetchall())
+        if bike_ids:
+            placeholders, params = _id_params(bike_ids)
+            cursor.execute(
+                f"INSERT INTO {tables['through']} ({tables['wishlist_col']}, {tables['bike_col']}) "
+                f"SELECT %s, id FROM {tables['bike']} WHERE id IN ({placeholders}) "
+                f"ON CONFLICT DO NOTHING RETURNING {tables['bike_col']}",
+                [wishlist.pk, *params],
+            )
+            added = sorted(row[0] for row in cursor.fetchall())
+        if added or removed:
+            Wishlist.objects.filter(pk=wishlist.pk).update(updated_at=timezone.now())
+        wishlist_changed(user.pk, added=added, removed=removed)
+    return added, removed
+
+
+def ids_cache_key(user_id: int) -> str:
+    return f"wishlist:ids:{user_id}"
+
+
+def get_ids(user_id: int) -> List[int]:
+    """Sorted ids of the user's wishlisted bikes, from the cache or one query on the through table."""
+    key = ids_cache_key(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = sorted(Through.objects.filter(wishlist__user_id=user_id).values_list('bikemodel_id', flat=True))
+        cache.set(key, ids, settings.WISHLIST_IDS_CACHE_SECONDS)
+    return ids
+
+
+def contains(user_id: int, bike_ids: Iterable[int]) -> List[int]:
+    """The subset of `bike_ids` on the user's wishlist, in the order given."""
+    stored = get_ids(user_id)
+    found = []
+    for bike_id in bike_ids:
+        position = bisect_left(stored, bike_id)
+        if position < len(stored) and stored[position] == bike_id:
+            found.append(bike_id)
+    return found
+
+
+def forget_ids(user_id: int):
+    key = ids_cache_key(user_id)
+    cache.delete(key)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: cache.delete(key))
+
+
+def wishlist_changed(user_id: int, added=(), removed=()):
+    """Side effects of wishlist writes; raw SQL sends no m2m_changed."""
+    if added or removed:
+        # Dropped rather than patched, so concurrent toggles cannot leave a wrong array behind
+        forget_ids(user_id)
+        adjust_stats(user_id, wishlist_count=len(added) - len(removed))
+    for bike_id in added:
+        record_event('bikes', bike_id, None, event='wishlist')
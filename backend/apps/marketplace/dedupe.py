@@ -0,0 +1,183 @@
+import hashlib
+import logging
+import math
+import random
+import re
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set
+
+from django.db import close_old_connections, transaction
+from django.db.models import Count
+
+from core.response_cache import invalidate_tags
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Estimated Jaccard similarity above which a listing is flagged as a repost.
+# With 16 bands of 4 rows, pairs at 0.8 collide in some band with ~99.9%
+# probability while pairs below 0.3 rarely become candidates at all.
+DUPLICATE_THRESHOLD = 0.8
+MAX_CANDIDATES = 50
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(0x6D72626B)  # fixed seed: signatures must be stable across processes
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+FEATURE_WEIGHT = 3
+
+# Signatures cost milliseconds of pure Python per listing, so they are
+# computed after the save commits. One thread: each listing is compared
+# against the fingerprints of those indexed before it.
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='listing-dedupe')
+
+
+def _hash64(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def listing_shingles(listing) -> Set[str]:
+    """Word 3-shingles of title + description, plus weighted model/price/year features."""
+    words = re.findall(r'[a-z0-9]+', f"{listing.title} {listing.description}".lower())
+    if len(words) >= 3:
+        shingles = {' '.join(words[i:i + 3]) for i in range(len(words) - 2)}
+    else:
+        shingles = set(words)
+
+    model = listing.bike_model_id or f"{listing.custom_brand or ''}/{listing.custom_model or ''}".lower()
+    price_bucket = int(math.log(max(float(listing.price), 1.0)) / math.log(1.05))
+    features = [f"model:{model}", f"year:{listing.manufacturing_year}", f"price:{price_bucket}"]
+    for feature in features:
+        shingles.update(f"{feature}#{i}" for i in range(FEATURE_WEIGHT))
+    return shingles
+
+
+def minhash(shingles: Iterable[str]) -> List[int]:
+    hashes = [_hash64(s) for s in shingles]
+    if not hashes:
+        return [_MAX_HASH] * NUM_PERM
+    return [
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def pack(signature: List[int]) -> bytes:
+    return array('I', signature).tobytes()
+
+
+def unpack(data) -> List[int]:
+    signature = array('I')
+    signature.frombytes(bytes(data))
+    return signature.tolist()
+
+
+def band_keys(signature: List[int]) -> List[int]:
+    """One LSH bucket key per band, as signed 63-bit ints for a BigIntegerField."""
+    keys = []
+    for band in range(BANDS):
+        rows = array('I', signature[band * ROWS:(band + 1) * ROWS]).tobytes()
+        digest = hashlib.blake2b(bytes([band]) + rows, digest_size=8).digest()
+        keys.append(int.from_bytes(digest, 'little') >> 1)
+    return keys
+
+
+def similarity(a: List[int], b: List[int]) -> float:
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+def find_duplicate(listing_id: int, signature: List[int], keys: List[int]) -> Optional[int]:
+    """Return the canonical listing id this signature most likely duplicates."""
+    from .models import ListingFingerprint, ListingLSHBucket, UsedBikeListing
+
+    # Listings sharing the most bands are the most similar ones
+    candidate_ids = list(
+        ListingLSHBucket.objects.filter(key__in=keys, listing_id__lt=listing_id)
+        .values('listing_id').annotate(shared=Count('id')).order_by('-shared', 'listing_id')
+        .values_list('listing_id', flat=True)[:MAX_CANDIDATES]
+    )
+    if not candidate_ids:
+        return None
+
+    best_id, best_score = None, DUPLICATE_THRESHOLD
+    for fingerprint in ListingFingerprint.objects.filter(listing_id__in=candidate_ids):
+        score = similarity(signature, unpack(fingerprint.signature))
+        if score >= best_score:
+            best_id, best_score = fingerprint.listing_id, score
+    if best_id is None:
+        return None
+    canonical = UsedBikeListing.objects.filter(pk=best_id).values_list('duplicate_of_id', flat=True).first()
+    return canonical or best_id
+
+
+def index_listing(listing):
+    """Fingerprint a listing, replace its LSH buckets and flag it if it is a repost."""
+    from .models import ListingFingerprint, ListingLSHBucket, UsedBikeListing
+
+    signature = minhash(listing_shingles(listing))
+    keys = band_keys(signature)
+    duplicate_of = find_duplicate(listing.pk, signature, keys)
+
+    ListingFingerprint.objects.update_or_create(listing_id=listing.pk, defaults={'signature': pack(signature)})
+    ListingLSHBucket.objects.filter(listing_id=listing.pk).delete()
+    ListingLSHBucket.objects.bulk_create([ListingLSHBucket(listing_id=listing.pk, key=key) for key in keys])
+
+    if duplicate_of != listing.duplicate_of_id:
+        UsedBikeListing.objects.filter(pk=listing.pk).update(duplicate_of=duplicate_of)
+        listing.duplicate_of_id = duplicate_of
+        invalidate_tags('marketplace.UsedBikeListing')
+    return duplicate_of
+
+
+def index_listings(listing_ids: List[int]):
+    from .models import UsedBikeListing
+
+    for listing in UsedBikeListing.objects.filter(pk__in=listing_ids).order_by('pk'):
+        index_listing(listing)
+
+
+def _run(listing_ids):
+    try:
+        index_listings(listing_ids)
+    except Exception:
+        logger.exception("Fingerprinting listings %s failed", listing_ids)
+    finally:
+        close_old_connections()
+
+
+def enqueue_listings(listing_ids: List[int]):
+    """
+    Drop the listings' fingerprints now and recompute them on a background
+    thread once the current transaction commits. A job lost with its worker
+    leaves the listings without a fingerprint, which `dedupe_listings` fills in.
+    """
+    from .models import ListingFingerprint, ListingLSHBucket
+
+    listing_ids = list(listing_ids)
+    if not listing_ids:
+        return
+    ListingFingerprint.objects.filter(listing_id__in=listing_ids).delete()
+    ListingLSHBucket.objects.filter(listing_id__in=listing_ids).delete()
+    transaction.on_commit(lambda: _executor.submit(_run, listing_ids))
+
+
+class UnionFind:
+    def __init__(self):
+        self.parent: Dict[int, int] = {}
+
+    def find(self, x: int) -> int:
+        self.parent.setdefault(x, x)
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a: int, b: int):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            # The oldest listing (lowest id) is the cluster's canonical row
+            self.parent[max(ra, rb)] = min(ra, rb)
@@ -0,0 +1,177 @@
+import json
+import math
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+GAZETTEER_PATH = Path(__file__).resolve().parent / 'data' / 'bd_gazetteer.json'
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+# Words people add around a place name that never identify the place itself
+NOISE_TOKENS = {
+    'bangladesh', 'bd', 'city', 'town', 'sadar', 'district', 'zila', 'zilla',
+    'division', 'upazila', 'thana', 'area', 'metro', 'metropolitan',
+}
+MAX_ALIAS_TOKENS = 3
+
+
+@dataclass(frozen=True)
+class Place:
+    """A resolved gazetteer entry. `upazila` is empty for district-level matches."""
+    district_id: int
+    district: str
+    division: str
+    latitude: float
+    longitude: float
+    upazila: str = ''
+
+
+def _tokenize(text: str) -> List[str]:
+    text = re.sub(r"['’`]", '', text.lower())
+    return [t for t in re.split(r'[^a-z0-9]+', text) if t and t not in NOISE_TOKENS]
+
+
+def _key(text: str) -> str:
+    return ' '.join(_tokenize(text))
+
+
+@lru_cache(maxsize=1)
+def load_gazetteer():
+    """
+    Load the bundled gazetteer and build alias lookup tables.
+    Returns (districts by id, district aliases, upazila aliases).
+    """
+    with open(GAZETTEER_PATH, encoding='utf-8') as f:
+        data = json.load(f)
+
+    divisions = {d['id']: d['name'] for d in data['divisions']}
+    districts: Dict[int, Place] = {}
+    district_index: Dict[str, int] = {}
+    for row in data['districts']:
+        districts[row['id']] = Place(
+            district_id=row['id'],
+            district=row['name'],
+            division=divisions[row['division_id']],
+            latitude=row['latitude'],
+            longitude=row['longitude'],
+        )
+        for alias in [row['name'], *row['aliases']]:
+            district_index[_key(alias)] = row['id']
+
+    upazila_index: Dict[str, List[Place]] = {}
+    for row in data['upazilas']:
+        district = districts[row['district_id']]
+        place = Place(
+            district_id=district.district_id,
+            district=district.district,
+            division=district.division,
+            latitude=row['latitude'],
+            longitude=row['longitude'],
+            upazila=row['name'],
+        )
+        for alias in [row['name'], *row['aliases']]:
+            upazila_index.setdefault(_key(alias), []).append(place)
+
+    return districts, district_index, upazila_index
+
+
+def get_district(district_id: int) -> Optional[Place]:
+    districts, _, _ = load_gazetteer()
+    return districts.get(district_id)
+
+
+@lru_cache(maxsize=4096)
+def normalize_location(text: str) -> Optional[Place]:
+    """
+    Map free-text location ("Mirpur, Dhaka", "dhaka city", "Comilla") to the
+    most specific gazetteer place. Upazila names shared by several districts
+    are disambiguated by a district mentioned in the same text.
+    """
+    if not text:
+        return None
+    districts, district_index, upazila_index = load_gazetteer()
+    tokens = _tokenize(text)
+
+    district_ids: List[int] = []
+    upazilas: List[Place] = []
+    i = 0
+    while i < len(tokens):
+        for size in range(min(MAX_ALIAS_TOKENS, len(tokens) - i), 0, -1):
+            key = ' '.join(tokens[i:i + size])
+            if key in upazila_index or key in district_index:
+                upazilas.extend(upazila_index.get(key, []))
+                if key in district_index:
+                    district_ids.append(district_index[key])
+                i += size
+                break
+        else:
+            i += 1
+
+    for place in upazilas:
+        if place.district_id in district_ids:
+            return place
+    if district_ids:
+        return districts[district_ids[0]]
+    if upazilas:
+        return upazilas[0]
+    return None
+
+
+def parse_point(value: str) -> Optional[Tuple[float, float]]:
+    """Parse "lat,lon" or a place name into coordinates."""
+    parts = value.split(',')
+    if len(parts) == 2:
+        try:
+            lat, lon = float(parts[0]), float(parts[1])
+        except ValueError:
+            pass
+        else:
+            if -90 <= lat <= 90 and -180 <= lon <= 180:
+                return lat, lon
+    place = normalize_location(value)
+    if place:
+        return place.latitude, place.longitude
+    return None
+
+
+def bounding_box(lat: float, lon: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """Return (min_lat, max_lat, min_lon, max_lon) enclosing the search circle."""
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    dlon = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def distance_expression(lat: float, lon: float):
+    """Haversine distance in km from (lat, lon) to each row's latitude/longitude."""
+    dlat = Radians(F('latitude') - Value(lat)) / 2
+    dlon = Radians(F('longitude') - Value(lon)) / 2
+    a = Power(Sin(dlat), 2) + Cos(Value(math.radians(lat))) * Cos(Radians(F('latitude'))) * Power(Sin(dlon), 2)
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(a, output_field=FloatField()))
+
+
+def filter_within(queryset, lat: float, lon: float, radius_km: float):
+    """
+    Restrict to rows within radius_km of (lat, lon). The bounding box is an
+    indexed range scan; the haversine refine only runs on rows inside it.
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    return (
+        queryset
+        .filter(latitude__range=(min_lat, max_lat), longitude__range=(min_lon, max_lon))
+        .annotate(distance_km=distance_expression(lat, lon))
+        .filter(distance_km__lte=radius_km)
+    )
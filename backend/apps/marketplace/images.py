@@ -0,0 +1,118 @@
+import base64
+import hashlib
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageFilter, ImageOps, features
+
+from core.response_cache import invalidate_tags
+
+logger = logging.getLogger(__name__)
+
+FORMAT_OPTIONS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'avif': {'format': 'AVIF', 'quality': 55},
+}
+CONTENT_TYPES = {'webp': 'image/webp', 'avif': 'image/avif'}
+PLACEHOLDER_WIDTH = 16
+
+_executor = ThreadPoolExecutor(max_workers=settings.LISTING_IMAGE_WORKERS, thread_name_prefix='listing-images')
+
+
+def output_formats():
+    return [fmt for fmt in settings.LISTING_IMAGE_FORMATS if fmt != 'avif' or features.check('avif')]
+
+
+def encode(image: Image.Image, fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, **FORMAT_OPTIONS[fmt])
+    return buffer.getvalue()
+
+
+def blur_placeholder(image: Image.Image) -> str:
+    """A ~16px blurred WebP as a data URI, small enough to inline in list responses."""
+    tiny = image.copy()
+    tiny.thumbnail((PLACEHOLDER_WIDTH, PLACEHOLDER_WIDTH))
+    tiny = tiny.filter(ImageFilter.GaussianBlur(1))
+    buffer = io.BytesIO()
+    tiny.save(buffer, format='WEBP', quality=30)
+    return 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def process_image(image_id: int, source: bytes = None):
+    """
+    Generate thumb/card/full variants of one ListingImage in every configured
+    format, upload them to the image storage and mark the image ready.
+    """
+    from .models import ListingImage, ListingImageVariant
+    from .storage import get_image_storage
+
+    image_row = ListingImage.objects.filter(pk=image_id).first()
+    if image_row is None:
+        # Deleted (with its listing, or replaced by a re-ingest) before the job ran
+        return
+    storage = get_image_storage()
+    try:
+        if source is None:
+            source = storage.read(image_row.source_url or image_row.image_url)
+
+        original = ImageOps.exif_transpose(Image.open(io.BytesIO(source)))
+        original = original.convert('RGB')
+        source_hash = hashlib.sha256(source).hexdigest()
+
+        variants = []
+        for kind, max_edge in settings.LISTING_IMAGE_VARIANTS.items():
+            resized = original.copy()
+            resized.thumbnail((max_edge, max_edge), Image.LANCZOS)
+            for fmt in output_formats():
+                content = encode(resized, fmt)
+                key = f"listings/{image_row.listing_id}/{source_hash[:20]}/{kind}.{fmt}"
+                variants.append(ListingImageVariant(
+                    image=image_row,
+                    kind=kind,
+                    format=fmt,
+                    url=storage.save(key, content, CONTENT_TYPES[fmt]),
+                    width=resized.width,
+                    height=resized.height,
+                    size_bytes=len(content),
+                    content_hash=hashlib.sha256(content).hexdigest(),
+                ))
+    except Exception:
+        logger.exception("Processing listing image %s failed", image_id)
+        ListingImage.objects.filter(pk=image_id).update(processing_status='failed')
+        invalidate_tags('marketplace.ListingImage')
+        return
+
+    with transaction.atomic():
+        ListingImageVariant.objects.filter(image=image_row).delete()
+        ListingImageVariant.objects.bulk_create(variants)
+        full = next((v for v in variants if v.kind == 'full' and v.format == 'webp'), variants[-1])
+        ListingImage.objects.filter(pk=image_id).update(
+            image_url=image_row.image_url or full.url,
+            width=original.width,
+            height=original.height,
+            content_hash=source_hash,
+            placeholder=blur_placeholder(original),
+            processing_status='ready',
+        )
+        invalidate_tags('marketplace.ListingImage')
+
+
+def _run(image_id, source):
+    try:
+        process_image(image_id, source)
+    finally:
+        close_old_connections()
+
+
+def enqueue_image(image_id: int, source: bytes = None):
+    """
+    Process an image on a background thread once the current transaction commits.
+    `source` only saves re-reading the original: it must already be in storage
+    (source_url or image_url), so a job lost with its worker is picked up again
+    by `process_listing_images`.
+    """
+    transaction.on_commit(lambda: _executor.submit(_run, image_id, source))
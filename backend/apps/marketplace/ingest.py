@@ -0,0 +1,133 @@
+from django.db import transaction
+from django.utils import timezone
+
+from apps.bikes.models import BikeModel
+from apps.users.stats import refresh_stats
+from core.response_cache import invalidate_tags
+from .dedupe import enqueue_listings
+from .images import enqueue_image
+from .models import ListingImage, UsedBikeListing
+from .pricing import stat_entry, update_price_stats
+from .ranking import compute_rank_score
+from .serializers import BulkListingItemSerializer
+from .signals import FINGERPRINT_FIELDS, current_values
+
+INGEST_FIELDS = [
+    'bike_model_id', 'custom_brand', 'custom_model', 'title', 'price', 'mileage', 'manufacturing_year',
+    'registration_year', 'condition', 'description', 'location',
+]
+
+
+def _image_key(images):
+    return [(image['image_url'], image.get('is_primary', index == 0), image.get('order', index))
+            for index, image in enumerate(images)]
+
+
+def validate_rows(rows):
+    """Validate every row in one pass. Returns (valid rows by index, per-row errors)."""
+    requested = {row.get('bike_model') for row in rows if isinstance(row, dict)}
+    requested = {int(pk) for pk in requested if str(pk).isdigit()}
+    context = {'bike_model_ids': set(BikeModel.objects.filter(pk__in=requested).values_list('pk', flat=True))}
+
+    valid, errors, seen = {}, [], set()
+    for index, row in enumerate(rows):
+        serializer = BulkListingItemSerializer(data=row, context=context)
+        if not serializer.is_valid():
+            errors.append({'row': index, 'external_id': row.get('external_id') if isinstance(row, dict) else None,
+                           'errors': serializer.errors})
+            continue
+        external_id = serializer.validated_data['external_id']
+        if external_id in seen:
+            errors.append({'row': index, 'external_id': external_id,
+                           'errors': {'external_id': ['Duplicate external_id in this upload.']}})
+            continue
+        seen.add(external_id)
+        valid[index] = serializer.validated_data
+    return valid, errors
+
+
+def ingest_listings(seller, rows):
+    """
+    Upsert a dealer's listings keyed by external_id. Unchanged rows are left
+    untouched; new rows and their images are inserted with bulk_create.
+    """
+    valid, errors = validate_rows(rows)
+    existing = {
+        listing.external_id: listing
+        for listing in UsedBikeListing.objects.filter(
+            seller=seller, external_id__in=[data['external_id'] for data in valid.values()]
+        ).prefetch_related('images')
+    }
+
+    now = timezone.now()
+    to_create, to_update, new_images, replaced_images = [], [], {}, []
+    results = []
+    for index, data in valid.items():
+        images = data.pop('images', None)
+        listing = existing.get(data['external_id'])
+        if listing is None:
+            listing = UsedBikeListing(seller=seller, **data)
+            listing.apply_location()
+            listing.photo_count = len(images or [])
+            listing.rank_score = compute_rank_score(listing, listing.photo_count)
+            to_create.append(listing)
+            new_images[index] = images or []
+            results.append({'row': index, 'external_id': data['external_id'], 'listing': listing, 'action': 'created'})
+            continue
+
+        changed = [name for name in INGEST_FIELDS if name in data and getattr(listing, name) != data[name]]
+        images_changed = images is not None and _image_key(images) != _image_key(
+            [{'image_url': i.image_url, 'is_primary': i.is_primary, 'order': i.order} for i in listing.images.all()]
+        )
+        if changed or images_changed:
+            listing._previous_values = current_values(listing)
+            for name in changed:
+                setattr(listing, name, data[name])
+            listing.apply_location()
+            if images_changed:
+                listing.photo_count = len(images)
+            listing.rank_score = compute_rank_score(listing, listing.photo_count)
+            listing.updated_at = now
+            to_update.append(listing)
+        if images_changed:
+            replaced_images.append(listing.pk)
+            new_images[index] = images
+        action = 'updated' if changed or images_changed else 'unchanged'
+        results.append({'row': index, 'external_id': data['external_id'], 'listing': listing, 'action': action})
+
+    with transaction.atomic():
+        ListingImage.objects.filter(listing_id__in=replaced_images).delete()
+        UsedBikeListing.objects.bulk_create(to_create, batch_size=500)
+        if to_update:
+            UsedBikeListing.objects.bulk_update(
+                to_update,
+                INGEST_FIELDS + ['district_id', 'latitude', 'longitude', 'photo_count', 'rank_score', 'updated_at'],
+                batch_size=500,
+            )
+        by_row = {result['row']: result['listing'] for result in results}
+        created_images = ListingImage.objects.bulk_create([
+            ListingImage(listing=by_row[index], image_url=image['image_url'],
+                         is_primary=image.get('is_primary', position == 0), order=image.get('order', position))
+            for index, images in new_images.items() for position, image in enumerate(images)
+        ], batch_size=1000)
+        for image in created_images:
+            enqueue_image(image.pk)
+
+        # bulk_create/bulk_update skip post_save, so apply its side effects here
+        invalidate_tags('marketplace.UsedBikeListing', 'marketplace.ListingImage')
+        update_price_stats(
+            added=filter(None, (stat_entry(current_values(l)) for l in to_create + to_update)),
+            removed=filter(None, (stat_entry(l._previous_values) for l in to_update)),
+        )
+        if to_create or to_update:
+            refresh_stats([seller.pk])
+
+    enqueue_listings([listing.pk for listing in to_create] + [
+        listing.pk for listing in to_update
+        if any(listing._previous_values[name] != getattr(listing, name) for name in FINGERPRINT_FIELDS)
+    ])
+
+    for result in results:
+        result['id'] = result.pop('listing').pk
+    counts = {action: sum(r['action'] == action for r in results) for action in ('created', 'updated', 'unchanged')}
+    return {**counts, 'results': sorted(results, key=lambda r: r['row']), 'errors': errors}
@@ -0,0 +1,86 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from apps.marketplace.dedupe import (
+    DUPLICATE_THRESHOLD, UnionFind, band_keys, listing_shingles, minhash, pack, similarity, unpack,
+)
+from apps.marketplace.models import ListingFingerprint, ListingLSHBucket, UsedBikeListing
+from core.batching import keyset_batches
+from core.response_cache import invalidate_tags
+
+
+class Command(BaseCommand):
+    help = "Fingerprint listings without a MinHash signature and cluster near-duplicates across the backlog."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--rebuild', action='store_true', help="Recompute every fingerprint")
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            ListingFingerprint.objects.all().delete()
+            ListingLSHBucket.objects.all().delete()
+
+        fingerprinted = 0
+        missing = UsedBikeListing.objects.filter(fingerprint__isnull=True)
+        for ids in keyset_batches(missing, options['batch_size']):
+            fingerprints, buckets = [], []
+            for listing in UsedBikeListing.objects.filter(id__in=ids):
+                signature = minhash(listing_shingles(listing))
+                fingerprints.append(ListingFingerprint(listing_id=listing.id, signature=pack(signature)))
+                buckets.extend(ListingLSHBucket(listing_id=listing.id, key=key) for key in band_keys(signature))
+            with transaction.atomic():
+                # Buckets left over from a fingerprint that was dropped for recomputing
+                ListingLSHBucket.objects.filter(listing_id__in=ids).delete()
+                ListingFingerprint.objects.bulk_create(fingerprints, ignore_conflicts=True)
+                ListingLSHBucket.objects.bulk_create(buckets, batch_size=5000)
+            fingerprinted += len(fingerprints)
+
+        # Only buckets shared by two or more listings can produce candidate pairs
+        clusters = UnionFind()
+        signatures = {}
+        shared = ListingLSHBucket.objects.values('key').annotate(n=Count('id')).filter(n__gt=1).values_list('key', flat=True)
+        members = defaultdict(list)
+        for key, listing_id in (
+            ListingLSHBucket.objects.filter(key__in=shared).order_by('key', 'listing_id').values_list('key', 'listing_id').iterator()
+        ):
+            members[key].append(listing_id)
+
+        for listing_ids in members.values():
+            unseen = [i for i in listing_ids if i not in signatures]
+            for fp in ListingFingerprint.objects.filter(listing_id__in=unseen):
+                signatures[fp.listing_id] = unpack(fp.signature)
+            for i, a in enumerate(listing_ids):
+                for b in listing_ids[i + 1:]:
+                    if clusters.find(a) != clusters.find(b) and similarity(signatures[a], signatures[b]) >= DUPLICATE_THRESHOLD:
+                        clusters.union(a, b)
+
+        canonical = defaultdict(list)
+        for listing_id in list(clusters.parent):
+            root = clusters.find(listing_id)
+            if root != listing_id:
+                canonical[root].append(listing_id)
+
+        flagged = 0
+        duplicates = {listing_id for duplicate_ids in canonical.values() for listing_id in duplicate_ids}
+        with transaction.atomic():
+            for root, duplicate_ids in canonical.items():
+                flagged += UsedBikeListing.objects.filter(id__in=duplicate_ids).update(duplicate_of=root)
+            # Flags from the save path, or an earlier run, that this clustering no longer backs
+            stale = [
+                listing_id for listing_id in
+                UsedBikeListing.objects.filter(duplicate_of__isnull=False).values_list('id', flat=True).iterator()
+                if listing_id not in duplicates
+            ]
+            cleared = 0
+            for start in range(0, len(stale), options['batch_size']):
+                cleared += UsedBikeListing.objects.filter(id__in=stale[start:start + options['batch_size']]).update(duplicate_of=None)
+            invalidate_tags('marketplace.UsedBikeListing')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Fingerprinted {fingerprinted} listings, flagged {flagged} duplicates in {len(canonical)} clusters, "
+            f"cleared {cleared} stale flags."
+        ))
@@ -0,0 +1,71 @@
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps.marketplace.models import ArchivedListing, UsedBikeListing
+from apps.marketplace.pricing import stat_entry, update_price_stats
+from apps.marketplace.signals import STAT_FIELDS
+from apps.users.stats import adjust as adjust_stats
+from core.batching import keyset_batches
+from core.response_cache import invalidate_tags
+
+
+class Command(BaseCommand):
+    help = "Expire stale active listings and move old sold/expired listings to the archive table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--expire-after-days', type=int, default=settings.LISTING_EXPIRY_DAYS)
+        parser.add_argument('--archive-after-days', type=int, default=settings.LISTING_ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--batch-size', type=int, default=settings.LISTING_LIFECYCLE_BATCH_SIZE)
+        parser.add_argument('--sleep', type=float, default=0.0, help="Seconds to pause between batches")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        batch_size = options['batch_size']
+        pause = options['sleep']
+
+        expired = 0
+        stale = UsedBikeListing.objects.filter(
+            status='active', created_at__lt=now - timedelta(days=options['expire_after_days'])
+        )
+        for ids in keyset_batches(stale, batch_size):
+            # Each batch is its own short transaction touching only these rows
+            with transaction.atomic():
+                rows = list(
+                    UsedBikeListing.objects.filter(id__in=ids, status='active').values('id', 'seller_id', *STAT_FIELDS)
+                )
+                expired += UsedBikeListing.objects.filter(id__in=[row['id'] for row in rows]).update(
+                    status='expired', updated_at=now
+                )
+                # Bulk UPDATE skips post_save, so drop these from the active price stats here
+                update_price_stats(removed=filter(None, map(stat_entry, rows)))
+                for seller_id, count in Counter(row['seller_id'] for row in rows).items():
+                    adjust_stats(seller_id, active_listings_count=-count)
+                invalidate_tags('marketplace.UsedBikeListing')
+            if pause:
+                time.sleep(pause)
+
+        archived = 0
+        cold = UsedBikeListing.objects.filter(
+            status__in=['sold', 'expired'], updated_at__lt=now - timedelta(days=options['archive_after_days'])
+        )
+        for ids in keyset_batches(cold, batch_size):
+            with transaction.atomic():
+                # Locked and checked again: a listing relisted or edited since the scan stays
+                listings = list(cold.filter(id__in=ids).select_for_update().prefetch_related('images'))
+                ArchivedListing.objects.bulk_create(
+                    [ArchivedListing.from_listing(listing) for listing in listings],
+                    ignore_conflicts=True,
+                )
+                _, deleted = UsedBikeListing.objects.filter(id__in=[listing.id for listing in listings]).delete()
+                invalidate_tags('marketplace.UsedBikeListing', 'marketplace.ArchivedListing')
+            archived += deleted.get(UsedBikeListing._meta.label, 0)
+            if pause:
+                time.sleep(pause)
+
+        self.stdout.write(self.style.SUCCESS(f"Expired {expired} listings, archived {archived} listings."))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from apps.marketplace.images import process_image
+from apps.marketplace.models import ListingImage
+
+
+class Command(BaseCommand):
+    help = "Generate variants for listing images that are pending (or failed, with --retry-failed)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true')
+        parser.add_argument('--limit', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        statuses = ['pending', 'failed'] if options['retry_failed'] else ['pending']
+        ids = list(
+            ListingImage.objects.filter(processing_status__in=statuses).exclude(image_url='', source_url='')
+            .order_by('id').values_list('id', flat=True)[:options['limit']]
+        )
+        for image_id in ids:
+            process_image(image_id)
+        ready = ListingImage.objects.filter(id__in=ids, processing_status='ready').count()
+        self.stdout.write(self.style.SUCCESS(f"Processed {len(ids)} images, {ready} ready."))
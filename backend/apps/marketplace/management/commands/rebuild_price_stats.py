@@ -0,0 +1,38 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.marketplace.models import PriceStat, UsedBikeListing
+from apps.marketplace.pricing import PriceSketch, apply_sketch, stat_entry
+from apps.marketplace.signals import STAT_FIELDS
+from core.response_cache import invalidate_tags
+
+
+class Command(BaseCommand):
+    help = "Rebuild all PriceStat rows from active listings (initial backfill or drift repair)."
+
+    def handle(self, *args, **options):
+        sketches = defaultdict(PriceSketch)
+        mileage = defaultdict(int)
+        rows = UsedBikeListing.objects.filter(status='active', bike_model__isnull=False).values(*STAT_FIELDS)
+        for row in rows.iterator(chunk_size=5000):
+            key, price, km = stat_entry(row)
+            sketches[key].add(price)
+            mileage[key] += km
+
+        stats = []
+        for (bike_model_id, year, condition), sketch in sketches.items():
+            stat = PriceStat(
+                bike_model_id=bike_model_id, manufacturing_year=year, condition=condition,
+                mileage_sum=mileage[(bike_model_id, year, condition)],
+            )
+            apply_sketch(stat, sketch)
+            stats.append(stat)
+
+        with transaction.atomic():
+            PriceStat.objects.all().delete()
+            PriceStat.objects.bulk_create(stats, batch_size=1000)
+            invalidate_tags('marketplace.PriceStat')
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(stats)} price stat groups."))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from apps.marketplace.models import UsedBikeListing
+from apps.marketplace.ranking import RANK_FIELDS, compute_rank_score
+from core.batching import keyset_batches
+from core.response_cache import invalidate_tags
+
+
+def recompute_rank_scores(model, batch_size=1000):
+    """Recompute rank_score for all active listings in keyset batches. Returns rows updated."""
+    now = timezone.now()
+    updated = 0
+    for ids in keyset_batches(model.objects.filter(status='active'), batch_size):
+        listings = list(
+            model.objects.filter(id__in=ids).only('id', *RANK_FIELDS).annotate(image_count=Count('images'))
+        )
+        for listing in listings:
+            # Counted here rather than read from photo_count; this also runs from migration 0008
+            listing.rank_score = compute_rank_score(listing, listing.image_count, now)
+        model.objects.bulk_update(listings, ['rank_score'])
+        updated += len(listings)
+    invalidate_tags(model._meta.label)
+    return updated
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored feed rank_score of active listings (run periodically for freshness decay)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        updated = recompute_rank_scores(UsedBikeListing, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Recomputed rank scores for {updated} listings."))
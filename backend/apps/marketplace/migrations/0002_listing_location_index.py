@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:36
+
+from django.db import migrations, models
+
+
+def backfill_locations(apps, schema_editor):
+    from apps.marketplace.geo import normalize_location
+
+    UsedBikeListing = apps.get_model('marketplace', 'UsedBikeListing')
+    batch = []
+    for listing in UsedBikeListing.objects.only('id', 'location').iterator(chunk_size=2000):
+        place = normalize_location(listing.location)
+        if not place:
+            continue
+        listing.district_id = place.district_id
+        listing.latitude = place.latitude
+        listing.longitude = place.longitude
+        batch.append(listing)
+        if len(batch) >= 2000:
+            UsedBikeListing.objects.bulk_update(batch, ['district_id', 'latitude', 'longitude'])
+            batch = []
+    if batch:
+        UsedBikeListing.objects.bulk_update(batch, ['district_id', 'latitude', 'longitude'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usedbikelisting',
+            name='district_id',
+            field=models.PositiveSmallIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='usedbikelisting',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='usedbikelisting',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='usedbikelisting',
+            index=models.Index(fields=['latitude', 'longitude'], name='listing_lat_lon_idx'),
+        ),
+        migrations.RunPython(backfill_locations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:37
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bikes', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('marketplace', '0002_listing_location_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedListing',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('custom_brand', models.CharField(blank=True, max_length=100, null=True)),
+                ('custom_model', models.CharField(blank=True, max_length=100, null=True)),
+                ('title', models.CharField(max_length=255)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('mileage', models.IntegerField()),
+                ('manufacturing_year', models.IntegerField()),
+                ('registration_year', models.IntegerField(blank=True, null=True)),
+                ('condition', models.CharField(choices=[('excellent', 'Excellent'), ('good', 'Good'), ('fair', 'Fair'), ('need_work', 'Needs Work')], max_length=20)),
+                ('description', models.TextField()),
+                ('location', models.CharField(max_length=255)),
+                ('district_id', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('status', models.CharField(max_length=20)),
+                ('is_verified', models.BooleanField(default=False)),
+                ('views_count', models.IntegerField(default=0)),
+                ('images', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='usedbikelisting',
+            index=models.Index(fields=['status', 'created_at'], name='listing_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usedbikelisting',
+            index=models.Index(fields=['status', 'updated_at'], name='listing_status_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedlisting',
+            name='bike_model',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='bikes.bikemodel'),
+        ),
+        migrations.AddField(
+            model_name='archivedlisting',
+            name='seller',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_listings', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bikes', '0001_initial'),
+        ('marketplace', '0003_listing_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('manufacturing_year', models.IntegerField()),
+                ('condition', models.CharField(choices=[('excellent', 'Excellent'), ('good', 'Good'), ('fair', 'Fair'), ('need_work', 'Needs Work')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('price_p25', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('price_median', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('price_p75', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('mileage_sum', models.BigIntegerField(default=0)),
+                ('avg_mileage', models.FloatField(blank=True, null=True)),
+                ('sketch', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('bike_model', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_stats', to='bikes.bikemodel')),
+            ],
+            options={
+                'ordering': ['bike_model', '-manufacturing_year', 'condition'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='pricestat',
+            constraint=models.UniqueConstraint(fields=('bike_model', 'manufacturing_year', 'condition'), name='unique_price_stat_key'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0004_price_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingFingerprint',
+            fields=[
+                ('listing', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fingerprint', serialize=False, to='marketplace.usedbikelisting')),
+                ('signature', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='usedbikelisting',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='marketplace.usedbikelisting'),
+        ),
+        migrations.CreateModel(
+            name='ListingLSHBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField(db_index=True)),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_buckets', to='marketplace.usedbikelisting')),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0005_listing_dedupe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usedbikelisting',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='usedbikelisting',
+            constraint=models.UniqueConstraint(condition=models.Q(('external_id__isnull', False)), fields=('seller', 'external_id'), name='unique_listing_external_id'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0006_listing_external_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listingimage',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='listingimage',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='listingimage',
+            name='placeholder',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='listingimage',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='listingimage',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='listingimage',
+            name='image_url',
+            field=models.URLField(blank=True, max_length=500),
+        ),
+        migrations.CreateModel(
+            name='ListingImageVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('thumb', 'Thumbnail'), ('card', 'Card'), ('full', 'Full')], max_length=10)),
+                ('format', models.CharField(max_length=10)),
+                ('url', models.URLField(max_length=500)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('size_bytes', models.PositiveIntegerField()),
+                ('content_hash', models.CharField(max_length=64)),
+                ('image', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variants', to='marketplace.listingimage')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='listingimagevariant',
+            constraint=models.UniqueConstraint(fields=('image', 'kind', 'format'), name='unique_image_variant'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:45
+
+from django.db import migrations, models
+
+
+def backfill_rank_scores(apps, schema_editor):
+    from apps.marketplace.management.commands.recompute_rank_scores import recompute_rank_scores
+
+    recompute_rank_scores(apps.get_model('marketplace', 'UsedBikeListing'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0007_listing_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usedbikelisting',
+            name='rank_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='usedbikelisting',
+            index=models.Index(fields=['status', '-rank_score', '-id'], name='listing_status_rank_idx'),
+        ),
+        migrations.RunPython(backfill_rank_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0008_listing_rank_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listingimage',
+            name='source_url',
+            field=models.URLField(blank=True, max_length=500),
+        ),
+    ]
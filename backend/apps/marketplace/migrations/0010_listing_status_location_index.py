@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0009_listing_image_source'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='usedbikelisting',
+            name='listing_lat_lon_idx',
+        ),
+        migrations.AddIndex(
+            model_name='usedbikelisting',
+            index=models.Index(fields=['status', 'latitude', 'longitude'], name='listing_status_lat_lon_idx'),
+        ),
+    ]
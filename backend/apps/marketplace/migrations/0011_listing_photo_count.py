@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:02
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_photo_counts(apps, schema_editor):
+    UsedBikeListing = apps.get_model('marketplace', 'UsedBikeListing')
+    ListingImage = apps.get_model('marketplace', 'ListingImage')
+    counts = (
+        ListingImage.objects.filter(listing=OuterRef('pk')).order_by()
+        .values('listing').annotate(count=Count('id')).values('count')
+    )
+    UsedBikeListing.objects.update(photo_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0010_listing_status_location_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usedbikelisting',
+            name='photo_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_photo_counts, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from apps.bikes.models import BikeModel
+from .geo import normalize_location
+from .ranking import compute_rank_score
 
 class UsedBikeListing(models.Model):
     CONDITION_CHOICES = [
@@ -12,6 +14,8 @@ class UsedBikeListing(models.Model):
 
     seller = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='listings')
     bike_model = models.ForeignKey(BikeModel, on_delete=models.SET_NULL, null=True, blank=True)
+    # Dealer-supplied inventory id, used by bulk ingest to upsert instead of duplicate
+    external_id = models.CharField(max_length=100, blank=True, null=True)
     
     # If not in our official list
     custom_brand = models.CharField(max_length=100, blank=True, null=True)
@@ -26,6 +30,11 @@ class UsedBikeListing(models.Model):
     condition = models.CharField(max_length=20, choices=CONDITION_CHOICES)
     description = models.TextField()
     location = models.CharField(max_length=255)
+
+    # Normalized from `location` against the bundled gazetteer (see geo.py)
+    district_id = models.PositiveSmallIntegerField(null=True, blank=True, db_index=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
     
     # Verification & Status
     is_verified = models.BooleanField(default=False)
@@ -38,23 +47,200 @@ class UsedBikeListing(models.Model):
     # Premium features
     is_featured = models.BooleanField(default=False)
     is_urgent = models.BooleanField(default=False)
+
+    # Precomputed feed ordering, see ranking.py
+    rank_score = models.FloatField(default=0)
+    # Number of ListingImage rows, kept by the image signals; feeds rank_score
+    photo_count = models.PositiveIntegerField(default=0)
     
+    # Set when near-duplicate detection (dedupe.py) finds an older copy of this listing
+    duplicate_of = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, related_name='duplicates'
+    )
+
     # Metadata
     views_count = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Snapshot of the stored row, used by signal handlers to diff changes
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def apply_location(self):
+        place = normalize_location(self.location)
+        if place:
+            self.district_id = place.district_id
+            self.latitude = place.latitude
+            self.longitude = place.longitude
+        else:
+            self.district_id = self.latitude = self.longitude = None
+
+    def save(self, *args, **kwargs):
+        self.apply_location()
+        self.rank_score = compute_rank_score(self, self.photo_count)
+        # post_save handlers (price stats, seller counters) commit together with the row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.title} - {self.price} BDT"
 
     class Meta:
         ordering = ['-is_featured', '-created_at']
+        indexes = [
+            # Radius searches only ever look at active listings
+            models.Index(fields=['status', 'latitude', 'longitude'], name='listing_status_lat_lon_idx'),
+            models.Index(fields=['status', 'created_at'], name='listing_status_created_idx'),
+            models.Index(fields=['status', 'updated_at'], name='listing_status_updated_idx'),
+            models.Index(fields=['status', '-rank_score', '-id'], name='listing_status_rank_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['seller', 'external_id'],
+                condition=models.Q(external_id__isnull=False),
+                name='unique_listing_external_id',
+            ),
+        ]
 
 class ListingImage(models.Model):
+    PROCESSING_CHOICES = [
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+
     listing = models.ForeignKey(UsedBikeListing, on_delete=models.CASCADE, related_name='images')
-    image_url = models.URLField(max_length=500)
+    # Original image; empty until an upload has been processed (see images.py)
+    image_url = models.URLField(max_length=500, blank=True)
+    # Where an uploaded original is kept until (and so it can be re-)processed; never served
+    source_url = models.URLField(max_length=500, blank=True)
     is_primary = models.BooleanField(default=False)
     order = models.IntegerField(default=0)
 
+    processing_status = models.CharField(max_length=10, choices=PROCESSING_CHOICES, default='pending')
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True)
+    # Tiny blurred preview as a data URI, shown while the real image loads
+    placeholder = models.TextField(blank=True)
+
     class Meta:
         ordering = ['order']
+
+class ListingImageVariant(models.Model):
+    KIND_CHOICES = [
+        ('thumb', 'Thumbnail'),
+        ('card', 'Card'),
+        ('full', 'Full'),
+    ]
+
+    image = models.ForeignKey(ListingImage, on_delete=models.CASCADE, related_name='variants')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    format = models.CharField(max_length=10)
+    url = models.URLField(max_length=500)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    size_bytes = models.PositiveIntegerField()
+    content_hash = models.CharField(max_length=64)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['image', 'kind', 'format'], name='unique_image_variant'),
+        ]
+
+class ListingFingerprint(models.Model):
+    listing = models.OneToOneField(
+        UsedBikeListing, on_delete=models.CASCADE, primary_key=True, related_name='fingerprint'
+    )
+    # MinHash signature packed as uint32 values
+    signature = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+class ListingLSHBucket(models.Model):
+    listing = models.ForeignKey(UsedBikeListing, on_delete=models.CASCADE, related_name='lsh_buckets')
+    key = models.BigIntegerField(db_index=True)
+
+class PriceStat(models.Model):
+    """
+    Materialized used-price statistics per (bike_model, manufacturing_year,
+    condition) over active listings, maintained incrementally (see pricing.py).
+    """
+    bike_model = models.ForeignKey(BikeModel, on_delete=models.CASCADE, related_name='price_stats')
+    manufacturing_year = models.IntegerField()
+    condition = models.CharField(max_length=20, choices=UsedBikeListing.CONDITION_CHOICES)
+
+    count = models.IntegerField(default=0)
+    price_p25 = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    price_median = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    price_p75 = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    mileage_sum = models.BigIntegerField(default=0)
+    avg_mileage = models.FloatField(null=True, blank=True)
+    # Quantile sketch buckets: {"<bucket index>": count}
+    sketch = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['bike_model', '-manufacturing_year', 'condition']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['bike_model', 'manufacturing_year', 'condition'], name='unique_price_stat_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.bike_model_id}/{self.manufacturing_year}/{self.condition}: {self.price_median}"
+
+class ArchivedListing(models.Model):
+    """
+    Cold storage for sold/expired listings moved out of the hot table by the
+    `listing_lifecycle` command. Keeps the original id so old links resolve.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    seller = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_listings')
+    bike_model = models.ForeignKey(BikeModel, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    custom_brand = models.CharField(max_length=100, blank=True, null=True)
+    custom_model = models.CharField(max_length=100, blank=True, null=True)
+
+    title = models.CharField(max_length=255)
+    price = models.DecimalField(max_digits=12, decimal_places=2)
+    mileage = models.IntegerField()
+    manufacturing_year = models.IntegerField()
+    registration_year = models.IntegerField(null=True, blank=True)
+    condition = models.CharField(max_length=20, choices=UsedBikeListing.CONDITION_CHOICES)
+    description = models.TextField()
+    location = models.CharField(max_length=255)
+    district_id = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    status = models.CharField(max_length=20)
+    is_verified = models.BooleanField(default=False)
+    views_count = models.IntegerField(default=0)
+    # Snapshot of ListingImage rows: [{"image_url": ..., "is_primary": ..., "order": ...}]
+    images = models.JSONField(default=list, blank=True)
+
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    ARCHIVED_FIELDS = [
+        'id', 'seller_id', 'bike_model_id', 'custom_brand', 'custom_model', 'title', 'price',
+        'mileage', 'manufacturing_year', 'registration_year', 'condition', 'description',
+        'location', 'district_id', 'status', 'is_verified', 'views_count', 'created_at', 'updated_at',
+    ]
+
+    @classmethod
+    def from_listing(cls, listing):
+        archived = cls(**{name: getattr(listing, name) for name in cls.ARCHIVED_FIELDS})
+        # Pending or failed uploads have no image_url yet, and their source_url
+        # is the raw upload, which is never served
+        archived.images = [
+            {'image_url': image.image_url, 'is_primary': image.is_primary, 'order': image.order}
+            for image in listing.images.all() if image.image_url
+        ]
+        return archived
+
+    def __str__(self):
+        return f"[archived] {self.title}"
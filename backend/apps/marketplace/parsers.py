@@ -0,0 +1,35 @@
+import csv
+import io
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class CSVParser(BaseParser):
+    """
+    Parse a CSV upload into a list of row dicts. Empty cells are dropped so
+    optional fields fall back to their defaults, and an `image_urls` column
+    ("url1|url2|...") becomes a nested `images` list, first image primary.
+    """
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            text = stream.read().decode(encoding)
+        except UnicodeDecodeError as exc:
+            raise ParseError(f'CSV parse error - {exc}')
+
+        rows = []
+        for record in csv.DictReader(io.StringIO(text)):
+            row = {key.strip(): value.strip() for key, value in record.items() if key and value and value.strip()}
+            urls = row.pop('image_urls', '')
+            if urls:
+                row['images'] = [
+                    {'image_url': url.strip(), 'is_primary': index == 0, 'order': index}
+                    for index, url in enumerate(urls.split('|')) if url.strip()
+                ]
+            rows.append(row)
+        return rows
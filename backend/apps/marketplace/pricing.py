@@ -0,0 +1,150 @@
+import math
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.db import transaction
+
+# Relative accuracy of quantile estimates: any reported quantile is within 1%
+# of a price actually present in the group.
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+
+StatKey = Tuple[int, int, str]
+StatEntry = Tuple[StatKey, float, int]
+
+
+class PriceSketch:
+    """
+    Log-bucketed quantile sketch (DDSketch style). Prices are counted in
+    geometrically sized buckets, so both inserts and deletes are O(1) and the
+    whole sketch for one model/year/condition stays a few hundred integers.
+    """
+
+    def __init__(self, buckets: Optional[Dict[int, int]] = None):
+        self.buckets = buckets or {}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls({int(index): count for index, count in (data or {}).items()})
+
+    def to_json(self):
+        return {str(index): count for index, count in sorted(self.buckets.items())}
+
+    @staticmethod
+    def bucket_index(value: float) -> int:
+        return math.ceil(math.log(max(value, 1.0)) / LOG_GAMMA)
+
+    @staticmethod
+    def bucket_value(index: int) -> float:
+        return 2 * GAMMA ** index / (GAMMA + 1)
+
+    @property
+    def count(self) -> int:
+        return sum(self.buckets.values())
+
+    def add(self, value: float, count: int = 1):
+        index = self.bucket_index(value)
+        total = self.buckets.get(index, 0) + count
+        if total > 0:
+            self.buckets[index] = total
+        else:
+            self.buckets.pop(index, None)
+
+    def remove(self, value: float):
+        self.add(value, -1)
+
+    def quantile(self, q: float) -> Optional[float]:
+        total = self.count
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                return self.bucket_value(index)
+        return self.bucket_value(max(self.buckets))
+
+    def percentile_of(self, value: float) -> Optional[float]:
+        """Share of the group priced below `value`, as 0-100 (ties count half)."""
+        total = self.count
+        if not total:
+            return None
+        target = self.bucket_index(value)
+        below = sum(count for index, count in self.buckets.items() if index < target)
+        below += self.buckets.get(target, 0) / 2
+        return 100 * below / total
+
+
+def stat_entry(values: dict) -> Optional[StatEntry]:
+    """Contribution of a listing (given its field values) to the price stats."""
+    if values.get('status') != 'active' or not values.get('bike_model_id'):
+        return None
+    key = (values['bike_model_id'], values['manufacturing_year'], values['condition'])
+    return key, float(values['price']), int(values['mileage'])
+
+
+def _to_decimal(value: Optional[float]) -> Optional[Decimal]:
+    return Decimal(value).quantize(Decimal('0.01')) if value is not None else None
+
+
+def apply_sketch(stat, sketch: PriceSketch):
+    stat.sketch = sketch.to_json()
+    stat.count = sketch.count
+    stat.price_p25 = _to_decimal(sketch.quantile(0.25))
+    stat.price_median = _to_decimal(sketch.quantile(0.5))
+    stat.price_p75 = _to_decimal(sketch.quantile(0.75))
+    stat.avg_mileage = stat.mileage_sum / stat.count if stat.count else None
+
+
+def update_price_stats(added: Iterable[StatEntry] = (), removed: Iterable[StatEntry] = ()):
+    """Fold listing contributions into the materialized PriceStat rows."""
+    from .models import PriceStat
+
+    deltas = defaultdict(list)
+    for key, price, mileage in added:
+        deltas[key].append((price, mileage, 1))
+    for key, price, mileage in removed:
+        deltas[key].append((price, mileage, -1))
+
+    for (bike_model_id, year, condition), changes in deltas.items():
+        with transaction.atomic():
+            stat, _ = PriceStat.objects.select_for_update().get_or_create(
+                bike_model_id=bike_model_id, manufacturing_year=year, condition=condition,
+            )
+            sketch = PriceSketch.from_json(stat.sketch)
+            for price, mileage, sign in changes:
+                sketch.add(price, sign)
+                stat.mileage_sum += sign * mileage
+            apply_sketch(stat, sketch)
+            stat.save()
+
+
+def price_percentiles(listings) -> Dict[int, float]:
+    """Map listing id -> percentile of its price within its model/year/condition group."""
+    keyed = [(listing, stat_entry(vars(listing))) for listing in listings]
+    keys = {entry[0] for _, entry in keyed if entry}
+    if not keys:
+        return {}
+
+    from .models import PriceStat
+    stats = PriceStat.objects.filter(
+        bike_model_id__in={k[0] for k in keys},
+        manufacturing_year__in={k[1] for k in keys},
+        condition__in={k[2] for k in keys},
+    ).only('bike_model_id', 'manufacturing_year', 'condition', 'sketch')
+    sketches = {
+        (s.bike_model_id, s.manufacturing_year, s.condition): PriceSketch.from_json(s.sketch)
+        for s in stats
+    }
+
+    result = {}
+    for listing, entry in keyed:
+        sketch = sketches.get(entry[0]) if entry else None
+        if sketch:
+            percentile = sketch.percentile_of(entry[1])
+            if percentile is not None:
+                result[listing.pk] = round(percentile, 1)
+    return result
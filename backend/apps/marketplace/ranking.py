@@ -0,0 +1,47 @@
+import math
+from typing import Optional
+
+from django.utils import timezone
+
+# Score = boosts + freshness decay + log-scaled photo and engagement signals.
+# Freshness halves every FRESHNESS_HALF_LIFE_DAYS, so a stale featured listing
+# (3.0) drops below a fresh verified one (1.5 + 4.0) within about a week.
+FEATURED_BOOST = 3.0
+URGENT_BOOST = 1.0
+VERIFIED_BOOST = 1.5
+FRESHNESS_WEIGHT = 4.0
+FRESHNESS_HALF_LIFE_DAYS = 7
+PHOTO_WEIGHT = 0.6
+MAX_COUNTED_PHOTOS = 8
+ENGAGEMENT_WEIGHT = 0.3
+
+RANK_FIELDS = ('is_featured', 'is_urgent', 'is_verified', 'created_at', 'views_count')
+
+
+def compute_rank_score(listing, photo_count: int, now: Optional[timezone.datetime] = None) -> float:
+    now = now or timezone.now()
+    created_at = listing.created_at or now
+    age_days = max((now - created_at).total_seconds(), 0) / 86400
+
+    score = FRESHNESS_WEIGHT * 0.5 ** (age_days / FRESHNESS_HALF_LIFE_DAYS)
+    if listing.is_featured:
+        score += FEATURED_BOOST
+    if listing.is_urgent:
+        score += URGENT_BOOST
+    if listing.is_verified:
+        score += VERIFIED_BOOST
+    score += PHOTO_WEIGHT * math.log1p(min(photo_count, MAX_COUNTED_PHOTOS))
+    score += ENGAGEMENT_WEIGHT * math.log1p(max(listing.views_count or 0, 0))
+    return round(score, 6)
+
+
+def refresh_rank_score(listing_id: int):
+    """Recount one listing's photos and recompute its score, after its photos change."""
+    from .models import UsedBikeListing
+
+    listing = UsedBikeListing.objects.filter(pk=listing_id).only(*RANK_FIELDS).first()
+    if listing is not None:
+        photo_count = listing.images.count()
+        UsedBikeListing.objects.filter(pk=listing_id).update(
+            photo_count=photo_count, rank_score=compute_rank_score(listing, photo_count),
+        )
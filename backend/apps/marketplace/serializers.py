@@ -1,24 +1,130 @@
 from rest_framework import serializers
-from .models import UsedBikeListing, ListingImage
+from core.fields import SERIALIZER_FIELD_MAPPING
+from .models import UsedBikeListing, ListingImage, ListingImageVariant, ArchivedListing, PriceStat
 from apps.bikes.serializers import BikeModelCompactSerializer
+from .geo import get_district
+
+class ListingImageVariantSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ListingImageVariant
+        fields = ['kind', 'format', 'url', 'width', 'height']
 
 class ListingImageSerializer(serializers.ModelSerializer):
+    variants = ListingImageVariantSerializer(many=True, read_only=True)
+
     class Meta:
         model = ListingImage
-        fields = ['id', 'image_url', 'is_primary']
+        fields = ['id', 'listing', 'image_url', 'is_primary', 'order', 'processing_status', 'width', 'height', 'placeholder', 'variants']
 
 class UsedBikeListingSerializer(serializers.ModelSerializer):
     seller_name = serializers.ReadOnlyField(source='seller.username')
     bike_details = BikeModelCompactSerializer(source='bike_model', read_only=True)
     images = ListingImageSerializer(many=True, read_only=True)
-    
+    district = serializers.SerializerMethodField()
+    distance_km = serializers.SerializerMethodField()
+    price_percentile = serializers.SerializerMethodField()
+    serializer_field_mapping = SERIALIZER_FIELD_MAPPING
+
     class Meta:
         model = UsedBikeListing
-        fields = '__all__'
-        read_only_fields = ['views_count', 'is_verified', 'created_at']
+        # A dealer's own inventory ids are not public
+        exclude = ['external_id']
+        read_only_fields = [
+            'views_count', 'is_verified', 'created_at', 'district_id', 'latitude', 'longitude', 'duplicate_of',
+            'rank_score', 'photo_count',
+        ]
+
+    def get_district(self, obj):
+        place = get_district(obj.district_id) if obj.district_id else None
+        return place.district if place else None
+
+    def get_distance_km(self, obj):
+        distance = getattr(obj, 'distance_km', None)
+        return round(distance, 1) if distance is not None else None
+
+    def get_price_percentile(self, obj):
+        return self.context.get('price_percentiles', {}).get(obj.pk)
+
+class UsedBikeListingListSerializer(UsedBikeListingSerializer):
+    """Feed rows: only the primary image's card variants instead of every image."""
+    images = None
+    primary_image = serializers.SerializerMethodField()
+
+    def get_primary_image(self, obj):
+        # `images` is prefetched primary-first with only card variants attached
+        image = next(iter(obj.images.all()), None)
+        if image is None:
+            return None
+        variants = list(image.variants.all())
+        # WebP is the default `url`; clients that support AVIF can pick it from `sources`
+        card = next((v for v in variants if v.format == 'webp'), variants[0] if variants else None)
+        return {
+            'id': image.id,
+            'url': card.url if card else image.image_url,
+            'width': card.width if card else image.width,
+            'height': card.height if card else image.height,
+            'placeholder': image.placeholder,
+            'sources': [{'format': v.format, 'url': v.url} for v in variants],
+        }
 
 class UsedBikeListingCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = UsedBikeListing
-        exclude = ['seller', 'views_count', 'is_verified', 'created_at']
+        # external_id is only set by dealer bulk ingest; rank_score is computed on save
+        exclude = [
+            'seller', 'views_count', 'is_verified', 'created_at', 'district_id', 'latitude', 'longitude', 'duplicate_of',
+            'external_id', 'rank_score', 'photo_count',
+        ]
+        # Moderation and paid placement; both raise rank_score, so they are not the seller's to set
+        read_only_fields = ['status', 'is_featured', 'is_urgent']
+
+
+class ListingImageInputSerializer(serializers.Serializer):
+    image_url = serializers.URLField(max_length=500)
+    is_primary = serializers.BooleanField(required=False)
+    order = serializers.IntegerField(required=False)
+
+class BulkListingItemSerializer(serializers.ModelSerializer):
+    """
+    One row of a dealer bulk upload. Bike models are checked against ids prefetched into the context.
+    Status and the ranking flags are left to moderation, as for listings created one by one.
+    """
+    external_id = serializers.CharField(max_length=100)
+    bike_model = serializers.IntegerField(required=False, allow_null=True)
+    images = ListingImageInputSerializer(many=True, required=False)
+
+    class Meta:
+        model = UsedBikeListing
+        fields = [
+            'external_id', 'bike_model', 'custom_brand', 'custom_model', 'title', 'price', 'mileage',
+            'manufacturing_year', 'registration_year', 'condition', 'description', 'location', 'images',
+        ]
+
+    def validate_bike_model(self, value):
+        if value is not None and value not in self.context.get('bike_model_ids', ()):
+            raise serializers.ValidationError('Unknown bike model.')
+        return value
+
+    def validate(self, attrs):
+        if 'bike_model' in attrs:
+            attrs['bike_model_id'] = attrs.pop('bike_model')
+        return attrs
+
+class ArchivedListingSerializer(serializers.ModelSerializer):
+    seller_name = serializers.ReadOnlyField(source='seller.username')
+    bike_details = BikeModelCompactSerializer(source='bike_model', read_only=True)
+    is_archived = serializers.SerializerMethodField()
 
+    class Meta:
+        model = ArchivedListing
+        fields = '__all__'
+
+    def get_is_archived(self, obj):
+        return True
+
+class PriceStatSerializer(serializers.ModelSerializer):
+    bike_details = BikeModelCompactSerializer(source='bike_model', read_only=True)
+
+    class Meta:
+        model = PriceStat
+        exclude = ['sketch', 'mileage_sum']
@@ -0,0 +1,85 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from apps.users.stats import LISTING_FIELDS, listing_changed
+
+from .dedupe import enqueue_listings
+from .models import ListingImage, UsedBikeListing
+from .pricing import stat_entry, update_price_stats
+from .ranking import refresh_rank_score
+
+STAT_FIELDS = ('status', 'bike_model_id', 'manufacturing_year', 'condition', 'price', 'mileage')
+FINGERPRINT_FIELDS = (
+    'title', 'description', 'price', 'bike_model_id', 'custom_brand', 'custom_model', 'manufacturing_year',
+)
+
+
+# Stored values the post_save/post_delete handlers diff against
+SNAPSHOT_FIELDS = tuple(dict.fromkeys(STAT_FIELDS + LISTING_FIELDS + FINGERPRINT_FIELDS))
+
+
+def current_values(instance):
+    return {field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields}
+
+
+def complete_snapshot(instance):
+    """
+    Fill in `_loaded_values` from the stored row when the instance was built
+    by hand or loaded with .only()/.defer(), so the diff still sees the old values.
+    """
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    missing = [name for name in SNAPSHOT_FIELDS if name not in loaded]
+    if instance.pk is None or not missing:
+        return
+    stored = UsedBikeListing.objects.filter(pk=instance.pk).values(*missing).first()
+    if stored is not None:
+        instance._loaded_values = {**loaded, **stored}
+
+
+@receiver(pre_save, sender=UsedBikeListing)
+def listing_saving(sender, instance, raw=False, **kwargs):
+    if not raw:
+        complete_snapshot(instance)
+
+
+@receiver(pre_delete, sender=UsedBikeListing)
+def listing_deleting(sender, instance, **kwargs):
+    complete_snapshot(instance)
+
+
+@receiver(post_save, sender=UsedBikeListing)
+def listing_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    loaded = getattr(instance, '_loaded_values', {})
+    values = current_values(instance)
+    if created or all(name in loaded for name in STAT_FIELDS):
+        old = None if created else stat_entry(loaded)
+        new = stat_entry(values)
+        if old != new:
+            update_price_stats(added=[new] if new else [], removed=[old] if old else [])
+    if created or any(loaded.get(name) != values[name] for name in FINGERPRINT_FIELDS):
+        enqueue_listings([instance.pk])
+    if created or all(name in loaded for name in LISTING_FIELDS):
+        listing_changed(None if created else loaded, values)
+    instance._loaded_values = current_values(instance)
+
+
+@receiver(post_delete, sender=UsedBikeListing)
+def listing_deleted(sender, instance, **kwargs):
+    loaded = getattr(instance, '_loaded_values', {})
+    old = stat_entry(loaded) if all(name in loaded for name in STAT_FIELDS) else None
+    if old:
+        update_price_stats(removed=[old])
+    if all(name in loaded for name in LISTING_FIELDS):
+        listing_changed(loaded, None)
+
+
+@receiver(post_save, sender=ListingImage)
+@receiver(post_delete, sender=ListingImage)
+def listing_image_changed(sender, instance, raw=False, **kwargs):
+    # Photo count feeds rank_score; nothing to do when the listing itself is being deleted
+    origin = kwargs.get('origin')
+    if raw or isinstance(origin, UsedBikeListing) or getattr(origin, 'model', None) is UsedBikeListing:
+        return
+    refresh_rank_score(instance.listing_id)
@@ -0,0 +1,197 @@
+import hashlib
+import hmac
+import ipaddress
+import socket
+import time
+from functools import lru_cache
+from typing import Optional
+from urllib.parse import urlsplit
+
+import requests
+import urllib3
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+
+class UnsafeURLError(ValueError):
+    """A URL the server will not fetch: not http(s), not public, redirected or too large."""
+
+
+def is_public_address(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split('%', 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def public_address(host: str, port: int) -> str:
+    """Resolve `host`; every address it has must be public, and the first one is returned."""
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError) as exc:
+        raise UnsafeURLError(f"Cannot resolve {host}") from exc
+    addresses = [info[4][0] for info in infos]
+    if not addresses or not all(is_public_address(address) for address in addresses):
+        raise UnsafeURLError(f"{host} does not resolve to a public address")
+    return addresses[0]
+
+
+def fetch_public_url(url: str, max_bytes: int, timeout: float) -> bytes:
+    """
+    GET a third-party URL (dealer-supplied image links) without letting it reach
+    internal services: http(s) only, connected to the address that was checked
+    (so DNS cannot change between check and connect), no redirects, and at most
+    `max_bytes` read.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise UnsafeURLError(f"Only http(s) URLs are fetched: {url}")
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    address = public_address(parts.hostname, port)
+
+    options = {'timeout': urllib3.Timeout(total=timeout), 'retries': False, 'maxsize': 1}
+    if parts.scheme == 'https':
+        pool = urllib3.HTTPSConnectionPool(
+            address, port, server_hostname=parts.hostname, assert_hostname=parts.hostname,
+            ca_certs=requests.certs.where(), **options,
+        )
+    else:
+        pool = urllib3.HTTPConnectionPool(address, port, **options)
+    path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+    host = parts.netloc.rpartition('@')[2]
+    with pool:
+        response = pool.urlopen(
+            'GET', path, headers={'Host': host}, redirect=False, retries=False, preload_content=False,
+        )
+        try:
+            if response.status != 200:
+                raise UnsafeURLError(f"Fetching {url} returned {response.status}")
+            if int(response.headers.get('Content-Length') or 0) > max_bytes:
+                raise UnsafeURLError(f"{url} is larger than {max_bytes} bytes")
+            content = response.read(max_bytes + 1)
+            if len(content) > max_bytes:
+                raise UnsafeURLError(f"{url} is larger than {max_bytes} bytes")
+            return content
+        finally:
+            response.release_conn()
+
+
+class ListingImageStorage:
+    """Where listing photos live: direct client uploads and the processed variants."""
+
+    DOWNLOAD_TIMEOUT = 15
+
+    def read(self, url: str) -> bytes:
+        return fetch_public_url(url, settings.LISTING_IMAGE_MAX_UPLOAD_BYTES, self.DOWNLOAD_TIMEOUT)
+
+    def save(self, key: str, content: bytes, content_type: str) -> str:
+        """Store bytes under `key` and return a public URL."""
+        raise NotImplementedError
+
+    def signed_upload(self, key: str, max_bytes: int, expires_in: int) -> dict:
+        """Short-lived parameters a client can use to upload straight to storage."""
+        raise NotImplementedError
+
+    def verify_upload(self, key: str, proof: dict) -> Optional[str]:
+        """Confirm a direct upload to `key` happened; return its URL or None."""
+        raise NotImplementedError
+
+
+class LocalImageStorage(ListingImageStorage):
+    """Development storage under MEDIA_ROOT, served from MEDIA_URL."""
+
+    def __init__(self):
+        self.storage = FileSystemStorage(location=settings.MEDIA_ROOT, base_url=settings.MEDIA_URL)
+
+    def read(self, url):
+        if url.startswith(self.storage.base_url):
+            with self.storage.open(url[len(self.storage.base_url):], 'rb') as f:
+                return f.read()
+        return super().read(url)
+
+    def save(self, key, content, content_type):
+        if not self.storage.exists(key):
+            self.storage.save(key, ContentFile(content))
+        return self.storage.url(key)
+
+    @staticmethod
+    def upload_signature(key: str, expires: int, max_bytes: int) -> str:
+        message = f"{key}:{expires}:{max_bytes}".encode()
+        return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+    @classmethod
+    def check_upload_signature(cls, key: str, expires: int, max_bytes: int, signature: str) -> bool:
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(cls.upload_signature(key, expires, max_bytes), signature)
+
+    def signed_upload(self, key, max_bytes, expires_in):
+        expires = int(time.time()) + expires_in
+        return {
+            'url': reverse('listing-upload-local'),
+            'method': 'POST',
+            'file_field': 'file',
+            'fields': {
+                'key': key,
+                'expires': expires,
+                'max_bytes': max_bytes,
+                'signature': self.upload_signature(key, expires, max_bytes),
+            },
+            'expires_at': expires,
+        }
+
+    def verify_upload(self, key, proof):
+        return self.storage.url(key) if self.storage.exists(key) else None
+
+
+class CloudinaryImageStorage(ListingImageStorage):
+    """Production storage using the account configured in core/settings.py."""
+
+    def save(self, key, content, content_type):
+        import cloudinary.uploader
+
+        public_id, _, extension = key.rpartition('.')
+        result = cloudinary.uploader.upload(
+            content, public_id=public_id, format=extension, resource_type='image', overwrite=False,
+        )
+        return result['secure_url']
+
+    def signed_upload(self, key, max_bytes, expires_in):
+        import cloudinary
+        import cloudinary.utils
+
+        config = cloudinary.config()
+        # Cloudinary rejects signed uploads whose timestamp is older than an hour,
+        # so our own upload token carries the shorter expiry.
+        timestamp = int(time.time())
+        params = {'public_id': key, 'timestamp': timestamp}
+        return {
+            'url': f"https://api.cloudinary.com/v1_1/{config.cloud_name}/image/upload",
+            'method': 'POST',
+            'file_field': 'file',
+            'fields': {
+                **params,
+                'api_key': config.api_key,
+                'signature': cloudinary.utils.api_sign_request(params, config.api_secret),
+            },
+            'expires_at': timestamp + expires_in,
+        }
+
+    def verify_upload(self, key, proof):
+        import cloudinary.utils
+
+        public_id, version, signature = proof.get('public_id'), proof.get('version'), proof.get('signature')
+        if public_id != key or not version or not signature:
+            return None
+        if not cloudinary.utils.verify_api_response_signature(public_id, version, signature):
+            return None
+        url, _ = cloudinary.utils.cloudinary_url(public_id, version=version, secure=True)
+        return url
+
+
+@lru_cache(maxsize=1)
+def get_image_storage() -> ListingImageStorage:
+    return import_string(settings.LISTING_IMAGE_STORAGE)()
@@ -1,3 +1,494 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from apps.bikes.models import BikeModel, Brand
+
+from . import dedupe, images, storage
+from .management.commands import listing_lifecycle
+from .ingest import ingest_listings
+from .models import ArchivedListing, ListingFingerprint, ListingImage, ListingLSHBucket, PriceStat, UsedBikeListing
+from .ranking import compute_rank_score
+from .storage import UnsafeURLError, fetch_public_url, get_image_storage, is_public_address
+
+
+def create_listing(seller, **fields):
+    values = {
+        'seller': seller, 'title': 'Yamaha R15 V3', 'price': 350000, 'mileage': 12000,
+        'manufacturing_year': 2021, 'condition': 'good', 'description': 'Well kept',
+        'location': 'Dhaka', 'status': 'active', **fields,
+    }
+    return UsedBikeListing.objects.create(**values)
+
+
+def jpeg_bytes(size=(64, 48)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+class ImageServer(BaseHTTPRequestHandler):
+    """Serves /ok (small), /big (no Content-Length), /redirect and /target."""
+    hits = []
+
+    def do_GET(self):
+        self.hits.append(self.path)
+        if self.path == '/redirect':
+            self.send_response(302)
+            self.send_header('Location', '/target')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b'x' * (5000 if self.path == '/big' else 100))
+
+    def log_message(self, *args):
+        pass
+
+
+class FetchPublicURLTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), ImageServer)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f'http://127.0.0.1:{cls.server.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        ImageServer.hits = []
+
+    def allow_loopback(self):
+        return mock.patch.object(storage, 'is_public_address', lambda address: True)
+
+    def test_public_addresses(self):
+        for address in ('127.0.0.1', '10.0.0.5', '172.16.0.1', '192.168.1.1', '169.254.169.254',
+                        '0.0.0.0', '100.64.0.1', '::1', 'fe80::1', 'fd00::1', '::ffff:127.0.0.1', '224.0.0.1'):
+            self.assertFalse(is_public_address(address), address)
+        for address in ('8.8.8.8', '104.16.0.1', '2606:4700::1'):
+            self.assertTrue(is_public_address(address), address)
+
+    def test_rejects_other_schemes(self):
+        for url in ('file:///etc/passwd', 'ftp://example.com/a.jpg', 'gopher://example.com/', '/media/a.jpg'):
+            with self.assertRaises(UnsafeURLError):
+                fetch_public_url(url, 1000, 5)
+
+    def test_rejects_internal_hosts(self):
+        for url in (f'{self.base}/ok', 'http://localhost/ok', 'http://169.254.169.254/latest/meta-data/'):
+            with self.assertRaises(UnsafeURLError):
+                fetch_public_url(url, 1000, 5)
+        self.assertEqual(ImageServer.hits, [])
+
+    def test_rejects_hosts_with_any_private_record(self):
+        records = [(None, None, None, '', ('93.184.216.34', 80)), (None, None, None, '', ('10.0.0.1', 80))]
+        with mock.patch.object(storage.socket, 'getaddrinfo', return_value=records):
+            with self.assertRaises(UnsafeURLError):
+                fetch_public_url('http://rebind.example.com/a.jpg', 1000, 5)
+
+    def test_fetches_public_url(self):
+        with self.allow_loopback():
+            self.assertEqual(fetch_public_url(f'{self.base}/ok', 1000, 5), b'x' * 100)
+
+    def test_does_not_follow_redirects(self):
+        with self.allow_loopback(), self.assertRaises(UnsafeURLError):
+            fetch_public_url(f'{self.base}/redirect', 1000, 5)
+        self.assertEqual(ImageServer.hits, ['/redirect'])
+
+    def test_caps_response_size(self):
+        with self.allow_loopback(), self.assertRaises(UnsafeURLError):
+            fetch_public_url(f'{self.base}/big', 1000, 5)
+
+
+class ListingImageUploadTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root, LISTING_IMAGE_STORAGE='apps.marketplace.storage.LocalImageStorage',
+            LISTING_IMAGE_FORMATS=['webp'],
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        get_image_storage.cache_clear()
+        self.addCleanup(get_image_storage.cache_clear)
+
+        self.seller = get_user_model().objects.create_user(email='seller@example.com', username='seller', password='x')
+        self.listing = create_listing(self.seller)
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def upload(self):
+        upload = SimpleUploadedFile('bike.jpg', jpeg_bytes(), content_type='image/jpeg')
+        return self.client.post(f'/api/marketplace/listings/{self.listing.pk}/images/', {'image': upload})
+
+    def test_upload_returns_image_fields(self):
+        with mock.patch.object(images._executor, 'submit'):
+            response = self.upload()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['listing'], self.listing.pk)
+        self.assertEqual(response.data['order'], 0)
+        self.assertTrue(response.data['is_primary'])
+        self.assertEqual(response.data['processing_status'], 'pending')
+
+    def test_lost_job_is_reprocessed_by_command(self):
+        # The worker never runs the job, as if it died after the response
+        with mock.patch.object(images._executor, 'submit'), self.captureOnCommitCallbacks(execute=True):
+            self.upload()
+        image = ListingImage.objects.get(listing=self.listing)
+        self.assertEqual(image.processing_status, 'pending')
+        self.assertTrue(image.source_url)
+        self.assertTrue(get_image_storage().storage.exists(image.source_url[len(settings.MEDIA_URL):]))
+
+        call_command('process_listing_images', stdout=io.StringIO())
+        image.refresh_from_db()
+        self.assertEqual(image.processing_status, 'ready')
+        self.assertEqual((image.width, image.height), (64, 48))
+        self.assertEqual(image.variants.count(), 3)
+        # The served original is the processed (EXIF-free) variant, not the upload
+        self.assertNotEqual(image.image_url, image.source_url)
+
+
+    def test_job_for_a_deleted_image_is_dropped(self):
+        with mock.patch.object(images._executor, 'submit'):
+            image_id = self.upload().data['id']
+        self.listing.delete()
+        with self.assertNoLogs('apps.marketplace.images', 'ERROR'):
+            images.process_image(image_id)
+
+    def test_direct_upload_is_kept_as_source(self):
+        response = self.client.post(f'/api/marketplace/listings/{self.listing.pk}/images/sign/')
+        token, upload = response.data['upload_token'], response.data['upload']
+        file = SimpleUploadedFile('bike.jpg', jpeg_bytes(), content_type='image/jpeg')
+        response = self.client.post(upload['url'], {**upload['fields'], upload['file_field']: file})
+        self.assertLess(response.status_code, 300)
+
+        complete = f'/api/marketplace/listings/{self.listing.pk}/images/complete/'
+        with mock.patch.object(images._executor, 'submit') as submit, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(complete, {'upload_token': token})
+            self.assertEqual(response.status_code, 201)
+            # Completing twice registers the upload once
+            self.assertEqual(self.client.post(complete, {'upload_token': token}).status_code, 200)
+        self.assertEqual(submit.call_count, 1)
+        image = ListingImage.objects.get(listing=self.listing)
+        self.assertEqual(image.image_url, '')
+        self.assertTrue(image.source_url.endswith(upload['fields']['key']))
+
+        call_command('process_listing_images', stdout=io.StringIO())
+        image.refresh_from_db()
+        self.assertEqual(image.processing_status, 'ready')
+        self.assertIn('/full.webp', image.image_url)
+
+class ListingDistanceTests(TestCase):
+    def setUp(self):
+        seller = get_user_model().objects.create_user(email='seller@example.com', username='seller', password='x')
+        self.far = create_listing(seller, title='Far', location='Chattogram')
+        self.near = create_listing(seller, title='Near', location='Dhaka')
+
+    def test_ordering_by_distance_without_near(self):
+        response = self.client.get('/api/marketplace/listings/?ordering=distance_km')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({row['distance_km'] for row in response.json()['results']}, {None})
+
+    def test_ordering_by_distance_near_a_point(self):
+        response = self.client.get('/api/marketplace/listings/?near=Dhaka&radius_km=300&ordering=-distance_km')
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([row['id'] for row in results], [self.far.pk, self.near.pk])
+        self.assertEqual(results[1]['distance_km'], 0.0)
+
+
+class ListingCreateTests(TestCase):
+    def setUp(self):
+        self.seller = get_user_model().objects.create_user(email='seller@example.com', username='seller', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def payload(self, **fields):
+        return {
+            'title': 'Suzuki Gixxer', 'price': '210000.00', 'mileage': 8000, 'manufacturing_year': 2022,
+            'condition': 'good', 'description': 'First owner', 'location': 'Dhaka', **fields,
+        }
+
+    def test_seller_cannot_set_external_id_or_rank_score(self):
+        for _ in range(2):
+            response = self.client.post(
+                '/api/marketplace/listings/', self.payload(external_id='SKU-1', rank_score=1e9), format='json',
+            )
+            self.assertEqual(response.status_code, 201)
+        listings = UsedBikeListing.objects.filter(seller=self.seller)
+        self.assertEqual(listings.count(), 2)
+        self.assertFalse(listings.filter(external_id__isnull=False).exists())
+        self.assertFalse(listings.filter(rank_score=1e9).exists())
+
+    def test_seller_cannot_raise_their_rank(self):
+        boosts = {'is_featured': True, 'is_urgent': True, 'status': 'active'}
+        response = self.client.post('/api/marketplace/listings/', self.payload(**boosts), format='json')
+        self.assertEqual(response.status_code, 201)
+        listing = UsedBikeListing.objects.get(seller=self.seller)
+        self.assertEqual((listing.is_featured, listing.is_urgent, listing.status), (False, False, 'pending'))
+
+        listing = create_listing(self.seller)
+        response = self.client.patch(f'/api/marketplace/listings/{listing.pk}/', {**boosts, 'status': 'sold'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        rank_score = listing.rank_score
+        listing.refresh_from_db()
+        self.assertEqual((listing.is_featured, listing.is_urgent, listing.status), (False, False, 'active'))
+        self.assertAlmostEqual(listing.rank_score, rank_score, places=3)
+
+    def test_bulk_rows_cannot_set_status_or_urgency(self):
+        report = ingest_listings(self.seller, [{**self.payload(external_id='SKU-1'), 'is_urgent': True, 'status': 'active'}])
+        self.assertEqual(report['created'], 1)
+        listing = UsedBikeListing.objects.get(seller=self.seller)
+        self.assertEqual((listing.is_urgent, listing.status), (False, 'pending'))
+
+    def test_external_id_is_not_public(self):
+        listing = create_listing(self.seller, external_id='SKU-9')
+        detail = APIClient().get(f'/api/marketplace/listings/{listing.pk}/').json()
+        self.assertNotIn('external_id', detail)
+        self.assertEqual(detail['id'], listing.pk)
+        feed = APIClient().get('/api/marketplace/listings/').json()['results']
+        self.assertNotIn('external_id', feed[0])
+
+
+class DedupeTests(TestCase):
+    def setUp(self):
+        self.seller = get_user_model().objects.create_user(email='seller@example.com', username='seller', password='x')
+        self.description = 'Single owner, serviced at the dealer every 3000 km, new tyres and chain sprocket kit'
+
+    def run_jobs(self):
+        return mock.patch.object(dedupe._executor, 'submit', lambda run, listing_ids: dedupe.index_listings(listing_ids))
+
+    def lose_jobs(self):
+        return mock.patch.object(dedupe._executor, 'submit')
+
+    def test_repost_is_flagged_after_commit(self):
+        with self.run_jobs(), self.captureOnCommitCallbacks(execute=True):
+            original = create_listing(self.seller, description=self.description)
+        with self.run_jobs(), self.captureOnCommitCallbacks(execute=True):
+            repost = create_listing(self.seller, description=self.description)
+            # Nothing is fingerprinted on the save itself
+            self.assertFalse(ListingFingerprint.objects.filter(listing=repost).exists())
+        repost.refresh_from_db()
+        self.assertEqual(repost.duplicate_of_id, original.pk)
+
+        # Editing the repost into a different bike clears the flag
+        with self.run_jobs(), self.captureOnCommitCallbacks(execute=True):
+            repost.title, repost.description, repost.manufacturing_year = 'Honda CBR 150R', 'Racing exhaust', 2016
+            repost.save()
+        repost.refresh_from_db()
+        self.assertIsNone(repost.duplicate_of_id)
+
+    def test_command_indexes_lost_jobs_and_clears_stale_flags(self):
+        with self.lose_jobs(), self.captureOnCommitCallbacks(execute=True):
+            original = create_listing(self.seller, description=self.description)
+            repost = create_listing(self.seller, description=self.description)
+            other = create_listing(self.seller, title='Honda CBR 150R', description='Racing exhaust', manufacturing_year=2016)
+        self.assertFalse(ListingFingerprint.objects.exists())
+        # A flag the clustering does not back, e.g. from before an edit
+        UsedBikeListing.objects.filter(pk=other.pk).update(duplicate_of=original)
+
+        output = io.StringIO()
+        call_command('dedupe_listings', stdout=output)
+        self.assertEqual(ListingFingerprint.objects.count(), 3)
+        self.assertEqual(ListingLSHBucket.objects.filter(listing=repost).count(), dedupe.BANDS)
+        self.assertEqual(
+            dict(UsedBikeListing.objects.values_list('id', 'duplicate_of')),
+            {original.pk: None, repost.pk: original.pk, other.pk: None},
+        )
+        self.assertIn('cleared 1 stale flags', output.getvalue())
+
+    def test_candidates_sharing_more_bands_come_first(self):
+        with self.lose_jobs():
+            weak, strong, listing = (create_listing(self.seller) for _ in range(3))
+        signature = dedupe.minhash(dedupe.listing_shingles(listing))
+        keys = dedupe.band_keys(signature)
+        ListingFingerprint.objects.bulk_create([
+            ListingFingerprint(listing=weak, signature=dedupe.pack(signature)),
+            ListingFingerprint(listing=strong, signature=dedupe.pack(signature)),
+        ])
+        ListingLSHBucket.objects.bulk_create(
+            [ListingLSHBucket(listing=weak, key=keys[0])] + [ListingLSHBucket(listing=strong, key=key) for key in keys]
+        )
+        with mock.patch.object(dedupe, 'MAX_CANDIDATES', 1):
+            self.assertEqual(dedupe.find_duplicate(listing.pk, signature, keys), strong.pk)
+
+
+class PriceStatsTests(TestCase):
+    def setUp(self):
+        self.seller = get_user_model().objects.create_user(email='seller@example.com', username='seller', password='x')
+        brand = Brand.objects.create(name='Yamaha', slug='yamaha')
+        self.bike = BikeModel.objects.create(
+            brand=brand, name='R15 V3', slug='yamaha-r15-v3', category='sports', engine_capacity=155, price=450000,
+        )
+        self.listing = create_listing(self.seller, bike_model=self.bike)
+
+    def assertStat(self, count, median=None):
+        stat = PriceStat.objects.get(bike_model=self.bike, manufacturing_year=2021, condition='good')
+        self.assertEqual(stat.count, count)
+        if median is None:
+            self.assertIsNone(stat.price_median)
+        else:
+            # The sketch is accurate to 1%
+            self.assertAlmostEqual(float(stat.price_median), median, delta=median * 0.01)
+
+    def test_price_update(self):
+        self.assertStat(1, 350000)
+        listing = UsedBikeListing.objects.get(pk=self.listing.pk)
+        listing.price = 300000
+        listing.save()
+        self.assertStat(1, 300000)
+
+    def test_partially_loaded_and_built_instances(self):
+        listing = UsedBikeListing.objects.only('id', 'price').get(pk=self.listing.pk)
+        listing.price = 300000
+        listing.save(update_fields=['price'])
+        self.assertStat(1, 300000)
+
+        built = UsedBikeListing(**{
+            field.attname: getattr(self.listing, field.attname) for field in UsedBikeListing._meta.concrete_fields
+        })
+        built.price = 280000
+        built.save()
+        self.assertStat(1, 280000)
+
+    def test_status_transitions(self):
+        listing = UsedBikeListing.objects.only('id').get(pk=self.listing.pk)
+        listing.status = 'sold'
+        listing.save(update_fields=['status'])
+        self.assertStat(0)
+        listing.status = 'active'
+        listing.save(update_fields=['status'])
+        self.assertStat(1, 350000)
+
+    def test_delete(self):
+        second = create_listing(self.seller, bike_model=self.bike, price=400000)
+        UsedBikeListing.objects.only('id').get(pk=self.listing.pk).delete()
+        self.assertStat(1, 400000)
+        UsedBikeListing.objects.filter(pk=second.pk).delete()
+        self.assertStat(0)
+
+
+class ListingLifecycleTests(TestCase):
+    def setUp(self):
+        self.seller = get_user_model().objects.create_user(email='seller@example.com', username='seller', password='x')
+        brand = Brand.objects.create(name='Yamaha', slug='yamaha')
+        self.bike = BikeModel.objects.create(
+            brand=brand, name='R15 V3', slug='yamaha-r15-v3', category='sports', engine_capacity=155, price=450000,
+        )
+
+    def aged(self, days, **fields):
+        listing = create_listing(self.seller, bike_model=self.bike, **fields)
+        then = timezone.now() - timedelta(days=days)
+        UsedBikeListing.objects.filter(pk=listing.pk).update(created_at=then, updated_at=then)
+        return listing
+
+    def run_command(self):
+        out = io.StringIO()
+        call_command('listing_lifecycle', expire_after_days=60, archive_after_days=90, batch_size=1, stdout=out)
+        return out.getvalue()
+
+    def test_expires_stale_active_listings(self):
+        stale = [self.aged(61), self.aged(70)]
+        fresh = self.aged(10)
+        self.assertIn("Expired 2 listings, archived 0 listings.", self.run_command())
+
+        statuses = dict(UsedBikeListing.objects.values_list('id', 'status'))
+        self.assertEqual(statuses, {stale[0].pk: 'expired', stale[1].pk: 'expired', fresh.pk: 'active'})
+        # The bulk update kept the price stats and seller counters in step
+        stat = PriceStat.objects.get(bike_model=self.bike, manufacturing_year=2021, condition='good')
+        self.assertEqual(stat.count, 1)
+        self.seller.stats.refresh_from_db()
+        self.assertEqual(self.seller.stats.active_listings_count, 1)
+
+    def test_archives_old_sold_and_expired_listings(self):
+        sold = self.aged(100, status='sold')
+        ListingImage.objects.create(listing=sold, image_url='https://cdn.example.com/a.jpg', is_primary=True)
+        ListingImage.objects.create(
+            listing=sold, source_url='https://cdn.example.com/uploads/b', order=1, processing_status='failed',
+        )
+        expired = self.aged(95, status='expired')
+        recent = self.aged(30, status='sold')
+        self.assertIn("archived 2 listings", self.run_command())
+
+        self.assertEqual(list(UsedBikeListing.objects.values_list('id', flat=True)), [recent.pk])
+        archived = ArchivedListing.objects.get(pk=sold.pk)
+        self.assertEqual((archived.title, archived.status, archived.seller_id), (sold.title, 'sold', self.seller.pk))
+        self.assertEqual(archived.images, [{'image_url': 'https://cdn.example.com/a.jpg', 'is_primary': True, 'order': 0}])
+        self.assertTrue(ArchivedListing.objects.filter(pk=expired.pk).exists())
+
+        # Old links still resolve, from the archive
+        response = APIClient().get(f'/api/marketplace/listings/{sold.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'sold')
+
+    def test_listing_relisted_during_the_run_is_kept(self):
+        relisted = self.aged(100, status='sold')
+        sold = self.aged(100, status='sold')
+        scan = listing_lifecycle.keyset_batches
+
+        def relist_after_scan(queryset, batch_size):
+            for ids in scan(queryset, batch_size):
+                UsedBikeListing.objects.filter(pk=relisted.pk).update(status='active', updated_at=timezone.now())
+                yield ids
+
+        with mock.patch.object(listing_lifecycle, 'keyset_batches', relist_after_scan):
+            self.assertIn("archived 1 listings", self.run_command())
+        self.assertEqual(list(UsedBikeListing.objects.values_list('id', flat=True)), [relisted.pk])
+        self.assertEqual(list(ArchivedListing.objects.values_list('id', flat=True)), [sold.pk])
+
+
+class RankScoreTests(TestCase):
+    def setUp(self):
+        self.seller = get_user_model().objects.create_user(email='seller@example.com', username='seller', password='x')
+        self.listing = create_listing(self.seller)
+
+    def add_photo(self, order=0):
+        return ListingImage.objects.create(listing=self.listing, image_url=f'https://cdn.example.com/{order}.jpg', order=order)
+
+    def reload(self):
+        return UsedBikeListing.objects.get(pk=self.listing.pk)
+
+    def test_photo_count_follows_images(self):
+        score = self.reload().rank_score
+        photos = [self.add_photo(order) for order in range(2)]
+        listing = self.reload()
+        self.assertEqual(listing.photo_count, 2)
+        self.assertGreater(listing.rank_score, score)
+        photos[0].delete()
+        self.assertEqual(self.reload().photo_count, 1)
+
+    def test_save_does_not_query_images(self):
+        self.add_photo()
+        listing = self.reload()
+        listing.is_featured = True
+        with CaptureQueriesContext(connection) as queries:
+            listing.save()
+        self.assertFalse([q['sql'] for q in queries if 'marketplace_listingimage' in q['sql']])
+        self.assertEqual(self.reload().rank_score, compute_rank_score(listing, 1))
+
+    def test_recompute_command_agrees_with_save(self):
+        self.add_photo()
+        listing = self.reload()
+        listing.save()
+        call_command('recompute_rank_scores', stdout=io.StringIO())
+        self.assertAlmostEqual(self.reload().rank_score, listing.rank_score, places=3)
@@ -1,10 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import UsedBikeListingViewSet
+from .views import UsedBikeListingViewSet, PriceStatViewSet, LocalUploadView
 
 router = DefaultRouter()
 router.register(r'listings', UsedBikeListingViewSet)
+router.register(r'price-stats', PriceStatViewSet)
 
 urlpatterns = [
+    path('uploads/local/', LocalUploadView.as_view(), name='listing-upload-local'),
     path('', include(router.urls)),
 ]
@@ -1,8 +1,33 @@
-from rest_framework import viewsets, filters, permissions
+import mimetypes
+import secrets
+
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+from django.db.models import FloatField, Prefetch, Value
+from django.http import Http404
+from rest_framework import viewsets, filters, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import UsedBikeListing
-from .serializers import UsedBikeListingSerializer, UsedBikeListingCreateSerializer
+from core.renderers import ORJSONParser
+from core.throttling import SharedScopedRateThrottle
+from .geo import filter_within, normalize_location, parse_point
+from .images import enqueue_image
+from .ingest import ingest_listings
+from .models import UsedBikeListing, ListingImage, ListingImageVariant, ArchivedListing, PriceStat
+from .parsers import CSVParser
+from .pricing import price_percentiles
+from .storage import LocalImageStorage, get_image_storage
+from .serializers import (
+    UsedBikeListingSerializer, UsedBikeListingListSerializer, UsedBikeListingCreateSerializer,
+    ListingImageSerializer, ArchivedListingSerializer, PriceStatSerializer,
+)
 
 
 class IsSellerOrReadOnly(permissions.BasePermission):
@@ -17,25 +42,238 @@ class IsSellerOrReadOnly(permissions.BasePermission):
         # Write permissions are only allowed to the seller of the listing
         return obj.seller == request.user
 
+UPLOAD_TOKEN_SALT = 'marketplace.listing-upload'
+
+class IsDealer(permissions.BasePermission):
+    message = "Bulk listing upload is only available to dealer accounts."
+
+    def has_permission(self, request, view):
+        user = request.user
+        if getattr(user, 'role', None) == 'dealer':
+            return True
+        profile = getattr(user, 'profile', None) if user.is_authenticated else None
+        return bool(profile and profile.is_dealer)
+
 class UsedBikeListingViewSet(viewsets.ModelViewSet):
-    queryset = UsedBikeListing.objects.filter(status='active').order_by('-is_featured', '-created_at')
+    # Served by the (status, -rank_score, -id) index
+    queryset = UsedBikeListing.objects.filter(status='active').order_by('-rank_score', '-id')
 
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['bike_model__brand', 'condition', 'location']
     search_fields = ['title', 'description', 'location']
-    ordering_fields = ['price', 'created_at', 'mileage']
+    ordering_fields = ['price', 'created_at', 'mileage', 'distance_km', 'rank_score']
+    max_radius_km = 300
+    throttle_scope = 'listing_create'
+    response_cache_tags = (
+        'marketplace.UsedBikeListing', 'marketplace.ListingImage', 'marketplace.ListingImageVariant',
+        'marketplace.ArchivedListing', 'marketplace.PriceStat', 'bikes.BikeModel', 'bikes.Brand', 'users.User',
+    )
+
+    def get_queryset(self):
+        if self.action == 'retrieve':
+            # Sold and expired listings stay reachable by direct link
+            return UsedBikeListing.objects.filter(status__in=['active', 'sold', 'expired']).prefetch_related(
+                'images__variants'
+            )
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            card_images = ListingImage.objects.order_by('-is_primary', 'order').prefetch_related(
+                Prefetch('variants', queryset=ListingImageVariant.objects.filter(kind='card'))
+            )
+            queryset = queryset.select_related('seller', 'bike_model__brand').prefetch_related(
+                Prefetch('images', queryset=card_images)
+            )
+        params = self.request.query_params
+
+        if params.get('collapse_duplicates') in ('1', 'true'):
+            queryset = queryset.filter(duplicate_of__isnull=True)
+
+        district = params.get('district')
+        if district:
+            if district.isdigit():
+                queryset = queryset.filter(district_id=int(district))
+            else:
+                place = normalize_location(district)
+                queryset = queryset.filter(district_id=place.district_id) if place else queryset.none()
+
+        near = params.get('near')
+        if near:
+            point = parse_point(near)
+            if point is None:
+                raise ValidationError({'near': 'Unknown location.'})
+            try:
+                radius_km = float(params.get('radius_km', 10))
+            except ValueError:
+                raise ValidationError({'radius_km': 'Must be a number.'})
+            if not 0 < radius_km <= self.max_radius_km:
+                raise ValidationError({'radius_km': f'Must be between 0 and {self.max_radius_km}.'})
+            queryset = filter_within(queryset, point[0], point[1], radius_km)
+        else:
+            # ?ordering=distance_km is then a no-op rather than an unknown field
+            queryset = queryset.annotate(distance_km=Value(None, output_field=FloatField()))
+        return queryset
     
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
             return UsedBikeListingCreateSerializer
+        if self.action == 'list':
+            return UsedBikeListingListSerializer
         return UsedBikeListingSerializer
 
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        listings = page if page is not None else list(queryset)
+        # One query for the stats of every model/year/condition on this page
+        context = {**self.get_serializer_context(), 'price_percentiles': price_percentiles(listings)}
+        serializer = self.get_serializer_class()(listings, many=True, context=context)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            archived = get_object_or_404(ArchivedListing.objects.select_related('seller', 'bike_model__brand'), pk=kwargs['pk'])
+            return Response(ArchivedListingSerializer(archived).data)
+
     def perform_create(self, serializer):
         serializer.save(seller=self.request.user)
 
+    @action(detail=False, methods=['post'], url_path='bulk', parser_classes=[ORJSONParser, CSVParser])
+    def bulk(self, request):
+        """
+        Upsert up to MARKETPLACE_BULK_MAX_LISTINGS listings keyed by `external_id`.
+        Accepts a JSON list (or {"listings": [...]}) or a CSV upload.
+        """
+        rows = request.data.get('listings') if isinstance(request.data, dict) else request.data
+        if not isinstance(rows, list) or not rows:
+            return Response({"error": "Expected a non-empty list of listings"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = settings.MARKETPLACE_BULK_MAX_LISTINGS
+        if len(rows) > limit:
+            return Response({"error": f"At most {limit} listings per request"}, status=status.HTTP_400_BAD_REQUEST)
+
+        report = ingest_listings(request.user, rows)
+        processed = report['created'] + report['updated'] + report['unchanged']
+        return Response(report, status=status.HTTP_200_OK if processed else status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=True, methods=['post'], url_path='images', parser_classes=[MultiPartParser])
+    def upload_image(self, request, pk=None):
+        """Accept a photo upload; variants are generated off the request thread."""
+        listing = get_object_or_404(UsedBikeListing, pk=pk, seller=request.user)
+        upload = request.FILES.get('image')
+        if upload is None:
+            return Response({"error": "An 'image' file is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if upload.size > settings.LISTING_IMAGE_MAX_UPLOAD_BYTES:
+            return Response({"error": "Image is too large"}, status=status.HTTP_400_BAD_REQUEST)
+        if not (upload.content_type or '').startswith('image/'):
+            return Response({"error": "Unsupported file type"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # The original goes to storage first so processing can be retried if the worker dies
+        source = upload.read()
+        extension = mimetypes.guess_extension(upload.content_type) or '.jpg'
+        key = f"uploads/{listing.id}/{secrets.token_hex(12)}{extension}"
+        source_url = get_image_storage().save(key, source, upload.content_type)
+        with transaction.atomic():
+            image = ListingImage.objects.create(
+                listing=listing,
+                source_url=source_url,
+                is_primary=not listing.images.exists(),
+                order=listing.images.count(),
+            )
+            enqueue_image(image.id, source)
+        return Response(ListingImageSerializer(image).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['post'], url_path='images/sign')
+    def sign_image_upload(self, request, pk=None):
+        """Issue short-lived parameters for uploading a photo straight to storage."""
+        listing = get_object_or_404(UsedBikeListing, pk=pk, seller=request.user)
+        key = f"uploads/{listing.id}/{secrets.token_hex(12)}"
+        expires_in = settings.LISTING_UPLOAD_EXPIRY_SECONDS
+        upload = get_image_storage().signed_upload(key, settings.LISTING_IMAGE_MAX_UPLOAD_BYTES, expires_in)
+        token = signing.dumps({'listing': listing.id, 'key': key}, salt=UPLOAD_TOKEN_SALT)
+        return Response({'upload_token': token, 'upload': upload})
+
+    @action(detail=True, methods=['post'], url_path='images/complete')
+    def complete_image_upload(self, request, pk=None):
+        """Register a photo the client uploaded directly to storage."""
+        listing = get_object_or_404(UsedBikeListing, pk=pk, seller=request.user)
+        try:
+            token = signing.loads(
+                request.data.get('upload_token', ''), salt=UPLOAD_TOKEN_SALT,
+                max_age=settings.LISTING_UPLOAD_EXPIRY_SECONDS * 2,
+            )
+        except signing.BadSignature:
+            return Response({"error": "Invalid or expired upload token"}, status=status.HTTP_400_BAD_REQUEST)
+        if token['listing'] != listing.id:
+            return Response({"error": "Upload token is for another listing"}, status=status.HTTP_400_BAD_REQUEST)
+
+        url = get_image_storage().verify_upload(token['key'], request.data)
+        if url is None:
+            return Response({"error": "Upload could not be verified"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Kept as the source; image_url is set to the processed variant once it is ready
+        with transaction.atomic():
+            image, created = ListingImage.objects.get_or_create(
+                listing=listing, source_url=url,
+                defaults={'is_primary': not listing.images.exists(), 'order': listing.images.count()},
+            )
+            if created:
+                enqueue_image(image.id)
+        return Response(ListingImageSerializer(image).data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
     def get_permissions(self):
+        if self.action in ['upload_image', 'sign_image_upload', 'complete_image_upload']:
+            return [IsAuthenticated()]
+        if self.action == 'bulk':
+            return [IsAuthenticated(), IsDealer()]
         if self.action == 'create':
             return [IsAuthenticated()]
         elif self.action in ['update', 'partial_update', 'destroy']:
             return [IsAuthenticated(), IsSellerOrReadOnly()]
         return [AllowAny()]
+
+    def get_throttles(self):
+        if self.action in ['create', 'bulk']:
+            return [SharedScopedRateThrottle()]
+        return []
+
+
+class LocalUploadView(APIView):
+    """
+    Development stand-in for a storage provider's upload endpoint: accepts a
+    file only with a valid, unexpired HMAC signature from `sign_image_upload`.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        storage = get_image_storage()
+        if not isinstance(storage, LocalImageStorage):
+            raise Http404
+        try:
+            key = request.data['key']
+            expires = int(request.data['expires'])
+            max_bytes = int(request.data['max_bytes'])
+            signature = request.data['signature']
+            upload = request.FILES['file']
+        except (KeyError, ValueError):
+            return Response({"error": "Missing upload fields"}, status=status.HTTP_400_BAD_REQUEST)
+        if not storage.check_upload_signature(key, expires, max_bytes, signature):
+            return Response({"error": "Invalid or expired signature"}, status=status.HTTP_403_FORBIDDEN)
+        if upload.size > max_bytes:
+            return Response({"error": "File too large"}, status=status.HTTP_400_BAD_REQUEST)
+
+        url = storage.save(key, upload.read(), upload.content_type)
+        return Response({'key': key, 'url': url}, status=status.HTTP_201_CREATED)
+
+class PriceStatViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = PriceStat.objects.filter(count__gt=0).select_related('bike_model__brand')
+    serializer_class = PriceStatSerializer
+    permission_classes = [AllowAny]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['bike_model', 'manufacturing_year', 'condition']
+    ordering_fields = ['manufacturing_year', 'price_median', 'count']
+    response_cache_tags = ('marketplace.PriceStat', 'bikes.BikeModel', 'bikes.Brand')
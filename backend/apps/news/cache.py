@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.cache import cache
+
+
+def article_cache_key(slug: str) -> str:
+    # v2: payloads no longer carry the raw body
+    return f"news:article:v2:{slug}"
+
+
+def get_cached_article(slug: str):
+    return cache.get(article_cache_key(slug))
+
+
+def cache_article(slug: str, data: dict):
+    cache.set(article_cache_key(slug), data, settings.NEWS_ARTICLE_CACHE_SECONDS)
+
+
+async def aget_cached_article(slug: str):
+    return await cache.aget(article_cache_key(slug))
+
+
+async def acache_article(slug: str, data: dict):
+    await cache.aset(article_cache_key(slug), data, settings.NEWS_ARTICLE_CACHE_SECONDS)
+
+
+def invalidate_articles(*slugs: str):
+    keys = [article_cache_key(slug) for slug in slugs if slug]
+    if keys:
+        cache.delete_many(keys)
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:48
+
+from django.db import migrations, models
+
+
+def render_published(apps, schema_editor):
+    from apps.news.rendering import render_article
+
+    Article = apps.get_model('news', 'Article')
+    batch = []
+    for article in Article.objects.filter(is_published=True).only('id', 'content').iterator(chunk_size=500):
+        rendered = render_article(article.content)
+        article.content_html = rendered.html
+        article.toc = rendered.toc
+        article.reading_time = rendered.reading_time
+        batch.append(article)
+    Article.objects.bulk_update(batch, ['content_html', 'toc', 'reading_time'], batch_size=500)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='reading_time',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='toc',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.RunPython(render_published, migrations.RunPython.noop),
+    ]
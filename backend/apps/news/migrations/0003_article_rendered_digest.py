@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:10
+
+from django.db import migrations, models
+
+
+def stamp_published(apps, schema_editor):
+    from apps.news.rendering import content_digest
+
+    # Published bodies were re-rendered on every edit; unpublished ones may be stale
+    # and are left blank, so they render again when republished
+    Article = apps.get_model('news', 'Article')
+    batch = []
+    for article in Article.objects.filter(is_published=True).only('id', 'content').iterator(chunk_size=500):
+        article.rendered_digest = content_digest(article.content)
+        batch.append(article)
+    Article.objects.bulk_update(batch, ['rendered_digest'], batch_size=500)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0002_article_rendered_content'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='rendered_digest',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.RunPython(stamp_published, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,8 @@ from django.db import models
 from django.conf import settings
 from django.utils.text import slugify
 
+from .rendering import content_digest, render_article
+
 class NewsCategory(models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True, blank=True)
@@ -50,6 +52,13 @@ class Article(models.Model):
         related_name='articles'
     )
     tags = models.ManyToManyField(Tag, blank=True)
+
+    # Rendered when the article is published, and again when its body no longer
+    # matches the body the stored rendering was made from
+    content_html = models.TextField(blank=True, editable=False)
+    reading_time = models.PositiveSmallIntegerField(default=0, editable=False)
+    toc = models.JSONField(default=list, blank=True, editable=False)
+    rendered_digest = models.CharField(max_length=64, blank=True, editable=False)
     
     views = models.PositiveIntegerField(default=0)
     is_published = models.BooleanField(default=False)
@@ -58,10 +67,31 @@ class Article(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Stored slug, so a renamed article's old cache entry is dropped
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def render(self):
+        rendered = render_article(self.content)
+        self.content_html = rendered.html
+        self.toc = rendered.toc
+        self.reading_time = rendered.reading_time
+        self.rendered_digest = content_digest(self.content)
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        # Edits made while unpublished are rendered on republishing
+        if self.is_published and self.rendered_digest != content_digest(self.content):
+            self.render()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'content_html', 'toc', 'reading_time', 'rendered_digest'}
         super().save(*args, **kwargs)
+        self._loaded_values = {'slug': self.slug}
 
     def __str__(self):
         return self.title
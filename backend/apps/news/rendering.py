@@ -0,0 +1,166 @@
+import hashlib
+import html
+import math
+import re
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Dict, List
+
+from django.utils.text import slugify
+
+ALLOWED_TAGS = {
+    'p', 'br', 'hr', 'h2', 'h3', 'h4', 'strong', 'b', 'em', 'i', 'u', 's',
+    'ul', 'ol', 'li', 'blockquote', 'pre', 'code', 'a', 'img', 'figure', 'figcaption',
+    'table', 'thead', 'tbody', 'tr', 'th', 'td',
+}
+ALLOWED_ATTRS = {
+    'a': {'href', 'title'},
+    'img': {'src', 'alt', 'title', 'width', 'height'},
+    'th': {'colspan', 'rowspan'},
+    'td': {'colspan', 'rowspan'},
+}
+URL_ATTRS = {'href', 'src'}
+ALLOWED_SCHEMES = {'http', 'https', 'mailto'}
+VOID_TAGS = {'br', 'hr', 'img'}
+# Tags whose whole content is dropped, not just the tag itself
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'noscript', 'template', 'svg', 'math'}
+TOC_TAGS = {'h2', 'h3'}
+WORDS_PER_MINUTE = 200
+# Bodies containing none of these are treated as plain text, so "<two>" in prose survives
+MARKUP_RE = re.compile(
+    r'</?(?:%s|div|span|h1|h5|h6)\b' % '|'.join(sorted(ALLOWED_TAGS | DROP_CONTENT_TAGS)), re.IGNORECASE
+)
+
+
+@dataclass
+class RenderedArticle:
+    html: str
+    toc: List[Dict[str, object]] = field(default_factory=list)
+    reading_time: int = 1
+
+
+# Browsers ignore tabs and newlines anywhere in a URL and control characters
+# around it, so "java&#x0A;script:" still runs; none of these may hide a scheme
+URL_IGNORED_RE = re.compile(r'[\x00-\x20\x7f]+')
+SCHEME_RE = re.compile(r'([a-zA-Z][a-zA-Z0-9+.-]*):')
+
+
+def _safe_url(value: str) -> bool:
+    """`value` is the attribute after entity decoding (HTMLParser does that)."""
+    scheme = SCHEME_RE.match(URL_IGNORED_RE.sub('', value))
+    return scheme is None or scheme.group(1).lower() in ALLOWED_SCHEMES
+
+
+class _Sanitizer(HTMLParser):
+    """Re-emit only allowlisted tags/attributes, giving h2/h3 anchors for the table of contents."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out: List[str] = []
+        self.text: List[str] = []
+        self.open_tags: List[str] = []
+        self.toc: List[Dict[str, object]] = []
+        self.anchors = set()
+        self.dropping = 0
+        self.heading = None  # (tag, out index, text index) while inside an h2/h3
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping or tag not in ALLOWED_TAGS:
+            return
+
+        allowed = ALLOWED_ATTRS.get(tag, set())
+        rendered = ''
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in URL_ATTRS and not _safe_url(value):
+                continue
+            rendered += f' {name}="{html.escape(value, quote=True)}"'
+        if tag == 'a':
+            rendered += ' rel="nofollow noopener"'
+
+        if tag in TOC_TAGS and self.heading is None:
+            self.heading = (tag, len(self.out), len(self.text))
+        self.out.append(f'<{tag}{rendered}>')
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.open_tags and self.open_tags[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping = max(self.dropping - 1, 0)
+            return
+        if self.dropping or tag not in self.open_tags:
+            return
+        # Close anything left open inside this tag so the output stays balanced
+        while self.open_tags:
+            current = self.open_tags.pop()
+            self.out.append(f'</{current}>')
+            if current == tag:
+                break
+        if self.heading and self.heading[0] == tag:
+            self._anchor_heading()
+
+    def handle_data(self, data):
+        if self.dropping:
+            return
+        self.out.append(html.escape(data, quote=False))
+        self.text.append(data)
+
+    def _anchor_heading(self):
+        tag, start, text_start = self.heading
+        self.heading = None
+        title = ' '.join(''.join(self.text[text_start:]).split())
+        if not title:
+            return
+        anchor = base = slugify(title) or 'section'
+        suffix = 2
+        while anchor in self.anchors:
+            anchor = f'{base}-{suffix}'
+            suffix += 1
+        self.anchors.add(anchor)
+        self.out[start] = self.out[start][:-1] + f' id="{anchor}">'
+        self.toc.append({'id': anchor, 'title': title, 'level': int(tag[1])})
+
+    def close(self):
+        super().close()
+        while self.open_tags:
+            self.out.append(f'</{self.open_tags.pop()}>')
+
+
+def _paragraphs(text: str) -> str:
+    """Plain-text bodies: blank lines separate paragraphs, single newlines become <br>."""
+    blocks = [block.strip() for block in re.split(r'\n\s*\n', text.replace('\r\n', '\n'))]
+    return ''.join(
+        '<p>' + html.escape(block, quote=False).replace('\n', '<br>') + '</p>'
+        for block in blocks if block
+    )
+
+
+def content_digest(content: str) -> str:
+    """Identifies the body a rendering was made from."""
+    return hashlib.sha256((content or '').encode('utf-8')).hexdigest()
+
+
+def render_article(content: str) -> RenderedArticle:
+    """Sanitize an article body to HTML and derive its table of contents and reading time."""
+    content = content or ''
+    source = content if MARKUP_RE.search(content) else _paragraphs(content)
+
+    parser = _Sanitizer()
+    parser.feed(source)
+    parser.close()
+
+    words = len(' '.join(parser.text).split())
+    return RenderedArticle(
+        html=''.join(parser.out),
+        toc=parser.toc,
+        reading_time=max(1, math.ceil(words / WORDS_PER_MINUTE)),
+    )
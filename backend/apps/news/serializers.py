@@ -12,7 +12,20 @@ class TagSerializer(serializers.ModelSerializer):
         model = Tag
         fields = '__all__'
 
+class ArticleListSerializer(serializers.ModelSerializer):
+    """Card payload: no body, category and tags as slugs."""
+    category = serializers.SlugRelatedField(slug_field='slug', read_only=True)
+    tags = serializers.SlugRelatedField(slug_field='slug', many=True, read_only=True)
+
+    class Meta:
+        model = Article
+        fields = [
+            'id', 'title', 'slug', 'excerpt', 'featured_image',
+            'category', 'tags', 'reading_time', 'views', 'published_at',
+        ]
+
 class ArticleSerializer(serializers.ModelSerializer):
+    """Detail payload: the sanitized `content_html` only, never the raw body."""
     author = UserSerializer(read_only=True)
     category = NewsCategorySerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
@@ -20,8 +33,8 @@ class ArticleSerializer(serializers.ModelSerializer):
     class Meta:
         model = Article
         fields = [
-            'id', 'title', 'slug', 'excerpt', 'content', 
-            'featured_image', 'author', 'category', 'tags', 
+            'id', 'title', 'slug', 'excerpt', 'content_html',
+            'reading_time', 'toc', 'featured_image', 'author', 'category', 'tags',
             'views', 'is_published', 'published_at', 
             'created_at', 'updated_at'
         ]
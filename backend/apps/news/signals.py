@@ -0,0 +1,37 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_articles
+from .models import Article, NewsCategory, Tag
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def article_changed(sender, instance, **kwargs):
+    loaded = getattr(instance, '_loaded_values', {})
+    invalidate_articles(instance.slug, loaded.get('slug'))
+
+
+@receiver(m2m_changed, sender=Article.tags.through)
+def article_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            invalidate_articles(instance.slug)
+    elif action == 'pre_clear':
+        # tag.article_set.clear() sends no pk_set, so collect the articles before they are detached
+        invalidate_articles(*instance.article_set.values_list('slug', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        invalidate_articles(*Article.objects.filter(pk__in=pk_set).values_list('slug', flat=True))
+
+
+@receiver(post_save, sender=NewsCategory)
+def category_changed(sender, instance, raw=False, **kwargs):
+    # Detail payloads embed the category, so a rename must reach them
+    if not raw:
+        invalidate_articles(*instance.articles.values_list('slug', flat=True))
+
+
+@receiver(post_save, sender=Tag)
+def tag_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_articles(*instance.article_set.values_list('slug', flat=True))
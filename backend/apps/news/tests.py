@@ -0,0 +1,115 @@
+import unittest
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.client import AsyncRequestFactory
+
+from core.renderers import msgpack
+
+from .models import Article, NewsCategory
+from .rendering import render_article
+from .views import ArticleDetailView
+
+
+class RenderArticleTests(SimpleTestCase):
+    def test_drops_script_and_event_handlers(self):
+        html = render_article('<p onclick="steal()">Hi<script>alert(1)</script></p>').html
+        self.assertEqual(html, '<p>Hi</p>')
+
+    def test_keeps_safe_links(self):
+        for url in ('https://example.com/a', '/news/other', '#section', 'mailto:desk@example.com'):
+            html = render_article(f'<p><a href="{url}">x</a></p>').html
+            self.assertIn(f'href="{url}"', html, url)
+
+    def test_drops_script_urls_however_they_are_spelled(self):
+        for url in (
+            'javascript:alert(1)',
+            'JavaScript:alert(1)',
+            ' javascript:alert(1)',
+            'java&#x0A;script:alert(1)',
+            'jav&#09;ascript:alert(1)',
+            'java\tscript:alert(1)',
+            'java\nscript:alert(1)',
+            '&#x01;javascript:alert(1)',
+            'javascript&colon;alert(1)',
+            '&#106;avascript:alert(1)',
+            'vbscript:msgbox(1)',
+            'data:text/html;base64,PHNjcmlwdD4=',
+        ):
+            html = render_article(f'<p><a href="{url}">x</a><img src="{url}"></p>').html
+            self.assertNotIn('href', html, url)
+            self.assertNotIn('src', html, url)
+            self.assertNotIn('script', html.lower(), url)
+
+    def test_table_of_contents(self):
+        rendered = render_article('<h2>Engine</h2><p>one two</p><h3>Engine</h3>')
+        self.assertEqual([entry['id'] for entry in rendered.toc], ['engine', 'engine-2'])
+        self.assertIn('<h2 id="engine">', rendered.html)
+
+
+class ArticleDetailTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = NewsCategory.objects.create(name='Reviews')
+        self.article = Article.objects.create(
+            title='R15 review', excerpt='Short', category=category, is_published=True,
+            content='<p>Fast<a href="java&#x0A;script:alert(1)">x</a></p>',
+        )
+
+    def views(self):
+        self.article.refresh_from_db(fields=['views'])
+        return self.article.views
+
+    def test_detail_serves_sanitized_body_only(self):
+        response = self.client.get('/api/news/r15-review/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertNotIn('content', data)
+        self.assertEqual(data['content_html'], '<p>Fast<a rel="nofollow noopener">x</a></p>')
+
+    def test_only_get_counts_a_view(self):
+        self.assertEqual(self.client.head('/api/news/r15-review/').status_code, 200)
+        self.assertEqual(self.views(), 0)
+        self.client.get('/api/news/r15-review/')
+        self.client.get('/api/news/r15-review/')  # from the cache
+        self.assertEqual(self.views(), 2)
+
+    def test_republishing_renders_edits_made_while_unpublished(self):
+        article = Article.objects.get(pk=self.article.pk)
+        article.is_published = False
+        article.save()
+        article = Article.objects.get(pk=self.article.pk)
+        article.content = '<h2>Verdict</h2><p>Faster</p>'
+        article.save()
+        article = Article.objects.get(pk=self.article.pk)
+        article.is_published = True
+        article.save(update_fields=['is_published'])
+
+        data = self.client.get('/api/news/r15-review/').json()
+        self.assertEqual(data['content_html'], '<h2 id="verdict">Verdict</h2><p>Faster</p>')
+        self.assertEqual(data['toc'], [{'level': 2, 'id': 'verdict', 'title': 'Verdict'}])
+
+    def test_missing_article(self):
+        response = self.client.get('/api/news/no-such-article/')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'detail': 'Not found.'})
+
+    @unittest.skipIf(msgpack is None, "msgpack is not installed")
+    def test_msgpack_by_content_negotiation(self):
+        response = self.client.get('/api/news/r15-review/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content)['slug'], 'r15-review')
+
+    @override_settings(ASYNC_VIEWS=True)
+    async def test_async_handler(self):
+        view = ArticleDetailView.as_view()
+        factory = AsyncRequestFactory()
+        response = await view(factory.head('/api/news/r15-review/'), slug='r15-review')
+        self.assertEqual(response.status_code, 200)
+        response = await view(factory.get('/api/news/r15-review/'), slug='r15-review')
+        self.assertEqual(response.render().data['content_html'], '<p>Fast<a rel="nofollow noopener">x</a></p>')
+        await self.article.arefresh_from_db(fields=['views'])
+        self.assertEqual(self.article.views, 1)
+
+        response = await view(factory.get('/api/news/no-such-article/'), slug='no-such-article')
+        self.assertEqual(response.status_code, 404)
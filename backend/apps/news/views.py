@@ -1,26 +1,79 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
 from django.db import models
 from rest_framework import generics, permissions, filters
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from core.async_views import AsyncAPIView
+from .cache import acache_article, aget_cached_article, cache_article, get_cached_article
 from .models import Article, NewsCategory
-from .serializers import ArticleSerializer
+from .serializers import ArticleListSerializer, ArticleSerializer
+from apps.trending.store import article_card, record_event
+
+LIST_FIELDS = (
+    'id', 'title', 'slug', 'excerpt', 'featured_image', 'reading_time',
+    'views', 'published_at', 'created_at', 'category__slug',
+)
 
 class ArticleListView(generics.ListAPIView):
-    queryset = Article.objects.filter(is_published=True)
-    serializer_class = ArticleSerializer
+    queryset = (
+        Article.objects.filter(is_published=True)
+        .select_related('category')
+        .prefetch_related('tags')
+        .only(*LIST_FIELDS)
+    )
+    serializer_class = ArticleListSerializer
+    response_cache_tags = ('news.Article', 'news.NewsCategory', 'news.Tag')
     permission_classes = [permissions.AllowAny]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['category__slug', 'tags__slug']
     search_fields = ['title', 'excerpt', 'content']
     ordering_fields = ['published_at', 'views', 'created_at']
 
-class ArticleDetailView(generics.RetrieveAPIView):
-    queryset = Article.objects.filter(is_published=True)
-    serializer_class = ArticleSerializer
+def load_article(slug):
+    article = (
+        Article.objects.filter(is_published=True)
+        .select_related('author', 'category')
+        .prefetch_related('tags')
+        .filter(slug=slug)
+        .first()
+    )
+    return dict(ArticleSerializer(article).data) if article else None
+
+class ArticleDetailView(AsyncAPIView):
+    """
+    Cached article payload. GET counts a view and a trending event; HEAD
+    (link checkers, prefetchers) does not.
+    """
     permission_classes = [permissions.AllowAny]
-    lookup_field = 'slug'
 
-    def get_object(self):
-        obj = super().get_object()
-        # Increment view count
-        Article.objects.filter(pk=obj.pk).update(views=models.F('views') + 1)
-        return obj
+    def get(self, request, slug):
+        data = get_cached_article(slug)
+        if data is None:
+            data = load_article(slug)
+            if data is None:
+                raise NotFound
+            cache_article(slug, data)
+        if request.method == 'GET':
+            # The cached payload's count refreshes on the next save
+            Article.objects.filter(pk=data['id']).update(views=models.F('views') + 1)
+            record_event('articles', data['id'], article_card(data))
+        return Response(data)
+
+    async def aget(self, request, slug):
+        data = await aget_cached_article(slug)
+        if data is None:
+            data = await sync_to_async(load_article)(slug)
+            if data is None:
+                raise NotFound
+            await acache_article(slug, data)
+        if request.method == 'GET':
+            # The view count and the trending event are independent; the
+            # Redis write does not need the DB thread
+            await asyncio.gather(
+                Article.objects.filter(pk=data['id']).aupdate(views=models.F('views') + 1),
+                sync_to_async(record_event, thread_sensitive=False)('articles', data['id'], article_card(data)),
+            )
+        return Response(data)
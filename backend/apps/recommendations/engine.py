@@ -1,9 +1,14 @@
+import asyncio
 import redis
 import json
 from django.conf import settings
 from apps.bikes.models import BikeModel
 from django.db.models import Q
 
+from core.async_views import get_async_redis
+
+CACHE_SECONDS = 3600
+
 class EmotionalRecommendationEngine:
     def __init__(self):
         # Redis is optional for now, fallback to DB
@@ -11,12 +16,25 @@ class EmotionalRecommendationEngine:
             self.redis_client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
         except Exception:
             self.redis_client = None
+
+    @staticmethod
+    def cache_key(bike_slug):
+        return f"recommendations:similar:{bike_slug}"
+
+    @staticmethod
+    def candidates(base_bike):
+        # Rule 1: Same category
+        return (
+            BikeModel.objects.filter(category=base_bike.category)
+            .exclude(id=base_bike.id)
+            .select_related('brand')
+        )
     
     def get_similar_bikes(self, bike_slug, limit=4):
         """
         Bangladesh-specific Rule-Based Recommendations
         """
-        cache_key = f"recommendations:similar:{bike_slug}"
+        cache_key = self.cache_key(bike_slug)
         if self.redis_client:
             cached = self.redis_client.get(cache_key)
             if cached:
@@ -27,9 +45,41 @@ class EmotionalRecommendationEngine:
         except BikeModel.DoesNotExist:
             return []
 
-        # Rule 1: Same category
-        candidates = BikeModel.objects.filter(category=base_bike.category).exclude(id=base_bike.id)
-        
+        result = self.rank(base_bike, self.candidates(base_bike), limit)
+
+        if self.redis_client:
+            try:
+                self.redis_client.setex(cache_key, CACHE_SECONDS, json.dumps(result))
+            except Exception:
+                pass
+                
+        return result
+
+    async def aget_similar_bikes(self, bike_slug, limit=4):
+        """Async twin of get_similar_bikes; the cache read and the base bike query run concurrently."""
+        cache_key = self.cache_key(bike_slug)
+        client = get_async_redis()
+        cached, base_bike = await asyncio.gather(
+            client.get(cache_key),
+            BikeModel.objects.filter(slug=bike_slug).afirst(),
+            return_exceptions=True,
+        )
+        if isinstance(base_bike, BaseException):
+            raise base_bike
+        if cached and not isinstance(cached, BaseException):
+            return json.loads(cached)
+        if base_bike is None:
+            return []
+
+        result = self.rank(base_bike, [bike async for bike in self.candidates(base_bike)], limit)
+
+        try:
+            await client.setex(cache_key, CACHE_SECONDS, json.dumps(result))
+        except redis.RedisError:
+            pass
+        return result
+
+    def rank(self, base_bike, candidates, limit):
         scored_candidates = []
         for bike in candidates:
             score = 0
@@ -87,11 +137,4 @@ class EmotionalRecommendationEngine:
                 'brand_name': b.brand.name,
                 'reasons': pick['emotional_reasons']
             })
-
-        if self.redis_client:
-            try:
-                self.redis_client.setex(cache_key, 3600, json.dumps(result))
-            except Exception:
-                pass
-                
         return result
@@ -1,10 +1,14 @@
-from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+
+from core.async_views import AsyncAPIView
 from .engine import EmotionalRecommendationEngine
 
-class SimilarBikesView(APIView):
+class SimilarBikesView(AsyncAPIView):
     def get(self, request, slug):
         engine = EmotionalRecommendationEngine()
-        recommendations = engine.get_similar_bikes(slug)
-        return Response(recommendations, status=status.HTTP_200_OK)
+        return Response(engine.get_similar_bikes(slug), status=status.HTTP_200_OK)
+
+    async def aget(self, request, slug):
+        engine = EmotionalRecommendationEngine()
+        return Response(await engine.aget_similar_bikes(slug), status=status.HTTP_200_OK)
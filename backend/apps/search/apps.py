@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+class SearchConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.search'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,233 @@
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.db.models import Count
+
+logger = logging.getLogger(__name__)
+
+TOP_K = 10
+# Prefixes up to this length match too many terms to scan, so their top-K is precomputed
+SHORT_PREFIX = 3
+# Added to log1p(popularity) so brands and models outrank a listing with the same title
+SOURCE_BOOST = {'brands': 3.0, 'bikes': 2.0, 'news': 1.0, 'editorial': 1.0, 'listings': 0.0}
+
+
+class Suggestion(NamedTuple):
+    type: str
+    id: int
+    label: str
+    slug: Optional[str]
+    score: float
+
+    def as_dict(self):
+        return {'type': self.type, 'id': self.id, 'label': self.label, 'slug': self.slug}
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(re.findall(r'[a-z0-9]+', text.lower()))
+
+
+def _score(source: str, popularity) -> float:
+    return SOURCE_BOOST[source] + math.log1p(max(popularity or 0, 0))
+
+
+def load_brands():
+    from apps.bikes.models import Brand
+
+    for brand in Brand.objects.annotate(bike_count=Count('bikes')).only('id', 'name', 'slug', 'is_popular'):
+        yield Suggestion('brand', brand.pk, brand.name, brand.slug,
+                         _score('brands', brand.bike_count * (10 if brand.is_popular else 1)))
+
+
+def load_bikes():
+    from apps.bikes.models import BikeModel
+
+    rows = BikeModel.objects.values_list('id', 'brand__name', 'name', 'slug', 'popularity_score')
+    for pk, brand, name, slug, popularity in rows:
+        yield Suggestion('bike', pk, f"{brand} {name}", slug, _score('bikes', popularity))
+
+
+def load_news():
+    from apps.news.models import Article
+
+    rows = Article.objects.filter(is_published=True).values_list('id', 'title', 'slug', 'views')
+    for pk, title, slug, views in rows:
+        yield Suggestion('article', pk, title, slug, _score('news', views))
+
+
+def load_editorial():
+    from apps.editorial.models import Article
+
+    rows = Article.objects.filter(is_published=True).values_list('id', 'title', 'slug', 'views_count')
+    for pk, title, slug, views in rows:
+        yield Suggestion('editorial', pk, title, slug, _score('editorial', views))
+
+
+def load_listings():
+    from apps.marketplace.models import UsedBikeListing
+
+    rows = (
+        UsedBikeListing.objects.filter(status='active', duplicate_of__isnull=True)
+        .order_by('-views_count', '-id')
+        .values_list('id', 'title', 'views_count')[:settings.SEARCH_SUGGEST_MAX_LISTINGS]
+    )
+    for pk, title, views in rows:
+        yield Suggestion('listing', pk, title, None, _score('listings', views))
+
+
+def get_sources() -> Dict[str, Callable]:
+    sources = {'brands': load_brands, 'bikes': load_bikes, 'news': load_news, 'listings': load_listings}
+    if apps.is_installed('apps.editorial'):
+        sources['editorial'] = load_editorial
+    return sources
+
+
+class Segment:
+    """
+    Prefix index over one source. Every word position of a label is a term
+    ("yamaha r15 v4", "r15 v4", "v4"), kept in one sorted list so a prefix is
+    a bisect range; short prefixes read a precomputed top-K instead.
+    """
+
+    def __init__(self, suggestions):
+        best = {}
+        for suggestion in suggestions:
+            key = normalize(suggestion.label)
+            if key and (key not in best or suggestion.score > best[key].score):
+                best[key] = suggestion
+        self.suggestions: List[Suggestion] = list(best.values())
+
+        pairs = []
+        for ref, key in enumerate(best):
+            words = key.split(' ')
+            pairs.extend((' '.join(words[i:]), ref) for i in range(len(words)))
+        pairs.sort()
+        self.terms = [term for term, _ in pairs]
+        self.refs = array('I', [ref for _, ref in pairs])
+
+        short = defaultdict(set)
+        for term, ref in pairs:
+            for length in range(1, min(SHORT_PREFIX, len(term)) + 1):
+                short[term[:length]].add(ref)
+        score = self._score
+        self.top = {
+            prefix: tuple(heapq.nlargest(TOP_K, refs, key=score))
+            for prefix, refs in short.items()
+        }
+
+    def _score(self, ref):
+        return self.suggestions[ref].score
+
+    def __len__(self):
+        return len(self.suggestions)
+
+    def search(self, prefix: str, limit: int) -> List[Suggestion]:
+        if len(prefix) <= SHORT_PREFIX:
+            refs = self.top.get(prefix, ())[:limit]
+        else:
+            lo = bisect_left(self.terms, prefix)
+            hi = bisect_left(self.terms, prefix + '\x7f', lo)
+            refs = heapq.nlargest(limit, set(self.refs[lo:hi]), key=self._score)
+        return [self.suggestions[ref] for ref in refs]
+
+
+def version_key(source: str) -> str:
+    return f"search:suggest:version:{source}"
+
+
+def bump_version(source: str):
+    """Mark a source stale in every worker; each rebuilds only that segment."""
+    key = version_key(source)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+class SuggestIndex:
+    def __init__(self):
+        self.segments: Dict[str, Segment] = {}
+        self.versions: Dict[str, object] = {}
+        self.built_at: Dict[str, float] = {}
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    def stale_sources(self) -> List[str]:
+        sources = get_sources()
+        current = cache.get_many([version_key(source) for source in sources])
+        max_age = settings.SEARCH_SUGGEST_MAX_AGE_SECONDS
+        now = time.monotonic()
+        stale = []
+        for source in sources:
+            if (source not in self.segments
+                    or self.versions.get(source) != current.get(version_key(source))
+                    or now - self.built_at[source] > max_age):
+                stale.append(source)
+        return stale
+
+    def rebuild(self, sources: List[str]):
+        loaders = get_sources()
+        for source in sources:
+            # Read the version first: a bump during the load leaves this segment stale, not lost
+            version = cache.get(version_key(source))
+            segment = Segment(loaders[source]())
+            self.segments = {**self.segments, source: segment}
+            self.versions[source] = version
+            self.built_at[source] = time.monotonic()
+
+    def _rebuild_in_background(self, sources):
+        try:
+            self.rebuild(sources)
+        except Exception:
+            logger.exception("Rebuilding search suggestions failed")
+        finally:
+            self.lock.release()
+            close_old_connections()
+
+    def refresh(self):
+        """Check versions at most every SEARCH_SUGGEST_CHECK_SECONDS; rebuild stale segments off the request path."""
+        now = time.monotonic()
+        if self.segments and now - self.checked_at < settings.SEARCH_SUGGEST_CHECK_SECONDS:
+            return
+        self.checked_at = now
+        if not self.lock.acquire(blocking=not self.segments):
+            return
+        stale = self.stale_sources()
+        if not stale:
+            self.lock.release()
+        elif not self.segments:
+            # Cold worker: nothing to serve yet, so build inline
+            try:
+                self.rebuild(stale)
+            finally:
+                self.lock.release()
+        else:
+            threading.Thread(target=self._rebuild_in_background, args=(stale,), daemon=True).start()
+
+    def suggest(self, query: str, limit: int = TOP_K) -> List[Suggestion]:
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        self.refresh()
+        limit = min(limit, TOP_K)
+        matches = []
+        for segment in self.segments.values():
+            matches.extend(segment.search(prefix, limit))
+        return heapq.nlargest(limit, matches, key=lambda suggestion: suggestion.score)
+
+
+suggest_index = SuggestIndex()
@@ -0,0 +1,55 @@
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .index import bump_version
+
+# Which suggestion segments a change to each model invalidates, and the
+# fields those segments read (popularity included, as it orders them)
+SOURCE_MODELS = {
+    'bikes.Brand': (('brands', 'bikes'), ('name', 'slug', 'is_popular')),
+    'bikes.BikeModel': (('bikes', 'brands'), ('brand_id', 'name', 'slug', 'popularity_score')),
+    'news.Article': (('news',), ('title', 'slug', 'views', 'is_published')),
+    'marketplace.UsedBikeListing': (('listings',), ('title', 'views_count', 'status', 'duplicate_of_id')),
+}
+if apps.is_installed('apps.editorial'):
+    SOURCE_MODELS['editorial.Article'] = (('editorial',), ('title', 'slug', 'views_count', 'is_published'))
+
+
+def indexed_fields_changed(instance, fields, update_fields=None) -> bool:
+    """
+    Whether saving `instance` changes a field the index reads. Compared with
+    the row as loaded (`_loaded_values`, see the models' from_db); instances
+    without that snapshot count as changed.
+    """
+    if instance._state.adding:
+        return True
+    if update_fields is not None:
+        opts = instance._meta
+        if not {opts.get_field(name).attname for name in update_fields} & set(fields):
+            return False
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    return any(name not in loaded or loaded[name] != getattr(instance, name) for name in fields)
+
+
+def _change_tracker(fields):
+    # Before the save: other post_save handlers refresh `_loaded_values`
+    def handler(sender, instance, raw=False, update_fields=None, **kwargs):
+        instance._search_index_stale = not raw and indexed_fields_changed(instance, fields, update_fields)
+    return handler
+
+
+def _invalidator(sources, on_save=False):
+    def handler(sender, instance, raw=False, **kwargs):
+        # A save bumps only when the pre_save check saw an indexed field change
+        if raw or (on_save and not getattr(instance, '_search_index_stale', True)):
+            return
+        for source in sources:
+            bump_version(source)
+    return handler
+
+
+for label, (sources, fields) in SOURCE_MODELS.items():
+    model = apps.get_model(label)
+    pre_save.connect(_change_tracker(fields), sender=model, weak=False, dispatch_uid=f'search-{label}-pre-save')
+    post_save.connect(_invalidator(sources, on_save=True), sender=model, weak=False, dispatch_uid=f'search-{label}-save')
+    post_delete.connect(_invalidator(sources), sender=model, weak=False, dispatch_uid=f'search-{label}-delete')
@@ -0,0 +1,101 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from apps.bikes.models import BikeModel, Brand
+from apps.marketplace.models import UsedBikeListing
+
+from .index import SuggestIndex, version_key
+
+
+def create_listing(seller, **fields):
+    values = {
+        'seller': seller, 'title': 'Yamaha R15 V3', 'price': 350000, 'mileage': 12000,
+        'manufacturing_year': 2021, 'condition': 'good', 'description': 'Well kept',
+        'location': 'Dhaka', 'status': 'active', **fields,
+    }
+    return UsedBikeListing.objects.create(**values)
+
+
+class VersionBumpTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = get_user_model().objects.create_user(email='seller@example.com', username='seller', password='x')
+
+    def version(self, source='listings'):
+        return cache.get(version_key(source))
+
+    def test_listing_saves_bump_only_on_indexed_changes(self):
+        listing = create_listing(self.seller)
+        self.assertEqual(self.version(), 1)
+
+        listing = UsedBikeListing.objects.get(pk=listing.pk)
+        listing.price, listing.description = 340000, 'Price dropped'
+        listing.save()
+        listing.save(update_fields=['rank_score'])
+        self.assertEqual(self.version(), 1)
+
+        listing.title = 'Yamaha R15 V3 (2021)'
+        listing.save()
+        self.assertEqual(self.version(), 2)
+        listing.status = 'sold'
+        listing.save(update_fields=['status'])
+        self.assertEqual(self.version(), 3)
+        # Nothing else moved since the last save
+        listing.save()
+        self.assertEqual(self.version(), 3)
+
+        listing.delete()
+        self.assertEqual(self.version(), 4)
+
+    def test_partially_loaded_instances_count_as_changed(self):
+        listing = create_listing(self.seller)
+        listing = UsedBikeListing.objects.only('id', 'price').get(pk=listing.pk)
+        listing.save()
+        self.assertEqual(self.version(), 2)
+
+    def test_other_sources_are_untouched(self):
+        create_listing(self.seller)
+        self.assertIsNone(self.version('bikes'))
+
+
+class SuggestIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.brand = Brand.objects.create(name='Yamaha', slug='yamaha', is_popular=True)
+        BikeModel.objects.create(
+            brand=self.brand, name='R15 V4', slug='yamaha-r15-v4', category='sports', engine_capacity=155, price=525000,
+        )
+        self.index = SuggestIndex()
+
+    def labels(self, query):
+        return [suggestion.label for suggestion in self.index.suggest(query)]
+
+    def test_prefix_matches_any_word(self):
+        self.assertEqual(self.labels('yam'), ['Yamaha', 'Yamaha R15 V4'])
+        self.assertEqual(self.labels('r15 v'), ['Yamaha R15 V4'])
+        self.assertEqual(self.labels('honda'), [])
+
+    def test_bump_marks_only_that_source_stale(self):
+        self.index.suggest('yam')
+        self.assertEqual(self.index.stale_sources(), [])
+        BikeModel.objects.create(
+            brand=self.brand, name='MT-15', slug='yamaha-mt-15', category='naked', engine_capacity=155, price=480000,
+        )
+        self.assertEqual(sorted(self.index.stale_sources()), ['bikes', 'brands'])
+
+    def test_segments_expire_without_a_bump(self):
+        self.index.suggest('yam')
+        # A write this process's cache never heard of
+        BikeModel.objects.bulk_create([BikeModel(
+            brand=self.brand, name='MT-15', slug='yamaha-mt-15', category='naked', engine_capacity=155, price=480000,
+        )])
+        self.assertEqual(self.index.stale_sources(), [])
+        with override_settings(SEARCH_SUGGEST_MAX_AGE_SECONDS=0), \
+                mock.patch('apps.search.index.time.monotonic', return_value=self.index.checked_at + 1):
+            stale = self.index.stale_sources()
+        self.assertIn('bikes', stale)
+        self.index.rebuild(stale)
+        self.assertEqual(self.labels('mt'), ['Yamaha MT-15'])
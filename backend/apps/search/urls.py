@@ -0,0 +1,6 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('suggest/', views.SuggestView.as_view(), name='search-suggest'),
+]
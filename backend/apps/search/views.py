@@ -0,0 +1,24 @@
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.throttling import SharedScopedRateThrottle
+
+from .index import TOP_K, suggest_index
+
+class SuggestView(APIView):
+    """Autocomplete over brands, bikes, articles and popular listings, served from memory."""
+    # No session/basic lookup: suggestions are public and this runs on every keystroke
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    throttle_classes = [SharedScopedRateThrottle]
+    throttle_scope = 'search'
+
+    def get(self, request):
+        query = request.query_params.get('q', '')[:100]
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 8)), TOP_K))
+        except ValueError:
+            limit = 8
+        results = suggest_index.suggest(query, limit)
+        return Response({'query': query, 'results': [suggestion.as_dict() for suggestion in results]})
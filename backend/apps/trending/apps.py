@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+class TrendingConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.trending'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.bikes.models import BikeModel
+from apps.news.models import Article
+
+from .store import remove_item
+
+
+@receiver(post_delete, sender=BikeModel)
+def bike_deleted(sender, instance, **kwargs):
+    remove_item('bikes', instance.pk)
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def article_changed(sender, instance, **kwargs):
+    # Unpublished or deleted articles must drop out of the trending list
+    if kwargs.get('signal') is post_delete or not instance.is_published:
+        remove_item('articles', instance.pk)
@@ -0,0 +1,249 @@
+import heapq
+import json
+import logging
+import math
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from core.async_views import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('bikes', 'articles')
+# Scores grow as exp(age of event since the landmark); once an increment
+# would exceed e**REBASE_EXPONENT every score is scaled down and the landmark
+# moves forward, which keeps values well inside float range.
+REBASE_EXPONENT = 40.0
+TRIM_PROBABILITY = 0.01
+
+
+def decay_rate() -> float:
+    return math.log(2) / (settings.TRENDING_HALF_LIFE_HOURS * 3600)
+
+
+def bike_card(bike) -> dict:
+    return {
+        'id': bike.pk,
+        'name': str(bike),
+        'slug': bike.slug,
+        'category': bike.category,
+        'price': str(bike.price),
+        'image': bike.primary_image,
+    }
+
+
+def article_card(data: dict) -> dict:
+    """Card from a serialized article (the detail payload may come from cache)."""
+    category = data.get('category')
+    return {
+        'id': data['id'],
+        'title': data['title'],
+        'slug': data['slug'],
+        'excerpt': data.get('excerpt'),
+        'image': data.get('featured_image'),
+        'category': category.get('slug') if isinstance(category, dict) else category,
+        'published_at': data.get('published_at'),
+    }
+
+
+# Landmark, rescale and increment in one step: a worker can never add an
+# increment computed against a landmark that another worker already moved.
+RECORD_SCRIPT = """
+local now = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local landmark = tonumber(redis.call('GET', KEYS[1]))
+if not landmark then
+    landmark = now
+    redis.call('SET', KEYS[1], ARGV[1])
+end
+local exponent = rate * (now - landmark)
+local rebased = 0
+if exponent > tonumber(ARGV[6]) then
+    local factor = string.format('%.17g', math.exp(-exponent))
+    for i = 4, #KEYS do
+        redis.call('ZUNIONSTORE', KEYS[i], 1, KEYS[i], 'WEIGHTS', factor)
+    end
+    redis.call('SET', KEYS[1], ARGV[1])
+    exponent = 0
+    rebased = 1
+end
+redis.call('ZINCRBY', KEYS[2], string.format('%.17g', tonumber(ARGV[3]) * math.exp(exponent)), ARGV[4])
+if ARGV[5] ~= '' then
+    redis.call('HSET', KEYS[3], ARGV[4], ARGV[5])
+end
+return rebased
+"""
+
+
+class RedisTrendingBackend:
+    """
+    Forward-decayed sorted sets: an event at time t adds w * exp(rate * (t - landmark)),
+    so newer events outweigh older ones without ever rewriting stored scores.
+    Ranking is a plain ZREVRANGE; cards live in a hash next to the set.
+    """
+
+    LANDMARK_KEY = 'trending:landmark'
+
+    def __init__(self, client: redis.Redis):
+        self.client = client
+        self.record_script = client.register_script(RECORD_SCRIPT)
+
+    @staticmethod
+    def scores_key(kind):
+        return f"trending:{kind}"
+
+    @staticmethod
+    def cards_key(kind):
+        return f"trending:{kind}:cards"
+
+    def record(self, kind, item_id, weight, card, now):
+        rebased = self.record_script(
+            keys=[self.LANDMARK_KEY, self.scores_key(kind), self.cards_key(kind), *map(self.scores_key, KINDS)],
+            args=[repr(now), repr(decay_rate()), repr(float(weight)), item_id,
+                  json.dumps(card, default=str) if card is not None else '', REBASE_EXPONENT],
+        )
+        if rebased:
+            for trimmed in KINDS:
+                self.trim(trimmed)
+        elif random.random() < TRIM_PROBABILITY:
+            self.trim(kind)
+
+    def trim(self, kind):
+        """Keep the set bounded, dropping cards of items that fell off the end."""
+        max_items = settings.TRENDING_MAX_ITEMS
+        dropped = self.client.zrange(self.scores_key(kind), 0, -(max_items + 1))
+        if dropped:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.zrem(self.scores_key(kind), *dropped)
+            pipe.hdel(self.cards_key(kind), *dropped)
+            pipe.execute()
+
+    def top(self, kind, limit):
+        ids = self.client.zrevrange(self.scores_key(kind), 0, limit - 1)
+        if not ids:
+            return []
+        cards = self.client.hmget(self.cards_key(kind), ids)
+        return [json.loads(card) for card in cards if card]
+
+    async def atop(self, kind, limit):
+        client = get_async_redis()
+        ids = await client.zrevrange(self.scores_key(kind), 0, limit - 1)
+        if not ids:
+            return []
+        cards = await client.hmget(self.cards_key(kind), ids)
+        return [json.loads(card) for card in cards if card]
+
+    def remove(self, kind, item_id):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zrem(self.scores_key(kind), item_id)
+        pipe.hdel(self.cards_key(kind), item_id)
+        pipe.execute()
+
+
+class LocalTrendingBackend:
+    """In-process equivalent for development without Redis (per worker, not shared)."""
+
+    def __init__(self):
+        self.landmark = time.time()
+        self.scores: Dict[str, Dict[str, float]] = {kind: {} for kind in KINDS}
+        self.cards: Dict[str, Dict[str, dict]] = {kind: {} for kind in KINDS}
+        self.lock = threading.Lock()
+
+    def record(self, kind, item_id, weight, card, now):
+        with self.lock:
+            exponent = decay_rate() * (now - self.landmark)
+            if exponent > REBASE_EXPONENT:
+                factor = math.exp(-exponent)
+                for scores in self.scores.values():
+                    for key in scores:
+                        scores[key] *= factor
+                self.landmark, exponent = now, 0.0
+            scores = self.scores[kind]
+            key = str(item_id)
+            scores[key] = scores.get(key, 0.0) + weight * math.exp(exponent)
+            if card is not None:
+                self.cards[kind][key] = card
+            if len(scores) > settings.TRENDING_MAX_ITEMS * 2:
+                keep = set(heapq.nlargest(settings.TRENDING_MAX_ITEMS, scores, key=scores.get))
+                for dropped in [key for key in scores if key not in keep]:
+                    del scores[dropped]
+                    self.cards[kind].pop(dropped, None)
+
+    def top(self, kind, limit):
+        with self.lock:
+            scores = self.scores[kind]
+            ids = heapq.nlargest(limit, scores, key=scores.get)
+            return [self.cards[kind][key] for key in ids if key in self.cards[kind]]
+
+    async def atop(self, kind, limit):
+        return self.top(kind, limit)
+
+    def remove(self, kind, item_id):
+        with self.lock:
+            self.scores[kind].pop(str(item_id), None)
+            self.cards[kind].pop(str(item_id), None)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Redis when it answers a ping at first use, otherwise the in-process store."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                try:
+                    client = redis.Redis.from_url(
+                        settings.REDIS_URL, decode_responses=True, socket_connect_timeout=0.5, socket_timeout=0.5,
+                    )
+                    client.ping()
+                    _backend = RedisTrendingBackend(client)
+                except redis.RedisError:
+                    logger.warning("Redis unavailable, trending counts are kept in-process")
+                    _backend = LocalTrendingBackend()
+    return _backend
+
+
+def record_event(kind: str, item_id: int, card: Optional[dict], event: str = 'view', now: Optional[float] = None):
+    """
+    Count a view/wishlist event. Never raises: trending must not break the page
+    that fed it. Without a card the item's stored card is kept (views write it).
+    """
+    try:
+        weight = settings.TRENDING_EVENT_WEIGHTS[event]
+        get_backend().record(kind, str(item_id), weight, card, now or time.time())
+    except Exception:
+        logger.exception("Recording trending %s event failed", kind)
+
+
+def top_items(kind: str, limit: int) -> List[dict]:
+    try:
+        return get_backend().top(kind, limit)
+    except redis.RedisError:
+        logger.exception("Reading trending %s failed", kind)
+        return []
+
+
+async def atop_items(kind: str, limit: int) -> List[dict]:
+    # Only the first call can block (connecting and pinging Redis)
+    backend = _backend or await sync_to_async(get_backend, thread_sensitive=False)()
+    try:
+        return await backend.atop(kind, limit)
+    except redis.RedisError:
+        logger.exception("Reading trending %s failed", kind)
+        return []
+
+
+def remove_item(kind: str, item_id: int):
+    try:
+        get_backend().remove(kind, str(item_id))
+    except redis.RedisError:
+        logger.exception("Removing trending %s %s failed", kind, item_id)
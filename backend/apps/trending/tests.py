@@ -0,0 +1,127 @@
+import math
+import unittest
+from unittest import mock
+
+import redis
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+from django.test.client import AsyncRequestFactory
+
+from . import store
+from .views import TrendingView
+
+HOUR = 3600
+# Far enough apart that the second event's exponent passes REBASE_EXPONENT (one-hour half-life)
+REBASE_GAP = math.ceil(store.REBASE_EXPONENT / math.log(2) + 1) * HOUR
+T0 = 1_700_000_000.0
+
+
+def redis_client():
+    try:
+        client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True, socket_connect_timeout=0.2)
+        client.ping()
+        return client
+    except redis.RedisError:
+        return None
+
+
+class TrendingStoreTestsMixin:
+    def make_backend(self):
+        raise NotImplementedError
+
+    def scores(self, backend, kind='bikes'):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.backend = self.make_backend()
+
+    def test_newer_events_rank_higher(self):
+        self.backend.record('bikes', '1', 1, {'id': 1}, T0)
+        self.backend.record('bikes', '2', 1, {'id': 2}, T0 + HOUR)
+        self.backend.record('bikes', '3', 1, {'id': 3}, T0 + 2 * HOUR)
+        self.assertEqual([card['id'] for card in self.backend.top('bikes', 10)], [3, 2, 1])
+
+    def test_half_life(self):
+        for _ in range(2):
+            self.backend.record('bikes', 'old', 1, None, T0)
+        self.backend.record('bikes', 'new', 1, None, T0 + HOUR)
+        scores = self.scores(self.backend)
+        self.assertAlmostEqual(scores['old'], scores['new'])
+
+    def test_rebase_keeps_scores_bounded_and_ranking_right(self):
+        for _ in range(100):
+            self.backend.record('bikes', 'old', 1, {'id': 'old'}, T0)
+        self.backend.record('articles', 'article', 1, {'id': 'article'}, T0)
+        self.backend.record('bikes', 'new', 1, {'id': 'new'}, T0 + REBASE_GAP)
+        self.backend.record('bikes', 'newer', 1, {'id': 'newer'}, T0 + REBASE_GAP + HOUR)
+
+        scores = self.scores(self.backend)
+        self.assertLess(max(scores.values()), math.exp(store.REBASE_EXPONENT))
+        self.assertAlmostEqual(scores['newer'] / scores['new'], 2.0)
+        self.assertAlmostEqual(scores['old'] / scores['new'], 100 * 2 ** -(REBASE_GAP / HOUR))
+        # The other kind was rescaled with the same factor
+        self.assertAlmostEqual(self.scores(self.backend, 'articles')['article'] / scores['old'], 0.01)
+        self.assertEqual([card['id'] for card in self.backend.top('bikes', 10)], ['newer', 'new', 'old'])
+
+
+@override_settings(TRENDING_HALF_LIFE_HOURS=1, TRENDING_MAX_ITEMS=100)
+class LocalTrendingStoreTests(TrendingStoreTestsMixin, SimpleTestCase):
+    def make_backend(self):
+        backend = store.LocalTrendingBackend()
+        backend.landmark = T0
+        return backend
+
+    def scores(self, backend, kind='bikes'):
+        return dict(backend.scores[kind])
+
+
+@unittest.skipUnless(redis_client(), "Redis is not reachable at REDIS_URL")
+@override_settings(TRENDING_HALF_LIFE_HOURS=1, TRENDING_MAX_ITEMS=100)
+class RedisTrendingStoreTests(TrendingStoreTestsMixin, SimpleTestCase):
+    def make_backend(self):
+        self.client = redis_client()
+        keys = [store.RedisTrendingBackend.LANDMARK_KEY]
+        for kind in store.KINDS:
+            keys += [store.RedisTrendingBackend.scores_key(kind), store.RedisTrendingBackend.cards_key(kind)]
+        self.client.delete(*keys)
+        self.addCleanup(self.client.delete, *keys)
+        return store.RedisTrendingBackend(self.client)
+
+    def scores(self, backend, kind='bikes'):
+        return dict(self.client.zrange(backend.scores_key(kind), 0, -1, withscores=True))
+
+    def test_workers_agree_after_another_one_rebased(self):
+        other_worker = store.RedisTrendingBackend(self.client)
+        self.backend.record('bikes', 'a', 1, None, T0)
+        other_worker.record('bikes', 'b', 1, None, T0)
+        # This worker rescales; the other one records right after at the same time
+        self.backend.record('bikes', 'c', 1, None, T0 + REBASE_GAP)
+        other_worker.record('bikes', 'd', 1, None, T0 + REBASE_GAP)
+        scores = self.scores(self.backend)
+        self.assertAlmostEqual(scores['c'], scores['d'])
+        self.assertLess(max(scores.values()), math.exp(store.REBASE_EXPONENT))
+
+
+@override_settings(TRENDING_HALF_LIFE_HOURS=1, TRENDING_MAX_ITEMS=100)
+class TrendingViewTests(SimpleTestCase):
+    def setUp(self):
+        backend = store.LocalTrendingBackend()
+        backend.landmark = T0
+        for item_id, count in (('1', 1), ('2', 3), ('3', 2)):
+            for _ in range(count):
+                backend.record('bikes', item_id, 1, {'id': int(item_id)}, T0)
+        patcher = mock.patch.object(store, '_backend', backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_top_items(self):
+        response = self.client.get('/api/trending/bikes/?limit=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'results': [{'id': 2}, {'id': 3}]})
+        self.assertEqual(self.client.post('/api/trending/bikes/').status_code, 405)
+
+    @override_settings(ASYNC_VIEWS=True)
+    async def test_async_handler(self):
+        response = await TrendingView.as_view(kind='bikes')(AsyncRequestFactory().get('/api/trending/bikes/?limit=x'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.render().data, {'results': [{'id': 2}, {'id': 3}, {'id': 1}]})
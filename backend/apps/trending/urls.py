@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('bikes/', views.TrendingView.as_view(kind='bikes'), name='trending-bikes'),
+    path('articles/', views.TrendingView.as_view(kind='articles'), name='trending-articles'),
+]
@@ -0,0 +1,27 @@
+from rest_framework import permissions
+from rest_framework.response import Response
+
+from core.async_views import AsyncAPIView
+
+from .store import atop_items, top_items
+
+MAX_LIMIT = 50
+
+class TrendingView(AsyncAPIView):
+    """Top items by time-decayed views and wishlist adds, read straight from the trending store."""
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    kind = None
+
+    @staticmethod
+    def limit(request):
+        try:
+            return max(1, min(int(request.query_params.get('limit', 10)), MAX_LIMIT))
+        except ValueError:
+            return 10
+
+    def get(self, request):
+        return Response({'results': top_items(self.kind, self.limit(request))})
+
+    async def aget(self, request):
+        return Response({'results': await atop_items(self.kind, self.limit(request))})
@@ -0,0 +1,129 @@
+"""
+Google ID-token verification against locally cached signing certificates.
+
+Google publishes its token signing certificates with a Cache-Control max-age
+of several hours. They are fetched once per process and refreshed in the
+background shortly before they expire. Tokens are checked locally with
+google.auth.jwt, so a login never waits on a request to Google.
+"""
+import base64
+import json
+import logging
+import re
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import requests
+from django.conf import settings
+from google.auth import jwt
+
+logger = logging.getLogger(__name__)
+
+CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs'
+ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+DEFAULT_MAX_AGE = 3600
+REFRESH_AHEAD = 300  # seconds before expiry that a background refresh starts
+FORCED_REFRESH_INTERVAL = 60  # an unknown key id refetches at most this often
+CLOCK_SKEW = 10
+
+Certs = Dict[str, str]  # key id -> PEM certificate
+
+_session = requests.Session()
+
+
+def fetch_certs(url: str = CERTS_URL) -> Tuple[Certs, int]:
+    """Google's current certificates and how many seconds they may be cached."""
+    response = _session.get(url, timeout=5)
+    response.raise_for_status()
+    match = re.search(r'max-age=(\d+)', response.headers.get('Cache-Control', ''))
+    return response.json(), int(match.group(1)) if match else DEFAULT_MAX_AGE
+
+
+class CertificateCache:
+    """Process-wide certificate set, honouring max-age and refreshed ahead of expiry."""
+
+    def __init__(self, fetch: Callable[[], Tuple[Certs, int]] = fetch_certs, clock: Callable[[], float] = time.monotonic):
+        self.fetch = fetch
+        self.clock = clock
+        self.certs: Optional[Certs] = None
+        self.expires_at = 0.0
+        self.fetched_at = float('-inf')
+        self.refresh_thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _store(self, certs: Certs, max_age: int):
+        now = self.clock()
+        self.certs, self.expires_at, self.fetched_at = certs, now + max_age, now
+
+    def _load(self) -> Certs:
+        """Fetch now; keeps serving the previous set if Google cannot be reached."""
+        try:
+            self._store(*self.fetch())
+        except Exception:
+            if self.certs is None:
+                raise
+            logger.exception("Refreshing Google certificates failed, keeping the previous set")
+        return self.certs
+
+    def get(self) -> Certs:
+        if self.certs is None or self.clock() >= self.expires_at:
+            # Nothing fresh to use: the first login after start (or after an outage) waits for the fetch
+            with self._lock:
+                if self.certs is None or self.clock() >= self.expires_at:
+                    return self._load()
+            return self.certs
+        if self.clock() >= self.expires_at - REFRESH_AHEAD:
+            self._refresh_in_background()
+        return self.certs
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self.refresh_thread is not None and self.refresh_thread.is_alive():
+                return
+            self.refresh_thread = threading.Thread(target=self._background_refresh, daemon=True)
+            self.refresh_thread.start()
+
+    def _background_refresh(self):
+        try:
+            certs, max_age = self.fetch()
+        except Exception:
+            logger.exception("Background refresh of Google certificates failed")
+            return
+        with self._lock:
+            self._store(certs, max_age)
+
+    def refresh_for_unknown_key(self) -> Certs:
+        """A token signed with a key not in the set: Google may have rotated early."""
+        with self._lock:
+            if self.clock() - self.fetched_at >= FORCED_REFRESH_INTERVAL:
+                self._load()
+            return self.certs
+
+
+certificates = CertificateCache()
+
+
+def _key_id(token: str) -> Optional[str]:
+    try:
+        header = token.split('.')[0]
+        return json.loads(base64.urlsafe_b64decode(header + '=' * (-len(header) % 4))).get('kid')
+    except Exception:
+        raise ValueError("Malformed token")
+
+
+def verify_id_token(token: str, audience: Optional[str] = None, cache: Optional[CertificateCache] = None) -> dict:
+    """
+    Claims of a valid Google ID token. Raises ValueError for a bad signature,
+    audience, issuer or expiry, like google.oauth2.id_token does.
+    """
+    cache = cache or certificates
+    certs = cache.get()
+    if _key_id(token) not in certs:
+        certs = cache.refresh_for_unknown_key()
+    idinfo = jwt.decode(
+        token, certs=certs, audience=audience or settings.GOOGLE_CLIENT_ID, clock_skew_in_seconds=CLOCK_SKEW,
+    )
+    if idinfo.get('iss') not in ISSUERS:
+        raise ValueError(f"Wrong issuer: {idinfo.get('iss')}")
+    return idinfo
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.users.models import User, UserStats
+from apps.users.stats import refresh_stats
+from core.batching import keyset_batches
+
+
+class Command(BaseCommand):
+    help = "Recompute per-user dashboard counters from listings, reviews and wishlists and fix any that drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        fixed = 0
+        for ids in keyset_batches(User.objects.all(), options['batch_size']):
+            with transaction.atomic():
+                # Lock the batch so signal-driven increments cannot interleave with the rewrite
+                list(UserStats.objects.select_for_update().filter(pk__in=ids).values_list('pk', flat=True))
+                fixed += refresh_stats(ids, create=True)
+        self.stdout.write(self.style.SUCCESS(f"Fixed stats of {fixed} users."))
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_stats(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    UserStats = apps.get_model('users', 'UserStats')
+    UsedBikeListing = apps.get_model('marketplace', 'UsedBikeListing')
+    Review = apps.get_model('interactions', 'Review')
+    Through = apps.get_model('interactions', 'Wishlist').bikes.through
+
+    stats = {user_id: {} for user_id in User.objects.values_list('id', flat=True)}
+    for row in UsedBikeListing.objects.values('seller_id').annotate(
+        listings_count=Count('id'),
+        active_listings_count=Count('id', filter=Q(status='active')),
+        sold_listings_count=Count('id', filter=Q(status='sold')),
+        listing_views_count=Coalesce(Sum('views_count'), 0),
+    ).order_by():
+        stats[row.pop('seller_id')].update(row)
+    for row in Review.objects.values('user_id').annotate(reviews_count=Count('id')).order_by():
+        stats[row.pop('user_id')].update(row)
+    for row in Through.objects.values('wishlist__user_id').annotate(wishlist_count=Count('id')).order_by():
+        stats[row.pop('wishlist__user_id')].update(row)
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=user_id, **values) for user_id, values in stats.items()], batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_alter_user_managers'),
+        ('marketplace', '0008_listing_rank_score'),
+        ('interactions', '0002_review_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('listings_count', models.IntegerField(default=0)),
+                ('active_listings_count', models.IntegerField(default=0)),
+                ('sold_listings_count', models.IntegerField(default=0)),
+                ('listing_views_count', models.BigIntegerField(default=0)),
+                ('wishlist_count', models.IntegerField(default=0)),
+                ('reviews_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -60,3 +60,20 @@ class UserProfile(models.Model):
     
     def __str__(self):
         return f"Profile of {self.user.email}"
+
+class UserStats(models.Model):
+    """
+    Activity counters shown on the dashboard, kept current by signal handlers
+    (see stats.py) so reading them is one primary-key lookup.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    listings_count = models.IntegerField(default=0)
+    active_listings_count = models.IntegerField(default=0)
+    sold_listings_count = models.IntegerField(default=0)
+    listing_views_count = models.BigIntegerField(default=0)
+    wishlist_count = models.IntegerField(default=0)
+    reviews_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats of {self.user_id}"
@@ -0,0 +1,165 @@
+"""
+One-time passwords for phone verification, shared by every worker.
+
+Codes and failed-attempt counters live in Redis. Issuing and checking a code
+are single Lua scripts, so concurrent requests cannot race past the attempt
+limit. Keys carry an HMAC of the phone number, never the number itself, and
+only an HMAC of the code is stored.
+
+When Redis cannot be reached, issuing and checking codes fail closed with
+OTPUnavailable. Only with OTP_LOCAL_FALLBACK (development and tests) does a
+Redis that is down at first use give way to an in-process store.
+"""
+import logging
+import secrets
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import redis
+from django.conf import settings
+from django.utils.crypto import salted_hmac
+
+logger = logging.getLogger(__name__)
+
+VERIFIED, INVALID, LOCKED = 'verified', 'invalid', 'locked'
+
+
+class OTPUnavailable(Exception):
+    """The shared OTP store could not be reached."""
+
+# KEYS: code, attempts. ARGV: code hash, ttl, max attempts. Returns 0 when locked out.
+ISSUE_SCRIPT = """
+if tonumber(redis.call('GET', KEYS[2]) or '0') >= tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return 1
+"""
+
+# Same keys and arguments. Returns 1 verified, 0 wrong/expired code, -1 locked out.
+VERIFY_SCRIPT = """
+if tonumber(redis.call('GET', KEYS[2]) or '0') >= tonumber(ARGV[3]) then
+    return -1
+end
+local stored = redis.call('GET', KEYS[1])
+if stored and stored == ARGV[1] then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return 1
+end
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+return 0
+"""
+
+
+def phone_digest(phone: str) -> str:
+    return salted_hmac('otp.phone', phone.strip()).hexdigest()
+
+
+def code_digest(phone: str, code: str) -> str:
+    return salted_hmac('otp.code', f"{phone.strip()}:{code.strip()}").hexdigest()
+
+
+def keys(phone: str) -> Tuple[str, str]:
+    digest = phone_digest(phone)
+    return f"otp:code:{digest}", f"otp:attempts:{digest}"
+
+
+class RedisOTPBackend:
+    def __init__(self, client: redis.Redis):
+        self.client = client
+        self.issue_script = client.register_script(ISSUE_SCRIPT)
+        self.verify_script = client.register_script(VERIFY_SCRIPT)
+
+    def issue(self, code_key, attempts_key, code_hash, ttl, max_attempts) -> bool:
+        return bool(self.issue_script(keys=[code_key, attempts_key], args=[code_hash, ttl, max_attempts]))
+
+    def verify(self, code_key, attempts_key, code_hash, ttl, max_attempts) -> int:
+        return int(self.verify_script(keys=[code_key, attempts_key], args=[code_hash, ttl, max_attempts]))
+
+
+class LocalOTPBackend:
+    """In-process equivalent for tests and development without Redis (per worker, not shared)."""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.values: Dict[str, Tuple[object, float]] = {}
+        self.lock = threading.Lock()
+
+    def _get(self, key):
+        value, expires_at = self.values.get(key, (None, 0.0))
+        if value is not None and self.clock() >= expires_at:
+            del self.values[key]
+            return None
+        return value
+
+    def issue(self, code_key, attempts_key, code_hash, ttl, max_attempts) -> bool:
+        with self.lock:
+            if (self._get(attempts_key) or 0) >= max_attempts:
+                return False
+            self.values[code_key] = (code_hash, self.clock() + ttl)
+            return True
+
+    def verify(self, code_key, attempts_key, code_hash, ttl, max_attempts) -> int:
+        with self.lock:
+            attempts = self._get(attempts_key) or 0
+            if attempts >= max_attempts:
+                return -1
+            if self._get(code_key) == code_hash:
+                self.values.pop(code_key, None)
+                self.values.pop(attempts_key, None)
+                return 1
+            self.values[attempts_key] = (attempts + 1, self.clock() + ttl)
+            return 0
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """
+    Redis; the in-process store only with OTP_LOCAL_FALLBACK and when Redis
+    does not answer a ping at first use.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                client = redis.Redis.from_url(settings.REDIS_URL, socket_connect_timeout=0.5, socket_timeout=0.5)
+                try:
+                    if settings.OTP_LOCAL_FALLBACK:
+                        client.ping()
+                    _backend = RedisOTPBackend(client)
+                except redis.RedisError:
+                    logger.warning("Redis unavailable, OTPs are kept in-process and only verify on the same worker")
+                    _backend = LocalOTPBackend()
+    return _backend
+
+
+def generate_code() -> str:
+    return str(secrets.randbelow(900000) + 100000)
+
+
+def issue(phone: str) -> Optional[str]:
+    """A new code for `phone`, replacing any earlier one; None while the phone is locked out."""
+    code = generate_code()
+    try:
+        issued = get_backend().issue(
+            *keys(phone), code_digest(phone, code), settings.OTP_TTL_SECONDS, settings.OTP_MAX_ATTEMPTS,
+        )
+    except redis.RedisError as exc:
+        raise OTPUnavailable from exc
+    return code if issued else None
+
+
+def verify(phone: str, code: str) -> str:
+    """VERIFIED (and the code is consumed), INVALID (one more failed attempt) or LOCKED."""
+    try:
+        result = get_backend().verify(
+            *keys(phone), code_digest(phone, code), settings.OTP_TTL_SECONDS, settings.OTP_MAX_ATTEMPTS,
+        )
+    except redis.RedisError as exc:
+        raise OTPUnavailable from exc
+    return {1: VERIFIED, 0: INVALID, -1: LOCKED}[result]
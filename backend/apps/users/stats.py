@@ -0,0 +1,145 @@
+"""
+Per-user activity counters (UserStats).
+
+ORM writes adjust them from signal handlers inside the writing transaction.
+Bulk paths call refresh_stats for the users they touched, and the
+reconcile_user_stats command repairs anything that drifted anyway.
+"""
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import User, UserStats
+
+COUNTER_FIELDS = (
+    'listings_count', 'active_listings_count', 'sold_listings_count', 'listing_views_count',
+    'wishlist_count', 'reviews_count',
+)
+# Listing columns the counters depend on
+LISTING_FIELDS = ('seller_id', 'status', 'views_count')
+
+
+def stats_cache_key(user_id: int) -> str:
+    return f"users:stats:{user_id}"
+
+
+def forget_stats(user_id: int):
+    key = stats_cache_key(user_id)
+    cache.delete(key)
+    # Again on commit, so a read racing the write cannot re-cache the old counters
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: cache.delete(key))
+
+
+def adjust(user_id: int, **deltas: int):
+    """Add deltas to a user's counters in one UPDATE."""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not user_id or not deltas:
+        return
+    UserStats.objects.filter(pk=user_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}, updated_at=timezone.now(),
+    )
+    forget_stats(user_id)
+
+
+def listing_contribution(values: Optional[dict]) -> Counter:
+    if not values:
+        return Counter()
+    return Counter({
+        'listings_count': 1,
+        'active_listings_count': int(values['status'] == 'active'),
+        'sold_listings_count': int(values['status'] == 'sold'),
+        'listing_views_count': values['views_count'] or 0,
+    })
+
+
+def listing_changed(old: Optional[dict], new: Optional[dict]):
+    """Move a listing's contribution; `old`/`new` are its stored values, None when absent."""
+    removed, added = listing_contribution(old), listing_contribution(new)
+    old_seller, new_seller = old and old['seller_id'], new and new['seller_id']
+    if old_seller == new_seller:
+        adjust(new_seller, **{field: added[field] - removed[field] for field in added | removed})
+    else:
+        adjust(old_seller, **{field: -delta for field, delta in removed.items()})
+        adjust(new_seller, **added)
+
+
+def compute_stats(user_ids: Iterable[int]) -> Dict[int, dict]:
+    """Counters of these users straight from the source tables, three grouped queries."""
+    from apps.interactions.models import Review, Wishlist
+    from apps.marketplace.models import UsedBikeListing
+
+    user_ids = list(user_ids)
+    stats = {user_id: dict.fromkeys(COUNTER_FIELDS, 0) for user_id in user_ids}
+    listings = UsedBikeListing.objects.filter(seller_id__in=user_ids).values('seller_id').annotate(
+        listings_count=Count('id'),
+        active_listings_count=Count('id', filter=Q(status='active')),
+        sold_listings_count=Count('id', filter=Q(status='sold')),
+        listing_views_count=Coalesce(Sum('views_count'), 0),
+    ).order_by()
+    for row in listings:
+        stats[row.pop('seller_id')].update(row)
+    reviews = Review.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+        reviews_count=Count('id'),
+    ).order_by()
+    for row in reviews:
+        stats[row.pop('user_id')].update(row)
+    wishlisted = Wishlist.bikes.through.objects.filter(wishlist__user_id__in=user_ids).values(
+        'wishlist__user_id',
+    ).annotate(wishlist_count=Count('id')).order_by()
+    for row in wishlisted:
+        stats[row.pop('wishlist__user_id')].update(row)
+    return stats
+
+
+def refresh_stats(user_ids: Iterable[int], create: bool = False) -> int:
+    """
+    Rewrite these users' counters from the source tables. Missing rows are only
+    created with `create` (never from delete cascades). Returns rows written.
+    """
+    user_ids = set(filter(None, user_ids))
+    if not user_ids:
+        return 0
+    expected = compute_stats(user_ids)
+    existing = {stats.pk: stats for stats in UserStats.objects.filter(pk__in=user_ids)}
+    now = timezone.now()
+    to_create, to_update = [], []
+    for user_id, values in expected.items():
+        stats = existing.get(user_id)
+        if stats is None:
+            if create:
+                to_create.append(UserStats(user_id=user_id, **values))
+            continue
+        if any(getattr(stats, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(stats, field, value)
+            stats.updated_at = now
+            to_update.append(stats)
+    if to_create:
+        # Users deleted meanwhile are skipped
+        present = set(User.objects.filter(pk__in=[stats.user_id for stats in to_create]).values_list('pk', flat=True))
+        to_create = [stats for stats in to_create if stats.user_id in present]
+        UserStats.objects.bulk_create(to_create, ignore_conflicts=True)
+    UserStats.objects.bulk_update(to_update, [*COUNTER_FIELDS, 'updated_at'], batch_size=1000)
+    for stats in to_create + to_update:
+        forget_stats(stats.user_id)
+    return len(to_create) + len(to_update)
+
+
+def get_stats(user_id: int) -> dict:
+    """The counters, from the per-user cache or one primary-key read."""
+    key = stats_cache_key(user_id)
+    stats = cache.get(key)
+    if stats is None:
+        stats = UserStats.objects.filter(pk=user_id).values(*COUNTER_FIELDS).first()
+        if stats is None:
+            refresh_stats([user_id], create=True)
+            stats = UserStats.objects.filter(pk=user_id).values(*COUNTER_FIELDS).first()
+        cache.set(key, stats, settings.USER_STATS_CACHE_SECONDS)
+    return stats
@@ -1,3 +1,408 @@
-from django.test import TestCase
+import datetime
+import io
+import math
+import time
+import unittest
+from unittest import mock
 
-# Create your tests here.
+import redis
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from google.auth import crypt, jwt
+from rest_framework.test import APIClient
+
+from apps.bikes.models import BikeModel, Brand
+from apps.interactions.models import Review, Wishlist
+from apps.marketplace.models import UsedBikeListing
+from core import throttling
+
+from . import google_auth, otp
+from .google_auth import CertificateCache, verify_id_token
+from .models import UserStats
+from .stats import COUNTER_FIELDS
+
+CLIENT_ID = 'test-client.apps.googleusercontent.com'
+
+
+def make_key(key_id):
+    """A private key PEM plus the self-signed certificate Google would publish for it."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, key_id)])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1)).not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    private_pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption(),
+    )
+    return private_pem, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+KEY, CERT = make_key('key-1')
+ROTATED_KEY, ROTATED_CERT = make_key('key-2')
+SIGNER = crypt.RSASigner.from_string(KEY, key_id='key-1')
+ROTATED_SIGNER = crypt.RSASigner.from_string(ROTATED_KEY, key_id='key-2')
+
+
+def make_token(signer=SIGNER, **claims):
+    now = int(time.time())
+    payload = {
+        'iss': 'https://accounts.google.com', 'aud': CLIENT_ID, 'sub': '1234',
+        'email': 'rider@example.com', 'name': 'Test Rider', 'iat': now, 'exp': now + 600,
+        **claims,
+    }
+    return jwt.encode(signer, payload).decode()
+
+
+class FakeCertEndpoint:
+    """Stand-in for Google's certificate URL: serves the given responses in turn."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def __call__(self):
+        response = self.responses[min(self.calls, len(self.responses) - 1)]
+        self.calls += 1
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@override_settings(GOOGLE_CLIENT_ID=CLIENT_ID)
+class VerifyIdTokenTests(SimpleTestCase):
+    def setUp(self):
+        self.endpoint = FakeCertEndpoint(({'key-1': CERT}, 3600))
+        self.clock = Clock()
+        self.cache = CertificateCache(fetch=self.endpoint, clock=self.clock)
+
+    def test_valid_token_and_certificates_fetched_once(self):
+        for _ in range(3):
+            idinfo = verify_id_token(make_token(), cache=self.cache)
+        self.assertEqual(idinfo['email'], 'rider@example.com')
+        self.assertEqual(self.endpoint.calls, 1)
+
+    def test_rejects_wrong_audience(self):
+        with self.assertRaises(ValueError):
+            verify_id_token(make_token(aud='someone-else'), cache=self.cache)
+
+    def test_rejects_wrong_issuer(self):
+        with self.assertRaises(ValueError):
+            verify_id_token(make_token(iss='https://evil.example.com'), cache=self.cache)
+
+    def test_rejects_expired_token(self):
+        with self.assertRaises(ValueError):
+            verify_id_token(make_token(iat=int(time.time()) - 7200, exp=int(time.time()) - 3600), cache=self.cache)
+
+    def test_rejects_bad_signature(self):
+        # Signed by a key that claims to be key-1
+        forged = make_token(signer=crypt.RSASigner.from_string(ROTATED_KEY, key_id='key-1'))
+        with self.assertRaises(ValueError):
+            verify_id_token(forged, cache=self.cache)
+
+    def test_rejects_malformed_token(self):
+        with self.assertRaises(ValueError):
+            verify_id_token('not-a-jwt', cache=self.cache)
+
+    def test_unknown_key_refetches_once_per_interval(self):
+        self.endpoint.responses.append(({'key-1': CERT, 'key-2': ROTATED_CERT}, 3600))
+        self.cache.get()
+        self.clock.now += google_auth.FORCED_REFRESH_INTERVAL
+        self.assertEqual(verify_id_token(make_token(signer=ROTATED_SIGNER), cache=self.cache)['sub'], '1234')
+        self.assertEqual(self.endpoint.calls, 2)
+
+        # A key Google never published does not hammer the endpoint
+        stranger = crypt.RSASigner.from_string(make_key('key-3')[0], key_id='key-3')
+        for _ in range(3):
+            with self.assertRaises(ValueError):
+                verify_id_token(make_token(signer=stranger), cache=self.cache)
+        self.assertEqual(self.endpoint.calls, 2)
+
+    def test_refreshes_in_background_before_expiry(self):
+        self.endpoint.responses.append(({'key-2': ROTATED_CERT}, 3600))
+        self.cache.get()
+        self.clock.now += 3600 - google_auth.REFRESH_AHEAD + 1
+        # Still served from the current set while the refresh runs
+        self.assertIn('key-1', self.cache.get())
+        self.cache.refresh_thread.join(timeout=5)
+        self.assertEqual(self.endpoint.calls, 2)
+        self.assertEqual(set(self.cache.get()), {'key-2'})
+        self.assertEqual(self.cache.expires_at, self.clock.now + 3600)
+
+    def test_keeps_expired_set_when_google_is_unreachable(self):
+        self.endpoint.responses.append(OSError('network down'))
+        self.cache.get()
+        self.clock.now += 7200
+        self.assertEqual(verify_id_token(make_token(), cache=self.cache)['sub'], '1234')
+
+    def test_first_fetch_failure_is_raised(self):
+        cache = CertificateCache(fetch=FakeCertEndpoint(OSError('network down')), clock=self.clock)
+        with self.assertRaises(OSError):
+            cache.get()
+
+
+@override_settings(GOOGLE_CLIENT_ID=CLIENT_ID)
+class GoogleAuthViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        original = google_auth.certificates
+        google_auth.certificates = CertificateCache(fetch=FakeCertEndpoint(({'key-1': CERT}, 3600)))
+        self.addCleanup(setattr, google_auth, 'certificates', original)
+
+    def test_login_creates_user(self):
+        response = self.client.post('/api/users/auth/google/', {
+            'email': 'rider@example.com', 'id_token': make_token(),
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['created'])
+        self.assertEqual(response.data['user']['email'], 'rider@example.com')
+        self.assertEqual(response.data['user']['first_name'], 'Test')
+
+    def test_invalid_token_is_unauthorized(self):
+        response = self.client.post('/api/users/auth/google/', {
+            'email': 'rider@example.com', 'id_token': make_token(aud='someone-else'),
+        }, format='json')
+        self.assertEqual(response.status_code, 401)
+
+
+def redis_client():
+    try:
+        client = redis.Redis.from_url(settings.REDIS_URL, socket_connect_timeout=0.2)
+        client.ping()
+        return client
+    except redis.RedisError:
+        return None
+
+
+class OTPStoreTestsMixin:
+    """Behaviour shared by both backends, with OTP_MAX_ATTEMPTS=3."""
+    phone = '+8801700000000'
+
+    def make_backend(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        original = otp._backend
+        otp._backend = self.make_backend()
+        self.addCleanup(setattr, otp, '_backend', original)
+
+    def test_issue_and_consume(self):
+        code = otp.issue(self.phone)
+        self.assertEqual(len(code), 6)
+        self.assertEqual(otp.verify(self.phone, code), otp.VERIFIED)
+        # Consumed: the same code does not verify twice
+        self.assertEqual(otp.verify(self.phone, code), otp.INVALID)
+
+    def test_new_code_replaces_old(self):
+        first = otp.issue(self.phone)
+        second = otp.issue(self.phone)
+        if first != second:
+            self.assertEqual(otp.verify(self.phone, first), otp.INVALID)
+        self.assertEqual(otp.verify(self.phone, second), otp.VERIFIED)
+
+    def test_lockout_after_max_attempts(self):
+        code = otp.issue(self.phone)
+        for _ in range(3):
+            self.assertEqual(otp.verify(self.phone, 'wrong'), otp.INVALID)
+        self.assertEqual(otp.verify(self.phone, code), otp.LOCKED)
+        self.assertIsNone(otp.issue(self.phone))
+
+    def test_success_resets_attempts(self):
+        code = otp.issue(self.phone)
+        otp.verify(self.phone, 'wrong')
+        otp.verify(self.phone, 'wrong')
+        self.assertEqual(otp.verify(self.phone, code), otp.VERIFIED)
+        code = otp.issue(self.phone)
+        otp.verify(self.phone, 'wrong')
+        otp.verify(self.phone, 'wrong')
+        self.assertEqual(otp.verify(self.phone, code), otp.VERIFIED)
+
+    def test_phones_are_independent(self):
+        code = otp.issue(self.phone)
+        self.assertEqual(otp.verify('+8801800000000', code), otp.INVALID)
+        self.assertEqual(otp.verify(self.phone, code), otp.VERIFIED)
+
+
+@override_settings(OTP_TTL_SECONDS=300, OTP_MAX_ATTEMPTS=3)
+class LocalOTPStoreTests(OTPStoreTestsMixin, SimpleTestCase):
+    def make_backend(self):
+        self.clock = Clock()
+        return otp.LocalOTPBackend(clock=self.clock)
+
+    def test_code_expires(self):
+        code = otp.issue(self.phone)
+        self.clock.now += 301
+        self.assertEqual(otp.verify(self.phone, code), otp.INVALID)
+
+    def test_lockout_expires(self):
+        otp.issue(self.phone)
+        for _ in range(3):
+            otp.verify(self.phone, 'wrong')
+        self.clock.now += 301
+        self.assertIsNotNone(otp.issue(self.phone))
+
+    def test_keys_do_not_contain_the_phone(self):
+        code = otp.issue(self.phone)
+        otp.verify(self.phone, 'wrong')
+        stored = otp._backend.values
+        self.assertFalse(any('8801700000000' in key for key in stored))
+        self.assertNotIn(code, [value for value, _ in stored.values()])
+
+
+@unittest.skipUnless(redis_client(), "Redis is not reachable at REDIS_URL")
+@override_settings(OTP_TTL_SECONDS=300, OTP_MAX_ATTEMPTS=3)
+class RedisOTPStoreTests(OTPStoreTestsMixin, SimpleTestCase):
+    def make_backend(self):
+        client = redis_client()
+        client.delete(*otp.keys(self.phone), *otp.keys('+8801800000000'))
+        return otp.RedisOTPBackend(client)
+
+
+class OTPViewTests(TestCase):
+    def setUp(self):
+        original = otp._backend
+        otp._backend = otp.LocalOTPBackend()
+        self.addCleanup(setattr, otp, '_backend', original)
+        # Throttle in process only, so counts from earlier runs kept in Redis do not apply
+        limiter = throttling.RateLimiter(settings.REDIS_URL)
+        limiter.retry_at = math.inf
+        patcher = mock.patch.object(throttling, 'limiter', limiter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(
+            email='rider@example.com', username='rider', password='secret',
+        ))
+
+    @override_settings(DEBUG_OTP=True)
+    def test_send_then_verify(self):
+        response = self.client.post('/api/users/auth/otp/send/', {'phone': '+8801700000000'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        code = response.data['dev_otp']
+        response = self.client.post('/api/users/auth/verify-phone/', {'phone': '+8801700000000', 'otp': code}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['success'])
+
+    def test_wrong_code_then_lockout(self):
+        self.client.post('/api/users/auth/otp/send/', {'phone': '+8801700000000'}, format='json')
+        for _ in range(settings.OTP_MAX_ATTEMPTS):
+            response = self.client.post('/api/users/auth/verify-phone/', {'phone': '+8801700000000', 'otp': '000000'}, format='json')
+            self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/users/auth/verify-phone/', {'phone': '+8801700000000', 'otp': '000000'}, format='json')
+        self.assertEqual(response.status_code, 429)
+
+
+    @override_settings(REDIS_URL='redis://127.0.0.1:1/0', OTP_LOCAL_FALLBACK=False)
+    def test_unreachable_store_fails_closed(self):
+        otp._backend = None
+        with self.assertLogs('apps.users.views', 'ERROR'):
+            response = self.client.post('/api/users/auth/otp/send/', {'phone': '+8801700000000'}, format='json')
+            self.assertEqual(response.status_code, 503)
+            response = self.client.post('/api/users/auth/verify-phone/', {'phone': '+8801700000000', 'otp': '000000'}, format='json')
+            self.assertEqual(response.status_code, 503)
+        self.assertIsInstance(otp._backend, otp.RedisOTPBackend)
+
+    def test_store_failing_after_start_fails_closed(self):
+        otp._backend = otp.RedisOTPBackend(redis.Redis.from_url(settings.REDIS_URL))
+        with mock.patch.object(otp._backend, 'verify', side_effect=redis.ConnectionError), \
+                self.assertLogs('apps.users.views', 'ERROR'):
+            response = self.client.post('/api/users/auth/verify-phone/', {'phone': '+8801700000000', 'otp': '000000'}, format='json')
+        self.assertEqual(response.status_code, 503)
+
+    @override_settings(REDIS_URL='redis://127.0.0.1:1/0', OTP_LOCAL_FALLBACK=True)
+    def test_local_fallback_only_when_enabled(self):
+        otp._backend = None
+        with self.assertLogs('apps.users.otp', 'WARNING'):
+            response = self.client.post('/api/users/auth/otp/send/', {'phone': '+8801700000000'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(otp._backend, otp.LocalOTPBackend)
+
+class UserStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user, self.other = (
+            get_user_model().objects.create_user(email=f'{name}@example.com', username=name) for name in ('seller', 'buyer')
+        )
+        brand = Brand.objects.create(name='Yamaha', slug='yamaha')
+        self.bike = BikeModel.objects.create(
+            brand=brand, name='R15 V3', slug='yamaha-r15-v3', category='sports', engine_capacity=155, price=450000,
+        )
+
+    def create_listing(self, **fields):
+        return UsedBikeListing.objects.create(**{
+            'seller': self.user, 'title': 'Yamaha R15 V3', 'price': 350000, 'mileage': 12000,
+            'manufacturing_year': 2021, 'condition': 'good', 'description': 'Well kept',
+            'location': 'Dhaka', 'status': 'active', **fields,
+        })
+
+    def assertStats(self, user, **expected):
+        stats = UserStats.objects.filter(pk=user.pk).values(*COUNTER_FIELDS).get()
+        self.assertEqual(stats, {**dict.fromkeys(COUNTER_FIELDS, 0), **expected})
+
+    def test_listing_counters(self):
+        listing = self.create_listing(views_count=7)
+        self.create_listing(status='pending')
+        self.assertStats(self.user, listings_count=2, active_listings_count=1, listing_views_count=7)
+
+        listing = UsedBikeListing.objects.get(pk=listing.pk)
+        listing.status = 'sold'
+        listing.save()
+        self.assertStats(self.user, listings_count=2, sold_listings_count=1, listing_views_count=7)
+
+        listing.seller = self.other
+        listing.save()
+        self.assertStats(self.user, listings_count=1)
+        self.assertStats(self.other, listings_count=1, sold_listings_count=1, listing_views_count=7)
+
+        UsedBikeListing.objects.get(pk=listing.pk).delete()
+        self.assertStats(self.other)
+
+    def test_review_and_wishlist_counters(self):
+        review = Review.objects.create(bike=self.bike, user=self.user, rating=4, comment='Good')
+        Wishlist.objects.create(user=self.user).bikes.add(self.bike)
+        self.assertStats(self.user, reviews_count=1, wishlist_count=1)
+        review.delete()
+        self.user.wishlist.bikes.clear()
+        self.assertStats(self.user)
+
+    def test_endpoint_is_cached_until_a_write(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get('/api/users/me/stats/').json()['listings_count'], 0)
+        with self.assertNumQueries(0):
+            client.get('/api/users/me/stats/')
+        self.create_listing()
+        self.assertEqual(client.get('/api/users/me/stats/').json()['listings_count'], 1)
+
+    def test_reconcile_command_fixes_drift(self):
+        self.create_listing()
+        # Bulk writes skip the signals; a missing stats row is recreated
+        UsedBikeListing.objects.update(status='sold')
+        UserStats.objects.filter(pk=self.other.pk).delete()
+        out = io.StringIO()
+        call_command('reconcile_user_stats', batch_size=1, stdout=out)
+        self.assertIn("Fixed stats of 2 users.", out.getvalue())
+        self.assertStats(self.user, listings_count=1, sold_listings_count=1)
+        self.assertStats(self.other)
+
+        out = io.StringIO()
+        call_command('reconcile_user_stats', stdout=out)
+        self.assertIn("Fixed stats of 0 users.", out.getvalue())
@@ -1,23 +1,19 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics, permissions
-from rest_framework.throttling import UserRateThrottle
 from rest_framework.permissions import AllowAny
-from rest_framework_simplejwt.tokens import RefreshToken
-from django.core.cache import cache
 from django.conf import settings
 from django.contrib.auth import get_user_model
 import secrets
-import hmac
 import logging
 
-# Google token verification
-import google.oauth2.id_token
-import google.auth.transport.requests
+from core.authentication import tokens_for_user
+from core.throttling import SharedRateThrottle
 
+from . import otp as otp_store
+from .google_auth import verify_id_token
 from .serializers import GoogleAuthSerializer, UserSerializer
-from apps.marketplace.models import UsedBikeListing
-from apps.interactions.models import Review, Wishlist
+from .stats import get_stats
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -52,14 +48,9 @@ class GoogleAuthView(generics.GenericAPIView):
 
         id_token = serializer.validated_data.get('id_token')
 
-        # Verify the token with Google's token endpoint
+        # Verified locally against Google's cached signing certificates
         try:
-            request_adapter = google.auth.transport.requests.Request()
-            idinfo = google.oauth2.id_token.verify_oauth2_token(
-                id_token,
-                request_adapter,
-                getattr(settings, 'GOOGLE_CLIENT_ID', None)
-            )
+            idinfo = verify_id_token(id_token)
         except ValueError as e:
             logger.warning(f"Invalid Google ID token: {e}")
             return Response({'detail': 'Invalid Google token'}, status=status.HTTP_401_UNAUTHORIZED)
@@ -85,7 +76,7 @@ class GoogleAuthView(generics.GenericAPIView):
             )
             created = True
 
-        refresh = RefreshToken.for_user(user)
+        refresh = tokens_for_user(user)
         return Response({
             'refresh': str(refresh),
             'access': str(refresh.access_token),
@@ -93,10 +84,20 @@ class GoogleAuthView(generics.GenericAPIView):
             'created': created,
         })
 
-class OTPRateThrottle(UserRateThrottle):
-    """Rate limit OTP requests to 3 per minute per phone/IP"""
+class OTPRateThrottle(SharedRateThrottle):
+    """Rate limit OTP requests per user/IP"""
     scope = 'otp_send'
-    rate = '3/min'
+
+
+class OTPPhoneRateThrottle(SharedRateThrottle):
+    """And per phone number, whichever client asks"""
+    scope = 'otp_send_phone'
+
+    def get_cache_key(self, request, view):
+        phone = request.data.get('phone')
+        if not phone:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': otp_store.phone_digest(str(phone))}
 
 
 class SendOTPView(APIView):
@@ -104,29 +105,29 @@ class SendOTPView(APIView):
     Sends OTP via Firebase/SMS.
     In production, this would call Firebase Auth or an SMS gateway.
     """
-    throttle_classes = [OTPRateThrottle]
+    throttle_classes = [OTPRateThrottle, OTPPhoneRateThrottle]
     
     def post(self, request):
         phone = request.data.get('phone')
         if not phone:
             return Response({"error": "Phone number is required"}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Check for lockout (too many failed attempts)
-        attempts_key = f"otp_attempts_{phone}"
-        attempts = cache.get(attempts_key, 0)
-        if attempts >= 5:
+        # Shared across workers; refused while the phone is locked out after failed attempts
+        try:
+            otp = otp_store.issue(str(phone))
+        except otp_store.OTPUnavailable:
+            logger.exception("OTP store unavailable")
+            return Response(
+                {"error": "Phone verification is temporarily unavailable. Please try again later."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        if otp is None:
             logger.warning("OTP request lockout for phone after failed attempts")
             return Response(
                 {"error": "Too many failed attempts. Please try again later."},
                 status=status.HTTP_429_TOO_MANY_REQUESTS
             )
         
-        # Generate a cryptographically secure 6-digit OTP
-        otp = str(secrets.randbelow(900000) + 100000)
-        
-        # Store OTP in cache for 5 minutes
-        cache.set(f"otp_{phone}", otp, timeout=300)
-        
         # Log OTP send event (without exposing OTP in production logs)
         logger.debug("OTP sent for phone (masked)")
         
@@ -140,7 +141,7 @@ class SendOTPView(APIView):
 class VerifyOTPView(APIView):
     """
     Verifies the OTP provided by the user.
-    Implements constant-time comparison and attempt tracking.
+    The check and the attempt count are one atomic step in the OTP store.
     """
     def post(self, request):
         phone = request.data.get('phone')
@@ -149,29 +150,26 @@ class VerifyOTPView(APIView):
         if not phone or not otp:
             return Response({"error": "Phone and OTP are required"}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Check attempt lockout
-        attempts_key = f"otp_attempts_{phone}"
-        attempts = cache.get(attempts_key, 0)
-        if attempts >= 5:
+        try:
+            result = otp_store.verify(str(phone), str(otp))
+        except otp_store.OTPUnavailable:
+            logger.exception("OTP store unavailable")
+            return Response(
+                {"error": "Phone verification is temporarily unavailable. Please try again later."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        if result == otp_store.LOCKED:
             logger.warning("OTP verification blocked due to too many attempts for phone")
             return Response(
                 {"error": "Too many failed attempts. Please request a new OTP."},
                 status=status.HTTP_429_TOO_MANY_REQUESTS
             )
         
-        cached_otp = cache.get(f"otp_{phone}")
-        
-        if cached_otp and hmac.compare_digest(cached_otp, otp):
-            # Successful verification: delete OTP and reset attempts
-            cache.delete(f"otp_{phone}")
-            cache.delete(attempts_key)
+        if result == otp_store.VERIFIED:
             logger.info("OTP verification successful")
             return Response({"success": True, "message": "Phone verified successfully"})
         
-        # Failed attempt: increment counter with 5-min TTL tied to OTP timeout
-        cache.set(attempts_key, attempts + 1, timeout=300)
-        logger.warning(f"Failed OTP verification attempt {attempts + 1} for phone")
-        
+        logger.warning("Failed OTP verification attempt for phone")
         return Response(
             {"success": False, "error": "Invalid or expired OTP"},
             status=status.HTTP_400_BAD_REQUEST
@@ -182,16 +180,10 @@ class UserDashboardStatsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
+        # Stored counters (see stats.py): a cache hit or one primary-key read
         user = request.user
-        listings_count = UsedBikeListing.objects.filter(seller=user).count()
-        wishlist = Wishlist.objects.filter(user=user).first()
-        wishlist_count = wishlist.bikes.count() if wishlist else 0
-        reviews_count = Review.objects.filter(user=user).count()
-        
         return Response({
-            "listings_count": listings_count,
-            "wishlist_count": wishlist_count,
-            "reviews_count": reviews_count,
+            **get_stats(user.pk),
             "member_since": user.date_joined.strftime("%b %Y"),
         })
 
@@ -0,0 +1,19 @@
+from django.apps import AppConfig
+from django.core import checks
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+class CoreConfig(AppConfig):
+    name = 'core'
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+
+        from . import authentication, db_router, response_cache
+
+        checks.register(db_router.check_shared_cache, checks.Tags.caches)
+
+        post_save.connect(response_cache.model_changed, dispatch_uid='response-cache-save')
+        post_delete.connect(response_cache.model_changed, dispatch_uid='response-cache-delete')
+        m2m_changed.connect(response_cache.relation_changed, dispatch_uid='response-cache-m2m')
+        post_save.connect(authentication.user_changed, sender=get_user_model(), dispatch_uid='auth-user-save')
+        post_delete.connect(authentication.user_changed, sender=get_user_model(), dispatch_uid='auth-user-delete')
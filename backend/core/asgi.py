@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+# One event loop per worker: AsyncAPIView views await their async handlers
+os.environ.setdefault('ASYNC_VIEWS', 'true')
 
 application = get_asgi_application()
@@ -0,0 +1,77 @@
+"""
+DRF views with an async GET path for the ASGI deployment.
+
+DRF dispatches synchronously. AsyncAPIView keeps DRF's request handling
+(authentication, permissions, throttles, content negotiation and renderers)
+and, when settings.ASYNC_VIEWS is on, awaits an `aget` handler in between, so
+a worker waiting on the database or Redis can keep serving other requests.
+
+ASYNC_VIEWS is on only under ASGI (core.asgi sets it). Under WSGI every async
+view would run in a fresh event loop per request, so the sync `get` handlers
+serve there.
+"""
+import asyncio
+
+import redis.asyncio as aioredis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.functional import classproperty
+from rest_framework.views import APIView
+
+# One client per process. Its connections belong to the event loop that
+# opened them, which under ASGI lives as long as the worker.
+_client = None
+_client_loop = None
+
+
+def get_async_redis() -> aioredis.Redis:
+    """redis.asyncio client for this process's event loop."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client_loop is not loop:
+        # Only reached more than once outside ASGI (e.g. async_to_sync in a
+        # script); the old loop is gone and its connections with it
+        _client = aioredis.Redis.from_url(
+            settings.REDIS_URL, decode_responses=True, socket_connect_timeout=0.5, socket_timeout=0.5,
+        )
+        _client_loop = loop
+    return _client
+
+
+class AsyncAPIView(APIView):
+    """
+    APIView whose `aget` handler is awaited under ASGI; `get` serves WSGI.
+    HEAD goes to the same handler as GET, as in Django.
+    """
+
+    @classproperty
+    def view_is_async(cls):
+        return settings.ASYNC_VIEWS
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self.adispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+    async def adispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            method = request.method.lower()
+            handler = getattr(self, 'a' + ('get' if method == 'head' else method), None)
+            if handler is not None and method in self.http_method_names:
+                response = await handler(request, *args, **kwargs)
+            else:
+                # OPTIONS, 405s: DRF's own sync handlers
+                handler = getattr(self, method, self.http_method_not_allowed)
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
@@ -0,0 +1,106 @@
+"""
+JWT authentication without a user query on every request.
+
+Access tokens carry the user's `updated_at` as of when they were issued:
+tokens_for_user stamps it at login and TokenRefreshSerializer re-reads it on
+every refresh. Users are kept in a small per-process LRU keyed by (user id,
+updated_at claim) for AUTH_USER_CACHE_SECONDS. A token issued after the user
+changed therefore misses the cache, and any other staleness is bounded by
+that TTL.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt import serializers
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .db_router import stick_to_primary
+
+UPDATED_AT_CLAIM = 'uat'
+
+
+def updated_at_claim(user):
+    # Microseconds: two saves within one second must still give different claims
+    return round(user.updated_at.timestamp() * 1_000_000) if getattr(user, 'updated_at', None) else None
+
+
+def tokens_for_user(user) -> RefreshToken:
+    """A refresh token (and, through it, access tokens) stamped with the user's updated_at."""
+    refresh = RefreshToken.for_user(user)
+    refresh[UPDATED_AT_CLAIM] = updated_at_claim(user)
+    return refresh
+
+
+class StampedRefreshToken(RefreshToken):
+    @property
+    def access_token(self):
+        # The claim copied from login would be stale once the user changed
+        user = get_user_model().objects.filter(
+            **{api_settings.USER_ID_FIELD: self.payload.get(api_settings.USER_ID_CLAIM)}
+        ).only('updated_at').first()
+        if user is not None:
+            self[UPDATED_AT_CLAIM] = updated_at_claim(user)
+        return super().access_token
+
+
+class TokenRefreshSerializer(serializers.TokenRefreshSerializer):
+    """simplejwt's refresh, with access tokens stamped with the user's current updated_at."""
+    token_class = StampedRefreshToken
+
+
+class UserLRU:
+    def __init__(self, size: int, ttl: float, clock=time.monotonic):
+        self.size, self.ttl, self.clock = size, ttl, clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            user, stored_at = entry
+            if self.clock() - stored_at > self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return user
+
+    def put(self, key, user):
+        with self.lock:
+            self.entries[key] = (user, self.clock())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def forget(self, user_id):
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == user_id]:
+                del self.entries[key]
+
+
+user_cache = UserLRU(settings.AUTH_USER_CACHE_SIZE, settings.AUTH_USER_CACHE_SECONDS)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        key = (str(validated_token.get(api_settings.USER_ID_CLAIM)), validated_token.get(UPDATED_AT_CLAIM))
+        user = user_cache.get(key)
+        if user is None:
+            # Full lookup, including simplejwt's active/revocation checks
+            user = super().get_user(validated_token)
+            user_cache.put(key, user)
+        stick_to_primary(user)
+        # Views may modify request.user; they get their own copy
+        return copy.copy(user)
+
+
+def user_changed(sender, instance, **kwargs):
+    # Only this process's entries; other workers rely on the TTL and the updated_at key
+    user_cache.forget(str(instance.pk))
@@ -0,0 +1,14 @@
+"""Batch helpers for management commands that walk whole tables."""
+
+
+def keyset_batches(queryset, batch_size):
+    """Yield lists of ids in ascending order, seeking past the last id seen."""
+    last_id = 0
+    while True:
+        ids = list(
+            queryset.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
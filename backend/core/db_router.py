@@ -0,0 +1,113 @@
+"""
+Primary/replica routing.
+
+Writes always go to the primary ('default'). Reads go to a random replica
+from DATABASE_REPLICAS only while replica reads are switched on, which
+ReplicaRoutingMiddleware does for safe-method requests. Everything else
+(unsafe requests, management commands, background threads) reads from the
+primary, so code that reads back its own writes never sees replica lag.
+
+After a client writes, its reads stay on the primary for
+DATABASE_STICKY_SECONDS, long enough for replication to catch up with what it
+just saved. Authenticated clients are remembered by user id in the default
+cache, so this holds for JWT clients that drop cookies; the JWT
+authentication class checks it once it knows who the user is. A short-lived
+cookie covers anonymous and session clients.
+
+Remembering users across workers needs a shared cache (CACHE_URL). The
+per-process default only covers the worker that took the write, so with
+replicas configured check_shared_cache warns about it (core.W001).
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+STICKY_COOKIE = 'db_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PER_PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# A context variable rather than a thread local, so async views are covered too
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def sticky_key(user_id) -> str:
+    return f"db:primary:{user_id}"
+
+
+def stick_to_primary(user) -> None:
+    """Switch the rest of this request to the primary if `user` wrote recently."""
+    if settings.DATABASE_REPLICAS and _replica_reads.get() and cache.get(sticky_key(user.pk)):
+        _replica_reads.set(False)
+
+
+@contextmanager
+def replica_reads(enabled: bool = True):
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or not _replica_reads.get():
+            return DEFAULT_DB_ALIAS
+        # Reads inside a transaction on the primary must see that transaction
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    """Turn replica reads on for safe requests of clients that have not written recently."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        use_replica = request.method in SAFE_METHODS and STICKY_COOKIE not in request.COOKIES
+        with replica_reads(use_replica):
+            response = self.get_response(request)
+        if request.method not in SAFE_METHODS and response.status_code < 400 and settings.DATABASE_REPLICAS:
+            # DRF sets request.user on the underlying request once it has authenticated
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                cache.set(sticky_key(user.pk), 1, settings.DATABASE_STICKY_SECONDS)
+            response.set_cookie(
+                STICKY_COOKIE, '1',
+                max_age=settings.DATABASE_STICKY_SECONDS,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite=settings.SESSION_COOKIE_SAMESITE,
+            )
+        return response
+
+
+def check_shared_cache(app_configs=None, **kwargs):
+    if settings.DATABASE_REPLICAS and settings.CACHES['default']['BACKEND'] in PER_PROCESS_CACHES:
+        return [checks.Warning(
+            "Read replicas are configured but the default cache is per process.",
+            hint="Set CACHE_URL, or users who wrote in one worker may read stale data from a replica in another.",
+            id='core.W001',
+        )]
+    return []
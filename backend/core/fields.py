@@ -0,0 +1,29 @@
+from decimal import Decimal
+
+from django.db import models
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+
+class DecimalField(serializers.DecimalField):
+    """
+    DecimalField that writes values already at the field's precision (every
+    price read from a DecimalField column) without re-quantizing them.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.plain_output = (
+            self.decimal_places is not None
+            and getattr(self, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+            and not self.localize and not self.normalize_output
+        )
+
+    def to_representation(self, value):
+        if self.plain_output and type(value) is Decimal and value.as_tuple().exponent == -self.decimal_places:
+            return f'{value:f}'
+        return super().to_representation(value)
+
+
+# ModelSerializer.serializer_field_mapping with the fast decimal field
+SERIALIZER_FIELD_MAPPING = {**serializers.ModelSerializer.serializer_field_mapping, models.DecimalField: DecimalField}
@@ -0,0 +1,86 @@
+"""
+PostgreSQL backend with an in-process psycopg connection pool.
+
+Django 4.2 opens a connection per thread and keeps it for CONN_MAX_AGE. This
+backend instead checks a connection out of a psycopg_pool.ConnectionPool when
+Django connects and hands it back when Django closes it (at the end of each
+request, since CONN_MAX_AGE must be 0), so all threads of a worker share at
+most OPTIONS['pool']['max_size'] server connections:
+
+    'ENGINE': 'core.postgres_pool',
+    'OPTIONS': {'pool': {'min_size': 2, 'max_size': 10, 'timeout': 10}},
+
+Requires psycopg 3 with the pool extra (psycopg[binary,pool]).
+"""
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+
+try:
+    from psycopg_pool import ConnectionPool
+except ImportError as exc:
+    raise ImproperlyConfigured('core.postgres_pool needs psycopg_pool: pip install "psycopg[binary,pool]"') from exc
+
+if not base.is_psycopg3:
+    raise ImproperlyConfigured('core.postgres_pool needs psycopg 3, not psycopg2')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # One pool per alias and database name, shared by every thread's wrapper;
+    # the name is part of the key so the test database gets its own pool
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    @property
+    def pool(self):
+        key = (self.alias, self.settings_dict['NAME'])
+        pool = self._pools.get(key)
+        if pool is None:
+            if self.settings_dict['CONN_MAX_AGE']:
+                raise ImproperlyConfigured('Set CONN_MAX_AGE to 0 with a pool: connections go back to it after each request')
+            options = self.settings_dict['OPTIONS'].get('pool') or {}
+            # Django turns autocommit on or off itself once it has the connection
+            kwargs = {**self.get_connection_params(), 'autocommit': True}
+            with self._pools_lock:
+                pool = self._pools.get(key)
+                if pool is None:
+                    pool = ConnectionPool(
+                        kwargs=kwargs,
+                        check=ConnectionPool.check_connection if self.settings_dict['CONN_HEALTH_CHECKS'] else None,
+                        open=True,
+                        **options,
+                    )
+                    self._pools[key] = pool
+        return pool
+
+    def get_new_connection(self, conn_params):
+        connection = self.pool.getconn()
+        options = self.settings_dict['OPTIONS']
+        # The same isolation level bookkeeping as a fresh connection
+        self.isolation_level = base.IsolationLevel.READ_COMMITTED
+        if 'isolation_level' in options:
+            try:
+                self.isolation_level = base.IsolationLevel(options['isolation_level'])
+            except ValueError:
+                raise ImproperlyConfigured(f"Invalid transaction isolation level {options['isolation_level']}")
+            connection.isolation_level = self.isolation_level
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                # The pool rolls back anything left open before reusing it
+                self.connection._pool.putconn(self.connection)
+                self.connection = None
+
+    def close_pool(self):
+        with self._pools_lock:
+            pool = self._pools.pop((self.alias, self.settings_dict['NAME']), None)
+        if pool is not None:
+            pool.close()
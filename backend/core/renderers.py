@@ -0,0 +1,82 @@
+"""
+orjson-backed JSON renderer and parser, plus a MessagePack renderer.
+
+ORJSONRenderer matches DRF's JSONRenderer with the default settings
+(compact, UTF-8, U+2028/U+2029 escaped) for the values serializers produce;
+datetimes, UUIDs and dicts are encoded natively and everything else goes
+through DRF's encoder. It is not byte-identical in every case:
+
+- NaN and Infinity are written as null, where DRF's strict JSON raises.
+- Integers outside the 64-bit range make orjson raise; that payload is
+  rendered again by JSONRenderer instead.
+
+Pretty-printed output (the browsable API, `; indent=` in Accept) is left to
+JSONRenderer, since orjson only indents by two.
+"""
+from decimal import Decimal
+
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+_encoder = JSONEncoder()
+
+
+def default(obj):
+    """Types orjson does not know, converted the way DRF's encoder does."""
+    # Serializers already coerce decimals to strings; raw ones (aggregates, .values()) become floats
+    if type(obj) is Decimal:
+        return float(obj)
+    return _encoder.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # Integers past 64 bits, or a type neither encoder knows (DRF raises its own error then)
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class ORJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    `application/msgpack` for clients that ask for it in Accept (or with
+    ?format=msgpack). Values are the ones the JSON renderer would write.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=default)
@@ -0,0 +1,162 @@
+"""
+Full-response cache for anonymous GETs.
+
+Views opt in by declaring the models their payload depends on:
+
+    class BrandViewSet(viewsets.ReadOnlyModelViewSet):
+        response_cache_tags = ('bikes.Brand',)
+
+Every tag has a generation counter in the cache and the counters are part of
+each entry's key. A write to a tagged model bumps its counter, so the old
+entries are simply never looked up again and age out on their own; nothing
+has to be scanned or deleted.
+"""
+import hashlib
+import logging
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+CACHED_HEADERS = ('Content-Type', 'Vary', 'Allow')
+
+
+def generation_key(tag: str) -> str:
+    return f"response-cache:gen:{tag}"
+
+
+def _bump(tags):
+    for tag in tags:
+        key = generation_key(tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def invalidate_tags(*tags: str):
+    """
+    Bump the generation of each tag. Inside a transaction it is bumped again on
+    commit, so a read racing the write cannot cache pre-commit data under the
+    new generation.
+    """
+    _bump(tags)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(tags))
+
+
+def model_changed(sender, **kwargs):
+    app_config = sender._meta.app_config
+    if kwargs.get('raw') or app_config is None or app_config.name.startswith('django.'):
+        return
+    # Logins save last_login only; no cached payload shows it
+    if kwargs.get('update_fields') == frozenset({'last_login'}):
+        return
+    invalidate_tags(sender._meta.label)
+
+
+def relation_changed(sender, instance, action, model, **kwargs):
+    if action.startswith('post_'):
+        invalidate_tags(type(instance)._meta.label, model._meta.label)
+
+
+def view_cache_tags(view_func):
+    """Tags declared by a DRF view, or None when this view/action is not cacheable."""
+    cls = getattr(view_func, 'cls', None)
+    tags = getattr(cls, 'response_cache_tags', None)
+    if not tags:
+        return None
+    actions = getattr(view_func, 'actions', None)
+    if actions is not None and actions.get('get') not in getattr(cls, 'response_cache_actions', ('list', 'retrieve')):
+        return None
+    return tags
+
+
+def is_anonymous(request) -> bool:
+    return 'HTTP_AUTHORIZATION' not in request.META and settings.SESSION_COOKIE_NAME not in request.COOKIES
+
+
+def negotiated_format(request, view_func, view_kwargs):
+    """
+    Format of the renderer the view will pick for this request (its own
+    content negotiation, Accept and ?format= included), or None if none fits.
+    """
+    view = view_func.cls(**getattr(view_func, 'initkwargs', {}))
+    view.format_kwarg = view_kwargs.get(api_settings.FORMAT_SUFFIX_KWARG)
+    try:
+        renderer, _media_type = view.perform_content_negotiation(Request(request))
+    except NotAcceptable:
+        return None
+    return renderer.format
+
+
+def response_cache_key(request, tags, representation) -> str:
+    generations = cache.get_many([generation_key(tag) for tag in tags])
+    query = urlencode(sorted((key, value) for key, values in request.GET.lists() for value in values))
+    # Each representation of a URL (JSON, MessagePack) is stored apart
+    parts = [request.path, query, representation] + [f"{tag}={generations.get(generation_key(tag), 0)}" for tag in sorted(tags)]
+    return 'response-cache:' + hashlib.sha256('|'.join(parts).encode()).hexdigest()
+
+
+class ResponseCacheMiddleware:
+    """Serve opted-in views' anonymous GET responses from the cache."""
+
+    def __init__(self, get_response):
+        if not settings.RESPONSE_CACHE_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        key = getattr(request, '_response_cache_key', None)
+        # Stored only when rendered as negotiated up front; a 406 or an
+        # exception handler may have picked another renderer
+        renderer = getattr(response, 'accepted_renderer', None)
+        if (
+            key and response.status_code == 200 and not response.streaming and not response.cookies
+            and renderer is not None and renderer.format == request._response_cache_format
+        ):
+            headers = {name: response[name] for name in CACHED_HEADERS if response.has_header(name)}
+            try:
+                cache.set(key, (response.content, headers), settings.RESPONSE_CACHE_SECONDS)
+            except Exception:
+                logger.exception("Response cache store failed")
+            response['X-Cache'] = 'MISS'
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in ('GET', 'HEAD') or not is_anonymous(request):
+            return None
+        tags = view_cache_tags(view_func)
+        if not tags:
+            return None
+        representation = negotiated_format(request, view_func, view_kwargs)
+        # The browsable API renders per user and per CSRF token
+        if representation is None or representation == 'api':
+            return None
+
+        try:
+            key = response_cache_key(request, tags, representation)
+            cached = cache.get(key)
+        except Exception:
+            logger.exception("Response cache lookup failed")
+            return None
+        if cached is None:
+            request._response_cache_key = key
+            request._response_cache_format = representation
+            return None
+
+        content, headers = cached
+        response = HttpResponse(content)
+        for name, value in headers.items():
+            response[name] = value
+        response['X-Cache'] = 'HIT'
+        return response
@@ -2,6 +2,7 @@
 Django settings for core project.
 """
 import os
+from datetime import timedelta
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -35,20 +36,26 @@ INSTALLED_APPS = [
     'django_filters',
     
     # Local apps
+    'core',
     'apps.users',
     'apps.bikes',
     'apps.marketplace',
     'apps.news',
+    'apps.editorial',
     'apps.interactions',
     'apps.recommendations',
+    'apps.search',
+    'apps.trending',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.db_router.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'core.response_cache.ResponseCacheMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -83,17 +90,63 @@ DATABASES = {
     }
 }
 
+# Persistent connections, checked before reuse so a dropped one is replaced
+# rather than failing the request
+DB_CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", "600"))
+
 # Optional PostgreSQL support via environment variable
 try:
     import dj_database_url
     if os.getenv("DATABASE_URL"):
         DATABASES['default'] = dj_database_url.config(
             default=os.getenv("DATABASE_URL"),
-            conn_max_age=600
+            conn_max_age=DB_CONN_MAX_AGE,
+            conn_health_checks=True,
         )
+    # Read replicas: comma-separated URLs; tests run them as mirrors of the primary
+    replica_urls = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+    for index, url in enumerate(replica_urls):
+        DATABASES[f'replica_{index}'] = {
+            **dj_database_url.parse(url, conn_max_age=DB_CONN_MAX_AGE, conn_health_checks=True),
+            'TEST': {'MIRROR': 'default'},
+        }
 except ImportError:
     pass
 
+# In-process PostgreSQL connection pool (core.postgres_pool): the threads of a
+# worker share at most DB_POOL_MAX_SIZE connections, returned to the pool
+# after each request. 0 keeps Django's per-thread persistent connections.
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "0"))
+if DB_POOL_MAX_SIZE:
+    for database in DATABASES.values():
+        if database['ENGINE'] == 'django.db.backends.postgresql':
+            database.update(ENGINE='core.postgres_pool', CONN_MAX_AGE=0)
+            database.setdefault('OPTIONS', {})['pool'] = {
+                'min_size': min(int(os.getenv("DB_POOL_MIN_SIZE", "1")), DB_POOL_MAX_SIZE),
+                'max_size': DB_POOL_MAX_SIZE,
+                'timeout': float(os.getenv("DB_POOL_TIMEOUT", "10")),
+            }
+
+# Behind PgBouncer in transaction mode a server-side cursor cannot outlive
+# its transaction, so .iterator() has to fetch client-side
+if os.getenv("DATABASE_POOLER") == "pgbouncer":
+    for database in DATABASES.values():
+        database['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+# Async handlers of core.async_views.AsyncAPIView; core.asgi turns this on,
+# WSGI workers keep the sync handlers
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS", "false").lower() == "true"
+
+# Safe-method reads go to replicas; a client's reads stay on the primary
+# for DATABASE_STICKY_SECONDS after it writes. Users are remembered in the
+# cache, so with replicas set CACHE_URL too (checked as core.W001).
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica_')]
+DATABASE_ROUTERS = ['core.db_router.PrimaryReplicaRouter']
+DATABASE_STICKY_SECONDS = int(os.getenv("DATABASE_STICKY_SECONDS", "10"))
+
+# Adds the 'test_replica' mirror the routing tests read from
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -126,22 +179,83 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        # 'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.CachedJWTAuthentication',
+        # Browsable API for staff logged in through the admin
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
+    ],
+    # orjson in place of the stdlib json; same output as DRF's JSONRenderer
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    # Counted in Redis by core.throttling, shared by all workers
+    'DEFAULT_THROTTLE_RATES': {
+        'otp_send': os.getenv("THROTTLE_OTP_SEND", "3/min"),
+        'otp_send_phone': os.getenv("THROTTLE_OTP_SEND_PHONE", "5/hour"),
+        'review_create': os.getenv("THROTTLE_REVIEW_CREATE", "10/hour"),
+        'listing_create': os.getenv("THROTTLE_LISTING_CREATE", "30/hour"),
+        'search': os.getenv("THROTTLE_SEARCH", "120/min"),
+    },
 }
 
+# MessagePack (Accept: application/msgpack) for mobile clients, when installed
+try:
+    import msgpack  # noqa: F401
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('core.renderers.MessagePackRenderer')
+except ImportError:
+    pass
+
 # MongoDB Settings
 # Avoid hardcoded credentials in repo. Default to local unauthenticated MongoDB instance.
 MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017/mrbikebd")
 MONGODB_DB_NAME = os.getenv("MONGODB_DB_NAME", "mrbikebd")
 
+# Auth Settings
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=int(os.getenv("JWT_ACCESS_MINUTES", "15"))),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=int(os.getenv("JWT_REFRESH_DAYS", "7"))),
+    'TOKEN_REFRESH_SERIALIZER': 'core.authentication.TokenRefreshSerializer',
+}
+# Authenticated users are reused for this long per process (see core/authentication.py)
+AUTH_USER_CACHE_SIZE = 2048
+AUTH_USER_CACHE_SECONDS = 30
+# Admin sessions read from the cache, falling back to the database
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Google Auth Settings
+GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
+
 # Redis Settings
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/1")
 
+# Cache Settings
+# Per-process memory by default. Set CACHE_URL (e.g. redis://localhost:6379/2)
+# to share the cache between workers; the response cache stays off without it,
+# because tag invalidations in one worker would not reach the others.
+CACHE_URL = os.getenv("CACHE_URL")
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true" if CACHE_URL else "false").lower() == "true"
+RESPONSE_CACHE_SECONDS = int(os.getenv("RESPONSE_CACHE_SECONDS", "300"))
+
 # Cloudinary Settings
 import cloudinary
 cloudinary.config(
@@ -151,9 +265,70 @@ cloudinary.config(
     secure = True
 )
 
+# Marketplace Settings
+LISTING_EXPIRY_DAYS = int(os.getenv("LISTING_EXPIRY_DAYS", "60"))
+LISTING_ARCHIVE_AFTER_DAYS = int(os.getenv("LISTING_ARCHIVE_AFTER_DAYS", "90"))
+LISTING_LIFECYCLE_BATCH_SIZE = 1000
+MARKETPLACE_BULK_MAX_LISTINGS = 500
+
+# Listing image pipeline: longest edge per variant, output formats (AVIF is
+# skipped when Pillow lacks support) and the storage backend for variants.
+LISTING_IMAGE_VARIANTS = {'thumb': 200, 'card': 640, 'full': 1600}
+LISTING_IMAGE_FORMATS = ['webp', 'avif']
+LISTING_IMAGE_WORKERS = int(os.getenv("LISTING_IMAGE_WORKERS", "2"))
+LISTING_IMAGE_MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+LISTING_UPLOAD_EXPIRY_SECONDS = 600
+LISTING_IMAGE_STORAGE = os.getenv(
+    "LISTING_IMAGE_STORAGE",
+    "apps.marketplace.storage.CloudinaryImageStorage" if os.getenv("CLOUDINARY_CLOUD_NAME")
+    else "apps.marketplace.storage.LocalImageStorage",
+)
+
+# Bikes Settings
+# The article-mention dictionary is rebuilt when its version key changes. The
+# key lives in the default cache, which is per process without CACHE_URL, so
+# MAX_AGE bounds how long another worker can keep an outdated catalog.
+BIKE_MENTION_DICTIONARY_MAX_AGE_SECONDS = int(os.getenv("BIKE_MENTION_DICTIONARY_MAX_AGE_SECONDS", "300"))
+
+# News Settings
+NEWS_ARTICLE_CACHE_SECONDS = int(os.getenv("NEWS_ARTICLE_CACHE_SECONDS", "3600"))
+
+# Search Settings
+# Suggestion segments are rebuilt when their version key changes, checked at
+# most every SEARCH_SUGGEST_CHECK_SECONDS, and at least every MAX_AGE. MAX_AGE
+# also covers bulk writes that skip signals and, without CACHE_URL, bumps
+# made in other workers' per-process caches.
+SEARCH_SUGGEST_CHECK_SECONDS = 5
+SEARCH_SUGGEST_MAX_AGE_SECONDS = int(os.getenv("SEARCH_SUGGEST_MAX_AGE_SECONDS", "300"))
+SEARCH_SUGGEST_MAX_LISTINGS = 2000
+
+# Trending Settings
+# Events decay exponentially: one from TRENDING_HALF_LIFE_HOURS ago counts half as much as one now.
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "24"))
+TRENDING_EVENT_WEIGHTS = {'view': 1.0, 'wishlist': 3.0}
+TRENDING_MAX_ITEMS = 1000
+
+# Wishlist Settings
+# Per-user wishlist id arrays are dropped on every change; the TTL only bounds memory.
+WISHLIST_IDS_CACHE_SECONDS = 24 * 3600
+
+# User Stats Settings
+# Dashboard counters are cached per user and dropped whenever one changes.
+USER_STATS_CACHE_SECONDS = 3600
+
 # CORS Settings
 CORS_ALLOW_ALL_ORIGINS = DEBUG
 CORS_ALLOW_CREDENTIALS = True
 
+# OTP Settings
+# Codes expire after OTP_TTL_SECONDS; OTP_MAX_ATTEMPTS wrong codes lock the
+# phone out until OTP_TTL_SECONDS after the last failure.
+OTP_TTL_SECONDS = 300
+OTP_MAX_ATTEMPTS = 5
+# Without Redis, OTP requests are refused with a 503. OTP_LOCAL_FALLBACK keeps
+# codes in-process instead when Redis is down at startup; per worker, so only
+# for development and tests.
+OTP_LOCAL_FALLBACK = os.getenv("OTP_LOCAL_FALLBACK", str(DEBUG)).lower() == "true"
+
 # Developer Convenience
 DEBUG_OTP = DEBUG
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.db import connections
+from django.test.runner import DiscoverRunner
+
+REPLICA_ALIAS = 'test_replica'
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Adds a database that mirrors the test database, so the routing tests in
+    core/tests.py run by default. Nothing reads from it unless a test lists it
+    in DATABASE_REPLICAS.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        if REPLICA_ALIAS not in settings.DATABASES:
+            settings.DATABASES[REPLICA_ALIAS] = {**settings.DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+            # Fills in the defaults the connection handler expects of the new alias
+            connections.configure_settings(settings.DATABASES)
+
+    def teardown_databases(self, old_config, **kwargs):
+        # Connections idling in a core.postgres_pool pool would keep the test database from being dropped
+        for connection in connections.all():
+            if hasattr(connection, 'close_pool'):
+                connection.close()
+                connection.close_pool()
+        super().teardown_databases(old_config, **kwargs)
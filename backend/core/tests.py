@@ -0,0 +1,352 @@
+import datetime
+import unittest
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.bikes.models import BikeModel, Brand
+from apps.news.models import Article, NewsCategory, Tag
+
+from . import throttling
+from .authentication import UPDATED_AT_CLAIM, CachedJWTAuthentication, UserLRU, tokens_for_user, user_cache
+from .db_router import STICKY_COOKIE, PrimaryReplicaRouter, check_shared_cache, replica_reads, sticky_key
+from .renderers import msgpack
+from .response_cache import generation_key
+from .throttling import LocalLimiter, RateLimiter, SharedRateThrottle
+
+try:
+    from .postgres_pool.base import DatabaseWrapper as PooledDatabaseWrapper
+except ImproperlyConfigured:
+    PooledDatabaseWrapper = None
+
+REPLICAS = ['replica_0', 'replica_1']
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    def test_reads_use_primary_unless_switched_on(self):
+        self.assertEqual(self.router.db_for_read(Brand), DEFAULT_DB_ALIAS)
+        with replica_reads():
+            self.assertIn(self.router.db_for_read(Brand), REPLICAS)
+        self.assertEqual(self.router.db_for_read(Brand), DEFAULT_DB_ALIAS)
+
+    def test_reads_spread_over_replicas(self):
+        with replica_reads():
+            chosen = {self.router.db_for_read(Brand) for _ in range(100)}
+        self.assertEqual(chosen, set(REPLICAS))
+
+    def test_writes_and_migrations_use_primary(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_write(Brand), DEFAULT_DB_ALIAS)
+        self.assertTrue(self.router.allow_migrate(DEFAULT_DB_ALIAS, 'bikes'))
+        self.assertFalse(self.router.allow_migrate('replica_0', 'bikes'))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_uses_primary(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Brand), DEFAULT_DB_ALIAS)
+
+    def test_warns_without_a_shared_cache(self):
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with override_settings(CACHES=locmem):
+            self.assertEqual([warning.id for warning in check_shared_cache()], ['core.W001'])
+        redis_cache = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': settings.REDIS_URL}}
+        with override_settings(CACHES=redis_cache):
+            self.assertEqual(check_shared_cache(), [])
+        with override_settings(CACHES=locmem, DATABASE_REPLICAS=[]):
+            self.assertEqual(check_shared_cache(), [])
+
+
+@unittest.skipUnless(
+    PooledDatabaseWrapper is not None and connections[DEFAULT_DB_ALIAS].vendor == 'postgresql',
+    "Needs PostgreSQL with psycopg 3 and psycopg_pool",
+)
+class PostgresPoolTests(SimpleTestCase):
+    databases = {DEFAULT_DB_ALIAS}
+
+    def test_connections_go_back_to_the_pool(self):
+        settings_dict = connections[DEFAULT_DB_ALIAS].settings_dict
+        wrapper = PooledDatabaseWrapper({
+            **settings_dict, 'CONN_MAX_AGE': 0,
+            'OPTIONS': {**settings_dict['OPTIONS'], 'pool': {'min_size': 1, 'max_size': 1, 'timeout': 5}},
+        }, alias='pool_smoke')
+        self.addCleanup(wrapper.close_pool)
+        # With a single pooled connection, one that was not handed back would time out the next round
+        for _ in range(3):
+            with wrapper.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                self.assertEqual(cursor.fetchone(), (1,))
+            self.assertEqual(wrapper.pool.get_stats()['pool_available'], 0)
+            wrapper.close()
+            self.assertEqual(wrapper.pool.get_stats()['pool_available'], 1)
+
+
+@override_settings(DATABASE_REPLICAS=['test_replica'])
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    The replica is a test mirror of the primary: a second connection to the
+    same test database, which is what a caught-up replica looks like.
+    """
+    databases = '__all__'
+    replica = 'test_replica'
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email='rider@example.com', username='rider', password='secret')
+        self.client = self.jwt_client()
+        brand = Brand.objects.create(name='Yamaha', slug='yamaha')
+        self.bike = BikeModel.objects.create(
+            brand=brand, name='R15', slug='yamaha-r15', category='sports', engine_capacity=155, price=500000,
+        )
+
+    def jwt_client(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens_for_user(self.user).access_token}')
+        return client
+
+    def queries(self, client, method, path):
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary, \
+                CaptureQueriesContext(connections[self.replica]) as replica:
+            response = getattr(client, method)(path)
+        return response, len(primary), len(replica)
+
+    def test_safe_reads_go_to_replica(self):
+        response, primary, replica = self.queries(self.client, 'get', '/api/bikes/brands/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_user_reads_stick_to_primary_after_a_write(self):
+        response, primary, replica = self.queries(self.client, 'post', f'/api/interactions/wishlist/toggle/{self.bike.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(replica, 0)
+
+        # A JWT client that keeps no cookies, e.g. another device of the same user
+        response, primary, replica = self.queries(self.jwt_client(), 'get', '/api/bikes/brands/')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+        # Once the window has passed the user is back on the replica
+        cache.delete(sticky_key(self.user.pk))
+        response, primary, replica = self.queries(self.jwt_client(), 'get', '/api/bikes/brands/')
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_other_users_keep_reading_from_replica(self):
+        self.client.post(f'/api/interactions/wishlist/toggle/{self.bike.pk}/')
+        other = get_user_model().objects.create_user(email='other@example.com', username='other', password='secret')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens_for_user(other).access_token}')
+        response, primary, replica = self.queries(client, 'get', '/api/bikes/brands/')
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_cookie_pins_clients_without_a_user(self):
+        response = self.client.post(f'/api/interactions/wishlist/toggle/{self.bike.pk}/')
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        self.assertEqual(response.cookies[STICKY_COOKIE]['max-age'], settings.DATABASE_STICKY_SECONDS)
+
+        anonymous = APIClient()
+        anonymous.cookies[STICKY_COOKIE] = '1'
+        response, primary, replica = self.queries(anonymous, 'get', '/api/bikes/brands/')
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_reads_inside_a_transaction_use_primary(self):
+        with replica_reads(), transaction.atomic():
+            self.assertEqual(Brand.objects.all().db, DEFAULT_DB_ALIAS)
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        user_cache.entries.clear()
+        self.user = get_user_model().objects.create_user(email='rider@example.com', username='rider', password='secret')
+
+    def authenticate(self, token):
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return CachedJWTAuthentication().authenticate(request)[0]
+
+    def test_user_is_cached_per_token_stamp(self):
+        token = tokens_for_user(self.user).access_token
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate(token).pk, self.user.pk)
+        with self.assertNumQueries(0):
+            user = self.authenticate(token)
+        # Each request gets its own copy
+        user.first_name = 'Changed'
+        self.assertEqual(self.authenticate(token).first_name, '')
+
+    def test_saving_the_user_invalidates(self):
+        token = tokens_for_user(self.user).access_token
+        self.authenticate(token)
+        self.user.first_name = 'Rider'
+        self.user.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate(token).first_name, 'Rider')
+
+    def test_deactivated_user_is_rejected(self):
+        token = tokens_for_user(self.user).access_token
+        self.authenticate(token)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+    def test_entries_expire(self):
+        now = [0.0]
+        lru = UserLRU(size=2, ttl=30, clock=lambda: now[0])
+        lru.put(('1', 1), 'a')
+        lru.put(('2', 1), 'b')
+        lru.put(('3', 1), 'c')
+        self.assertIsNone(lru.get(('1', 1)))
+        self.assertEqual(lru.get(('2', 1)), 'b')
+        now[0] = 31
+        self.assertIsNone(lru.get(('2', 1)))
+
+    def test_refresh_restamps_updated_at(self):
+        get_user_model().objects.filter(pk=self.user.pk).update(updated_at=timezone.now() - datetime.timedelta(hours=1))
+        self.user.refresh_from_db()
+        refresh = tokens_for_user(self.user)
+        self.user.first_name = 'Rider'
+        self.user.save()
+
+        response = self.client.post('/api/users/auth/token/refresh/', {'refresh': str(refresh)})
+        self.assertEqual(response.status_code, 200)
+        access = AccessToken(response.json()['access'])
+        self.assertNotEqual(access[UPDATED_AT_CLAIM], refresh[UPDATED_AT_CLAIM])
+        self.assertEqual(access[UPDATED_AT_CLAIM], round(self.user.updated_at.timestamp() * 1_000_000))
+        self.assertEqual(self.authenticate(access).first_name, 'Rider')
+
+    def test_refresh_rejects_deactivated_user(self):
+        refresh = tokens_for_user(self.user)
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.post('/api/users/auth/token/refresh/', {'refresh': str(refresh)})
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=True)
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Brand.objects.create(name='Yamaha')
+
+    def get(self, accept='application/json', path='/api/bikes/brands/'):
+        return self.client.get(path, HTTP_ACCEPT=accept)
+
+    def test_second_request_is_served_from_cache(self):
+        self.assertEqual(self.get()['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.get()
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_browsable_and_unacceptable_responses_are_not_cached(self):
+        for accept in ('text/html', 'application/xml'):
+            self.get(accept)
+            self.assertFalse(self.get(accept).has_header('X-Cache'), accept)
+
+    @unittest.skipIf(msgpack is None, "msgpack is not installed")
+    def test_keyed_by_negotiated_renderer(self):
+        # Mentions msgpack, but the JSON renderer comes first and is picked
+        response = self.get('application/msgpack, application/json')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        response = self.get('application/msgpack')
+        self.assertEqual((response['X-Cache'], response['Content-Type']), ('MISS', 'application/msgpack'))
+        self.assertEqual(msgpack.unpackb(response.content)['results'][0]['slug'], 'yamaha')
+        response = self.get('*/*')
+        self.assertEqual((response['X-Cache'], response['Content-Type']), ('HIT', 'application/json'))
+
+    def test_write_invalidates(self):
+        self.get()
+        Brand.objects.create(name='Honda')
+        response = self.get()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual([brand['name'] for brand in response.json()['results']], ['Honda', 'Yamaha'])
+        self.assertEqual(self.get()['X-Cache'], 'HIT')
+
+    def test_write_in_transaction_invalidates_again_on_commit(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Brand.objects.update_or_create(name='Yamaha', defaults={'is_popular': True})
+                # A read before the commit is cached under the bumped generation
+                self.assertEqual(self.get()['X-Cache'], 'MISS')
+                self.assertEqual(self.get()['X-Cache'], 'HIT')
+        self.assertEqual(self.get()['X-Cache'], 'MISS')
+
+    def test_unrelated_writes_keep_entries(self):
+        self.get()
+        user = get_user_model().objects.create_user(email='rider@example.com', username='rider', password='x')
+        generation = cache.get(generation_key('users.User'))
+        user.last_login = timezone.now()
+        user.save(update_fields=['last_login'])
+        self.assertEqual(cache.get(generation_key('users.User')), generation)
+        self.assertEqual(self.get()['X-Cache'], 'HIT')
+
+    def test_relation_change_bumps_both_sides(self):
+        article = Article.objects.create(
+            title='R15 review', excerpt='Short', content='<p>Fast</p>', category=NewsCategory.objects.create(name='Reviews'),
+        )
+        tag = Tag.objects.create(name='Sports')
+        before = cache.get_many([generation_key('news.Article'), generation_key('news.Tag')])
+        article.tags.add(tag)
+        after = cache.get_many([generation_key('news.Article'), generation_key('news.Tag')])
+        self.assertEqual({key: value - before[key] for key, value in after.items()}, {key: 1 for key in before})
+
+
+class ThrottleTests(TestCase):
+    def test_local_limiter_spaces_requests(self):
+        now = [0.0]
+        limiter = LocalLimiter(clock=lambda: now[0])
+        self.assertEqual([limiter.hit('k', 20, 60)[0] for _ in range(4)], [True, True, True, False])
+        self.assertEqual(limiter.hit('k', 20, 60), (False, 20.0))
+        self.assertTrue(limiter.hit('other', 20, 60)[0])
+        now[0] = 20
+        self.assertEqual([limiter.hit('k', 20, 60)[0] for _ in range(2)], [True, False])
+
+    def test_falls_back_to_local_limiter_when_redis_is_down(self):
+        limiter = RateLimiter('redis://127.0.0.1:1/0')
+        with self.assertLogs('core.throttling', 'WARNING'):
+            self.assertEqual(limiter.hit('k', 2, 60), (True, 0.0))
+        self.assertIsNone(limiter.script)
+        self.assertTrue(limiter.hit('k', 2, 60)[0])
+        allowed, wait = limiter.hit('k', 2, 60)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 30, delta=1)
+
+    def test_view_allows_then_rejects(self):
+        user = get_user_model().objects.create_user(email='rider@example.com', username='rider')
+        brand = Brand.objects.create(name='Yamaha')
+        bikes = [
+            BikeModel.objects.create(brand=brand, name=f'R{n}', slug=f'r{n}', category='sports', engine_capacity=155, price=1)
+            for n in range(3)
+        ]
+        client = APIClient()
+        client.force_authenticate(user)
+        with mock.patch.object(throttling, 'limiter', RateLimiter('redis://127.0.0.1:1/0')), \
+                mock.patch.dict(SharedRateThrottle.THROTTLE_RATES, {'review_create': '2/hour'}), \
+                self.assertLogs('core.throttling', 'WARNING'):
+            statuses = [
+                client.post(f'/api/interactions/bikes/{bike.pk}/reviews/', {'rating': 4, 'comment': 'Good'}).status_code
+                for bike in bikes
+            ]
+            self.assertEqual(statuses, [201, 201, 429])
+            response = client.post(f'/api/interactions/bikes/{bikes[2].pk}/reviews/', {'rating': 4, 'comment': 'Good'})
+            self.assertEqual(int(response['Retry-After']), 1800)
+            # Reading is not throttled
+            self.assertEqual(client.get(f'/api/interactions/bikes/{bikes[0].pk}/reviews/').status_code, 200)
@@ -0,0 +1,143 @@
+"""
+DRF throttles shared by every worker.
+
+Each check is one Lua call implementing GCRA (generic cell rate algorithm):
+a single key per client holds the theoretical arrival time of its next
+request, so the cost is O(1) whatever the rate. If Redis cannot be reached,
+checks fall back to the same algorithm in process memory (per worker,
+failing open rather than rejecting traffic) and Redis is retried a little later.
+"""
+import logging
+import math
+import threading
+import time
+from typing import Dict, Tuple
+
+import redis
+from django.conf import settings
+from rest_framework.throttling import SimpleRateThrottle
+
+logger = logging.getLogger(__name__)
+
+REDIS_RETRY_SECONDS = 30
+
+# KEYS: client key. ARGV: emission interval, period (both seconds).
+# Returns {allowed, seconds to wait}. Uses the Redis clock, so workers agree.
+GCRA_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tat < now then
+    tat = now
+end
+local allow_at = tat + interval - period
+if now < allow_at then
+    return {0, tostring(allow_at - now)}
+end
+tat = tat + interval
+redis.call('SET', KEYS[1], tostring(tat), 'PX', math.ceil((tat - now) * 1000))
+return {1, '0'}
+"""
+
+
+class LocalLimiter:
+    """GCRA in process memory, used while Redis is unreachable."""
+
+    MAX_KEYS = 10000
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.tats: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def hit(self, key: str, interval: float, period: float) -> Tuple[bool, float]:
+        with self.lock:
+            now = self.clock()
+            tat = max(self.tats.get(key, 0.0), now)
+            allow_at = tat + interval - period
+            if now < allow_at:
+                return False, allow_at - now
+            self.tats[key] = tat + interval
+            if len(self.tats) > self.MAX_KEYS:
+                self.tats = {k: v for k, v in self.tats.items() if v > now}
+            return True, 0.0
+
+
+class RateLimiter:
+    def __init__(self, url: str):
+        self.url = url
+        self.local = LocalLimiter()
+        self.script = None
+        self.retry_at = 0.0
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        with self.lock:
+            if self.script is None and time.monotonic() >= self.retry_at:
+                client = redis.Redis.from_url(self.url, socket_connect_timeout=0.2, socket_timeout=0.2)
+                self.script = client.register_script(GCRA_SCRIPT)
+        return self.script
+
+    def hit(self, key: str, limit: int, period: float) -> Tuple[bool, float]:
+        """Count one request against `limit` per `period` seconds. Returns (allowed, seconds to wait)."""
+        interval = period / limit
+        script = self._connect()
+        if script is not None:
+            try:
+                allowed, wait = script(keys=[key], args=[interval, period])
+                return bool(allowed), float(wait)
+            except redis.RedisError:
+                logger.warning("Redis unavailable, throttling in-process for %ss", REDIS_RETRY_SECONDS)
+                with self.lock:
+                    self.script = None
+                    self.retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+        return self.local.hit(key, interval, period)
+
+
+limiter = RateLimiter(settings.REDIS_URL)
+
+
+class SharedRateThrottle(SimpleRateThrottle):
+    """
+    Rate from DEFAULT_THROTTLE_RATES[scope], counted per user (or per IP for
+    anonymous requests) in the shared limiter instead of the Django cache.
+    """
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    def get_cache_key(self, request, view):
+        if request.user is not None and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        allowed, self.retry_after = limiter.hit(self.key, self.num_requests, self.duration)
+        return allowed
+
+    def wait(self):
+        return math.ceil(self.retry_after) if self.retry_after else None
+
+
+class SharedScopedRateThrottle(SharedRateThrottle):
+    """Scope taken from the view's `throttle_scope`, like DRF's ScopedRateThrottle."""
+    scope_attr = 'throttle_scope'
+
+    def __init__(self):
+        # The rate is resolved per view in allow_request
+        pass
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework import permissions
@@ -20,11 +22,18 @@ urlpatterns = [
     path('api/bikes/', include('apps.bikes.urls')),
     path('api/marketplace/', include('apps.marketplace.urls')),
     path('api/news/', include('apps.news.urls')),
+    path('api/editorial/', include('apps.editorial.urls')),
     path('api/interactions/', include('apps.interactions.urls')),
     path('api/recommendations/', include('apps.recommendations.urls')),
+    path('api/search/', include('apps.search.urls')),
+    path('api/trending/', include('apps.trending.urls')),
 
     
     # Swagger Documentation
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
 ]
+
+# Locally stored listing images (LocalImageStorage) in development
+if settings.DEBUG:
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
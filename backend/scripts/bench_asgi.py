@@ -0,0 +1,82 @@
+"""
+Load test for the async read endpoints: requests per second and latency
+percentiles at a given concurrency, to compare the WSGI and ASGI deployments.
+
+Start the same code both ways, then point this at each:
+
+    gunicorn core.wsgi -w 4 --threads 8 -b 127.0.0.1:8001
+    gunicorn core.asgi:application -w 4 -k uvicorn.workers.UvicornWorker -b 127.0.0.1:8002
+
+    python scripts/bench_asgi.py http://127.0.0.1:8001 --concurrency 256 --requests 20000
+    python scripts/bench_asgi.py http://127.0.0.1:8002 --concurrency 256 --requests 20000
+
+Paths default to the async endpoints; pass --path (repeatable) to choose others.
+Uses only the standard library: one keep-alive connection per client thread.
+"""
+import argparse
+import http.client
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+DEFAULT_PATHS = [
+    '/api/trending/bikes/',
+    '/api/trending/articles/',
+]
+
+
+def client_loop(base, paths, count, latencies, errors):
+    url = urlsplit(base)
+    connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+    for i in range(count):
+        path = paths[i % len(paths)]
+        started = time.perf_counter()
+        try:
+            connection.request('GET', path, headers={'Accept': 'application/json'})
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as exc:
+            errors.append(type(exc).__name__)
+            connection.close()
+            connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - started)
+    connection.close()
+
+
+def percentile(values, fraction):
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('base_url')
+    parser.add_argument('--path', action='append', dest='paths')
+    parser.add_argument('--concurrency', type=int, default=128)
+    parser.add_argument('--requests', type=int, default=10000)
+    args = parser.parse_args()
+    paths = args.paths or DEFAULT_PATHS
+
+    latencies, errors = [], []
+    per_client = max(args.requests // args.concurrency, 1)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for _ in range(args.concurrency):
+            pool.submit(client_loop, args.base_url, paths, per_client, latencies, errors)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"{args.base_url}  concurrency={args.concurrency}  requests={len(latencies)}  errors={len(errors)}")
+    if latencies:
+        print(f"  {len(latencies) / elapsed:,.0f} req/s")
+        print(
+            f"  p50 {percentile(latencies, 0.50) * 1000:.1f} ms  p90 {percentile(latencies, 0.90) * 1000:.1f} ms"
+            f"  p99 {percentile(latencies, 0.99) * 1000:.1f} ms  mean {statistics.mean(latencies) * 1000:.1f} ms"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Per-request authentication cost of each scheme the API has accepted.
+
+Runs against a throwaway test database:
+
+    python scripts/bench_auth.py [--iterations 200]
+
+Prints mean time and queries per authenticated request for basic auth,
+database and cached_db sessions, plain JWT and CachedJWTAuthentication.
+"""
+import argparse
+import base64
+import os
+import sys
+import time
+from importlib import import_module
+from pathlib import Path
+
+import django
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import BasicAuthentication
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from core.authentication import CachedJWTAuthentication, tokens_for_user
+
+PASSWORD = 'bench-password'
+
+
+def measure(name, authenticate, iterations):
+    authenticate()  # warm up (and fill caches, as in steady state)
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            user = authenticate()
+        elapsed = time.perf_counter() - started
+    assert user is not None and user.is_authenticated, name
+    print(f"{name:<28} {elapsed / iterations * 1e6:>10.1f} us {len(queries) / iterations:>8.2f} queries")
+
+
+def drf_authenticator(authentication, **headers):
+    factory = RequestFactory()
+
+    def authenticate():
+        return authentication.authenticate(Request(factory.get('/api/bikes/', **headers)))[0]
+    return authenticate
+
+
+def session_authenticator(engine, user):
+    store_class = import_module(engine).SessionStore
+    session = store_class()
+    session[auth.SESSION_KEY] = str(user.pk)
+    session[auth.BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[auth.HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    factory = RequestFactory()
+
+    def authenticate():
+        # What SessionMiddleware + AuthenticationMiddleware do for each request
+        request = factory.get('/api/bikes/')
+        request.session = store_class(session.session_key)
+        return auth.get_user(request)
+    return authenticate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=200)
+    iterations = parser.parse_args().iterations
+
+    database_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        user = get_user_model().objects.create_user(email='bench@example.com', username='bench', password=PASSWORD)
+        basic = base64.b64encode(f"{user.email}:{PASSWORD}".encode()).decode()
+        bearer = f"Bearer {tokens_for_user(user).access_token}"
+
+        # Basic auth hashes the password on every call; a few rounds are plenty
+        measure('basic', drf_authenticator(BasicAuthentication(), HTTP_AUTHORIZATION=f"Basic {basic}"), max(iterations // 20, 5))
+        measure('session (db)', session_authenticator('django.contrib.sessions.backends.db', user), iterations)
+        measure('session (cached_db)', session_authenticator('django.contrib.sessions.backends.cached_db', user), iterations)
+        measure('jwt', drf_authenticator(JWTAuthentication(), HTTP_AUTHORIZATION=bearer), iterations)
+        measure('jwt + cached user', drf_authenticator(CachedJWTAuthentication(), HTTP_AUTHORIZATION=bearer), iterations)
+    finally:
+        connection.creation.destroy_test_db(database_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Cost of producing a large bike list page: serializing, then rendering it with
+DRF's JSONRenderer, ORJSONRenderer and (when installed) MessagePackRenderer.
+
+Runs against a throwaway test database:
+
+    python scripts/bench_renderers.py [--rows 100] [--iterations 200]
+
+Serialization is timed with DRF's DecimalField and with core.fields.DecimalField.
+"""
+import argparse
+import os
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+import django
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from django.db import connection
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from apps.bikes.models import BikeModel, Brand
+from apps.bikes.serializers import BikeModelSerializer
+from core.renderers import MessagePackRenderer, ORJSONRenderer, msgpack
+
+
+class DRFDecimalBikeSerializer(BikeModelSerializer):
+    serializer_field_mapping = serializers.ModelSerializer.serializer_field_mapping
+
+
+def measure(name, func, iterations):
+    result = func()  # warm up
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - started
+    size = f"{len(result):>10} bytes" if isinstance(result, bytes) else ''
+    print(f"{name:<28} {elapsed / iterations * 1e3:>8.3f} ms {size}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    database_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        brand = Brand.objects.create(name='Yamaha', slug='yamaha')
+        BikeModel.objects.bulk_create([
+            BikeModel(
+                brand=brand, name=f'Model {index}', slug=f'model-{index}', category='sports',
+                engine_capacity=150, price=Decimal('250000.00') + index, user_rating_avg=4.2,
+            )
+            for index in range(args.rows)
+        ])
+        bikes = list(BikeModel.objects.select_related('brand'))
+        data = BikeModelSerializer(bikes, many=True).data
+
+        measure('serialize (drf decimal)', lambda: DRFDecimalBikeSerializer(bikes, many=True).data, args.iterations)
+        measure('serialize (core decimal)', lambda: BikeModelSerializer(bikes, many=True).data, args.iterations)
+        measure('render JSONRenderer', lambda: JSONRenderer().render(data), args.iterations)
+        measure('render ORJSONRenderer', lambda: ORJSONRenderer().render(data), args.iterations)
+        if msgpack is not None:
+            measure('render MessagePackRenderer', lambda: MessagePackRenderer().render(data), args.iterations)
+    finally:
+        connection.creation.destroy_test_db(database_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()